@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+import os
+import statistics
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.realpath(__file__)), "..", "tcp"))
+
+import lib.tcp.tcp as tcp
+from lib.tcp.components.tcp_packet import TCP_Packet
+from lib.tcp.components.integrity import ALGORITHMS
+
+##
+# @fn       packet_throughput
+# @brief    Measures the rate at which TCP packets are sealed by the sender and validated by the receiver,
+#           excluding the network, for one integrity algorithm.
+#
+# @return   Returns a dictionary of the measured results.
+def packet_throughput(integrity, mss, packets):
+    payload   = os.urandom(mss)
+    sender    = TCP_Packet(55000, 54000, 0, 0, 65535, None, ack=1, integrity=integrity)
+    receiver  = TCP_Packet(0, 0, 0, 0, 0, None, integrity=integrity)
+
+    start = time.perf_counter()
+    for seq_no in range(packets):
+        sender.data     = payload
+        sender.seq_no   = seq_no * mss
+        receiver.packet = bytes(sender.packet)
+        assert receiver.is_valid()
+    elapsed = time.perf_counter() - start
+
+    return {
+        "us_per_packet":    round(1e6 * elapsed / packets, 2),
+        "packet_MBps":      round((mss * packets) / elapsed / 1e6, 2),
+    }
+
+##
+# @fn       transfer
+# @brief    Measures the goodput of a complete TCP transfer over loopback, including the handshake in which
+#           the integrity algorithm is negotiated.
+#
+# @return   Returns the negotiated integrity algorithm name and the transfer time in seconds.
+def transfer(integrity, mss, size, port):
+    data   = bytearray(os.urandom(size))
+    result = {}
+    server = tcp.TCP("127.0.0.1", port, "127.0.0.1", port + 1, mss, integrity=integrity.name)
+    client = tcp.TCP("127.0.0.1", port + 1, "127.0.0.1", port, mss, integrity=integrity.name)
+
+    def receive():
+        result["data"] = server.recv()
+
+    server_t = threading.Thread(target=receive)
+    server_t.start()
+    start = time.perf_counter()
+    client.connect()
+    client.send(data)
+    client.close()
+    server_t.join()
+    elapsed = time.perf_counter() - start
+
+    assert result["data"] == data
+    return client._integrity.name, elapsed
+
+##
+# @fn       transfer_throughput
+# @brief    Repeats the loopback transfer and reports the median, as the transfer time is dominated by the
+#           scheduling of the TCP threads rather than by the integrity algorithm.
+#
+# @return   Returns a dictionary of the measured results.
+def transfer_throughput(integrity, mss, size, port, repeats):
+    times = []
+    for _ in range(repeats):
+        negotiated, elapsed = transfer(integrity, mss, size, port)
+        times.append(elapsed)
+        port += 2
+    elapsed = statistics.median(times)
+
+    return {
+        "negotiated":       negotiated,
+        "transfer_s":       round(elapsed, 3),
+        "transfer_MBps":    round(size / elapsed / 1e6, 2),
+    }
+
+def main(mss, packets, size, repeats):
+    tcp.DEBUG = False
+    for i, integrity in enumerate(ALGORITHMS.values()):
+        result = {"integrity": integrity.name}
+        result.update(packet_throughput(integrity, mss, packets))
+        result.update(transfer_throughput(integrity, mss, size, 56000 + (2 * repeats * i), repeats))
+        print(", ".join(f"{k} = {v}" for k, v in result.items()))
+
+if __name__ == "__main__":
+    mss     = 5000          # Data bytes per segment, matching tcp_client.py.
+    packets = 2000          # Number of packets sealed and validated per algorithm.
+    size    = 2_000_000     # Number of bytes in each loopback transfer.
+    repeats = 5             # Number of loopback transfers per algorithm.
+    main(mss, packets, size, repeats)
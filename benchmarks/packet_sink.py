@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.realpath(__file__)), "..", "gobackn"))
+
+from lib.packets import PacketSink
+
+##
+# @fn       write_per_byte
+# @brief    Write path of the TCP Packets.packets2file prior to PacketSink: one write call per byte.
+def write_per_byte(file, segments):
+    with open(file, "wb") as data:
+        for packet in bytes(b''.join(segments)):
+            data.write(packet.to_bytes(1, 'big'))
+
+##
+# @fn       write_per_segment
+# @brief    Write path of the GoBackN, SelectiveRepeat and RDT Packets.packets2file prior to PacketSink: one
+#           write call per segment.
+def write_per_segment(file, segments):
+    with open(file, "wb") as data:
+        for packet in segments:
+            data.write(packet)
+
+def sink_writelines(file, segments):
+    with PacketSink(file) as sink:
+        sink.writelines(segments)
+
+def sink_write(file, segments):
+    with PacketSink(file) as sink:
+        for packet in segments:
+            sink.write(packet)
+
+##
+# @fn       sink_write_at_mapped
+# @brief    Writes the segments in the given order at their offsets into a preallocated, memory-mapped file.
+#           A shuffled order models an out-of-order receiver.
+def sink_write_at_mapped(file, segments, order, offsets, size):
+    with PacketSink(file, size) as sink:
+        for i in order:
+            sink.write_at(offsets[i], segments[i])
+
+def run(name, write, file, segments, expected, *args):
+    start = time.perf_counter()
+    write(file, segments, *args)
+    elapsed = time.perf_counter() - start
+
+    with open(file, "rb") as data:
+        assert data.read() == expected
+    return f"{name} = {1e3 * elapsed:.2f} ms"
+
+def main(configurations):
+    for file_size, segment_size in configurations:
+        expected = os.urandom(file_size)
+        segments = [expected[i:(i + segment_size)] for i in range(0, file_size, segment_size)]
+        offsets  = list(range(0, file_size, segment_size))
+        order    = list(range(len(segments)))
+        random.Random(0).shuffle(order)
+
+        with tempfile.TemporaryDirectory() as directory:
+            file    = os.path.join(directory, "out")
+            results = []
+            if file_size <= 1_000_000:
+                results.append(run("per_byte", write_per_byte, file, segments, expected))
+            results.append(run("per_segment", write_per_segment, file, segments, expected))
+            results.append(run("sink_write", sink_write, file, segments, expected))
+            results.append(run("sink_writelines", sink_writelines, file, segments, expected))
+            results.append(run("sink_write_at_mapped", sink_write_at_mapped, file, segments, expected, range(len(segments)), offsets, file_size))
+            results.append(run("sink_write_at_mapped_shuffled", sink_write_at_mapped, file, segments, expected, order, offsets, file_size))
+        print(f"{file_size / 1e6:g} MB, {segment_size} B segments: " + ", ".join(results))
+
+if __name__ == "__main__":
+    configurations = [
+        (471_000, 1000),        # Size of client_data/test.bmp.
+        (256_000_000, 1000),    # Large file.
+    ]
+    main(configurations)
@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+import zlib
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.realpath(__file__)), "..", "gobackn"))
+
+##
+# @fn       anonymous_rss
+# @brief    Reads the resident anonymous memory of the process, which excludes pages of memory-mapped files
+#           that are shared with the page cache. Returns 0 where /proc is not available.
+def anonymous_rss():
+    try:
+        with open("/proc/self/status") as status:
+            for line in status:
+                if line.startswith("RssAnon:"):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    return 0
+
+##
+# @fn       measure
+# @brief    Opens a file with one of the packet sources and reads every packet, in a fresh process so that
+#           the peak RSS belongs to that source alone.
+#
+# @param    method      - "list" for Packets.file2packets, or "mmap" for PacketSource.
+# @param    file        - File to open.
+# @param    packet_size - Number of bytes in each packet.
+#
+# @return   None, prints the startup time, read time, peak RSS and anonymous RSS of the process.
+def measure(method, file, packet_size):
+    from lib.packets import Packets, PacketSource
+
+    start   = time.perf_counter()
+    packets = Packets.file2packets(file, packet_size) if method == "list" else PacketSource(file, packet_size)
+    startup = time.perf_counter() - start
+
+    # Read the contents of every packet, as a sending process would.
+    start = time.perf_counter()
+    crc   = 0
+    for packet in packets:
+        crc = zlib.crc32(packet, crc)
+    read = time.perf_counter() - start
+
+    print(f"{startup} {read} {resource.getrusage(resource.RUSAGE_SELF).ru_maxrss} {anonymous_rss()} {len(packets)}")
+
+def run(method, file, packet_size):
+    output = subprocess.run([sys.executable, __file__, method, file, str(packet_size)], capture_output=True, text=True, check=True).stdout
+    startup, read, max_rss, anon_rss, count = output.split()
+    return {
+        "source":       method,
+        "packet_size":  packet_size,
+        "packets":      int(count),
+        "startup_ms":   round(1e3 * float(startup), 2),
+        "read_ms":      round(1e3 * float(read), 2),
+        "peak_rss_MB":  round(int(max_rss) / 1024, 1),
+        "anon_rss_MB":  round(int(anon_rss) / 1024, 1),
+    }
+
+def main(configurations):
+    for file_size, packet_size in configurations:
+        with tempfile.NamedTemporaryFile(delete=False) as file:
+            file.write(os.urandom(file_size))
+        try:
+            print(f"{file_size / 1e6:g} MB file:")
+            for method in ("list", "mmap"):
+                result = run(method, file.name, packet_size)
+                print("  " + ", ".join(f"{k} = {v}" for k, v in result.items()))
+        finally:
+            os.unlink(file.name)
+
+if __name__ == "__main__":
+    if len(sys.argv) == 4:
+        measure(sys.argv[1], sys.argv[2], int(sys.argv[3]))
+    else:
+        configurations = [
+            (471_000, 1),           # Size of client_data/test.bmp, read one byte per packet as tcp_client.py did.
+            (471_000, 1000),        # Size of client_data/test.bmp, as read by gbn_client.py.
+            (256_000_000, 1000),    # Large file.
+        ]
+        main(configurations)
@@ -0,0 +1,218 @@
+#!/usr/bin/env python3
+import argparse
+import itertools
+import json
+import os
+import resource
+import subprocess
+import sys
+import threading
+import time
+
+ROOT = os.path.join(os.path.dirname(os.path.realpath(__file__)), "..")
+
+PROTOCOLS   = ("rdt3_0", "gobackn", "selectiverepeat", "tcp")
+FAULTS      = ("none", "data_loss", "ack_loss", "data_corruption", "ack_corruption")
+
+##
+# @class    CountingSocket
+# @brief    Wraps the sending socket of a protocol endpoint to count the datagrams and bytes it sends.
+class CountingSocket:
+    def __init__(self, sock):
+        self._sock      = sock
+        self.datagrams  = 0
+        self.bytes      = 0
+
+    def sendto(self, data, address):
+        self.datagrams += 1
+        self.bytes     += len(data)
+        return self._sock.sendto(data, address)
+
+    def __getattr__(self, name):
+        return getattr(self._sock, name)
+
+##
+# @fn       fault_options
+# @brief    Translates a fault name into the corruption and loss options of the RDT3_0, GoBackN and
+#           SelectiveRepeat classes. Option 1 disables a fault, 2 applies it to ACKs and 3 to data packets.
+def fault_options(fault):
+    corruption_option = {"data_corruption": [3], "ack_corruption": [2]}.get(fault, [1])
+    loss_option       = {"data_loss": [3], "ack_loss": [2]}.get(fault, [1])
+    return corruption_option, loss_option
+
+##
+# @fn       build_endpoints
+# @brief    Imports a protocol from its directory and creates the sending and receiving endpoints for a case.
+#
+# @return   Returns the sender, the receiver, the sender's counting socket, a function that transfers the
+#           data from the sender, and a function that receives and returns the data.
+def build_endpoints(case, data, port):
+    protocol    = case["protocol"]
+    mss         = case["mss"]
+    rate        = case["rate"] if case["fault"] != "none" else 0
+    packets     = [data[i:(i + mss)] for i in range(0, len(data), mss)]
+
+    if protocol == "tcp":
+        sys.path.insert(0, os.path.join(ROOT, "tcp"))
+        import lib.tcp.tcp as module
+        module.DEBUG    = False
+        debug_option    = {"none": 1, "ack_corruption": 2, "data_corruption": 3, "ack_loss": 4, "data_loss": 5}[case["fault"]]
+        window          = min(case["window"] * mss, 0xFFFF)
+        receiver        = module.TCP("127.0.0.1", port, "127.0.0.1", port + 1, mss, send_window=window, recv_window=window, loss=rate, debug_option=debug_option)
+        sender          = module.TCP("127.0.0.1", port + 1, "127.0.0.1", port, mss, send_window=window, recv_window=window, loss=rate, debug_option=debug_option)
+        counter         = sender._send_sock = CountingSocket(sender._send_sock)
+
+        def send():
+            sender.connect()
+            sender.send(bytearray(data))
+            sender.close()
+
+        def recv():
+            return bytes(receiver.recv())
+
+        return sender, receiver, counter, send, recv
+
+    corruption_option, loss_option = fault_options(case["fault"])
+    options = dict(corruption=rate, corruption_option=corruption_option, loss=rate, loss_option=loss_option)
+
+    if protocol == "rdt3_0":
+        sys.path.insert(0, os.path.join(ROOT, "rdt"))
+        import lib.rdt.rdt3_0 as module
+        module.DEBUG    = False
+        receiver        = module.RDT3_0("127.0.0.1", port + 1, "127.0.0.1", port, mss, **options)
+        sender          = module.RDT3_0("127.0.0.1", port, "127.0.0.1", port + 1, mss, timeout=case["timeout"], **options)
+    else:
+        if protocol == "gobackn":
+            sys.path.insert(0, os.path.join(ROOT, "gobackn"))
+            import lib.gbn.gobackn as module
+            cls = module.GoBackN
+        else:
+            sys.path.insert(0, os.path.join(ROOT, "selectiverepeat"))
+            import lib.sr.selectiverepeat as module
+            cls = module.SelectiveRepeat
+        module.DEBUG    = False
+        receiver        = cls("127.0.0.1", port + 1, "127.0.0.1", port, case["window"], mss, timeout=case["timeout"], **options)
+        sender          = cls("127.0.0.1", port, "127.0.0.1", port + 1, case["window"], mss, timeout=case["timeout"], **options)
+    counter = sender.send_sock = CountingSocket(sender.send_sock)
+
+    def send():
+        sender.send(packets)
+
+    def recv():
+        return b''.join(bytes(packet) for packet in receiver.recv())
+
+    return sender, receiver, counter, send, recv
+
+##
+# @fn       run_case
+# @brief    Runs a single case of the matrix in the current process and prints the result as JSON. The
+#           transfer is complete once the receiver has returned all of the data, the sender's threads are
+#           not waited for, as some protocols only notice the end of a transfer after a socket timeout.
+def run_case(case):
+    result      = dict(case)
+    data        = os.urandom(case["size"])
+    received    = {}
+    stdout      = sys.stdout
+    sys.stdout  = open(os.devnull, "w")     # The protocols print progress unconditionally.
+
+    sender, receiver, counter, send, recv = build_endpoints(case, data, case["port"])
+
+    def receive():
+        received["data"] = recv()
+
+    recv_t = threading.Thread(target=receive, daemon=True)
+    send_t = threading.Thread(target=send, daemon=True)
+    recv_t.start()
+    time.sleep(0.1)
+
+    start_cpu  = time.process_time()
+    start_wall = time.perf_counter()
+    send_t.start()
+    recv_t.join(case["case_timeout"])
+    wall = time.perf_counter() - start_wall
+    cpu  = time.process_time() - start_cpu
+
+    if recv_t.is_alive():
+        result["status"] = "timeout"
+    elif received["data"] != data:
+        result["status"] = "corrupt"
+    else:
+        result["status"] = "ok"
+    result.update({
+        "wall_s":           round(wall, 4),
+        "goodput_MBps":     round(case["size"] / wall / 1e6, 4) if (result["status"] == "ok") else 0,
+        "cpu_s":            round(cpu, 4),
+        "peak_rss_MB":      round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+        "datagrams_sent":   counter.datagrams,
+        "bytes_sent":       counter.bytes,
+        "retransmissions":  sender.retransmissions,
+    })
+
+    stdout.write(json.dumps(result) + "\n")
+    stdout.flush()
+    os._exit(0)
+
+##
+# @fn       cases
+# @brief    Expands the matrix into a list of cases. Dimensions that a protocol does not use (the window of
+#           RDT3_0 and the timeout of TCP, which calculates its own) are only run once for that protocol.
+def cases(args):
+    seen = set()
+    for protocol, size, window, timeout, mss, fault in itertools.product(args.protocols, args.sizes, args.windows, args.timeouts, args.mss, args.faults):
+        fault, _, rate = fault.partition(":")
+        case = {
+            "protocol": protocol,
+            "size":     size,
+            "window":   None if (protocol == "rdt3_0") else window,
+            "timeout":  None if (protocol == "tcp") else timeout,
+            "mss":      mss,
+            "fault":    fault,
+            "rate":     int(rate or 0),
+        }
+        key = tuple(case.values())
+        if key in seen:
+            continue
+        seen.add(key)
+        yield case
+
+def main(args):
+    results = []
+    for case in cases(args):
+        for repeat in range(args.repeats):
+            case.update({"repeat": repeat, "port": args.port + (4 * len(results)), "case_timeout": args.case_timeout})
+            try:
+                output = subprocess.run([sys.executable, os.path.realpath(__file__), "--case", json.dumps(case)],
+                                        capture_output=True, text=True, timeout=(args.case_timeout + 30)).stdout
+                result = json.loads(output.strip().splitlines()[-1])
+            except (subprocess.TimeoutExpired, IndexError, json.JSONDecodeError):
+                result = dict(case, status="error")
+            del result["port"], result["case_timeout"]
+            results.append(result)
+            print(json.dumps(result), file=sys.stderr)
+
+    output = json.dumps({"platform": sys.platform, "python": sys.version.split()[0], "results": results}, indent=2)
+    if args.output:
+        with open(args.output, "w") as file:
+            file.write(output + "\n")
+    else:
+        print(output)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Loopback throughput matrix for the RDT3_0, GoBackN, SelectiveRepeat and TCP implementations.")
+    parser.add_argument("--protocols",      nargs="+", default=list(PROTOCOLS), choices=PROTOCOLS)
+    parser.add_argument("--sizes",          nargs="+", type=int, default=[100_000, 1_000_000], help="File sizes in bytes.")
+    parser.add_argument("--windows",        nargs="+", type=int, default=[10, 50], help="Window sizes in packets (in MSS for TCP).")
+    parser.add_argument("--timeouts",       nargs="+", type=float, default=[0.05], help="Retransmission timeouts in seconds.")
+    parser.add_argument("--mss",            nargs="+", type=int, default=[1000], help="Data bytes per packet, at most 1014 for GoBackN and SelectiveRepeat.")
+    parser.add_argument("--faults",         nargs="+", default=["none", "data_loss:10", "data_corruption:10"], help=f"Faults as name:percent, names: {', '.join(FAULTS)}.")
+    parser.add_argument("--repeats",        type=int, default=1)
+    parser.add_argument("--case-timeout",   type=float, default=120, help="Seconds before a transfer is reported as a timeout.")
+    parser.add_argument("--port",           type=int, default=57000, help="First loopback port used by the cases.")
+    parser.add_argument("--output",         help="File the JSON report is written to, instead of stdout.")
+    parser.add_argument("--case",           help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.case:
+        run_case(json.loads(args.case))
+    else:
+        main(args)
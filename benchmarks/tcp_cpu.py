@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.join(os.path.dirname(os.path.realpath(__file__)), "..")
+
+##
+# @fn       measure
+# @brief    Transfers data between two TCP endpoints over loopback and prints the wall time of the transfer
+#           and the CPU time of each endpoint. The receiver runs in a forked process, so the CPU time of
+#           each process covers every thread of one endpoint, and threads that poll while waiting are
+#           charged to their endpoint.
+#
+# @param    tcp_dir - Directory containing the lib.tcp package to measure.
+# @param    size    - Number of bytes to transfer.
+# @param    mss     - Data bytes per segment.
+# @param    port    - First loopback port used by the endpoints.
+# @param    window  - Send and receive window of both endpoints, in bytes.
+#
+# @return   None, prints the wall time and the sender and receiver CPU time in seconds.
+def measure(tcp_dir, size, mss, port, window):
+    sys.path.insert(0, tcp_dir)
+    import lib.tcp.tcp as tcp
+    tcp.DEBUG = False
+
+    data                    = bytearray(os.urandom(size))
+    ready_read, ready_write = os.pipe()
+    done_read, done_write   = os.pipe()
+    if os.fork() == 0:
+        server = tcp.TCP("127.0.0.1", port, "127.0.0.1", port + 1, mss, send_window=window, recv_window=window)
+        os.write(ready_write, b"1")
+        start_cpu = time.process_time()
+        received  = server.recv()
+        cpu       = time.process_time() - start_cpu
+        os.write(done_write, f"{int(received == data)} {cpu}".encode())
+        os._exit(0)     # Timers of the closed connection may still be pending.
+
+    os.read(ready_read, 1)
+    client = tcp.TCP("127.0.0.1", port + 1, "127.0.0.1", port, mss, send_window=window, recv_window=window)
+
+    start_wall = time.perf_counter()
+    start_cpu  = time.process_time()
+    client.connect()
+    client.send(data)
+    client.close()
+    cpu = time.process_time() - start_cpu
+    received, receiver_cpu = os.read(done_read, 64).decode().split()
+    wall = time.perf_counter() - start_wall
+    os.wait()
+
+    assert received == "1"
+    print(f"{wall} {cpu} {receiver_cpu}", flush=True)
+    os._exit(0)
+
+##
+# @fn       checkout
+# @brief    Extracts the tcp directory of a git revision into a temporary directory, to measure the
+#           implementation before a change.
+#
+# @return   Returns the path of the extracted tcp directory.
+def checkout(revision, directory):
+    archive = subprocess.run(["git", "-C", ROOT, "archive", revision, "tcp"], capture_output=True, check=True).stdout
+    subprocess.run(["tar", "-x", "-C", directory], input=archive, check=True)
+    return os.path.join(directory, "tcp")
+
+def run(tcp_dir, size, mss, port, window):
+    output = subprocess.run([sys.executable, os.path.realpath(__file__), "--measure", tcp_dir, "--size", str(size), "--mss", str(mss), "--port", str(port),
+                             "--window", str(window)],
+                            capture_output=True, text=True, check=True).stdout
+    wall, sender_cpu, receiver_cpu = (float(value) for value in output.split()[-3:])
+    return wall, sender_cpu, receiver_cpu
+
+def main(args):
+    with tempfile.TemporaryDirectory() as directory:
+        trees = [("after", os.path.join(ROOT, "tcp"))]
+        if args.baseline:
+            trees.insert(0, (f"before ({args.baseline})", checkout(args.baseline, directory)))
+
+        port = args.port
+        for name, tcp_dir in trees:
+            walls, senders, receivers = [], [], []
+            for _ in range(args.repeats):
+                wall, sender_cpu, receiver_cpu = run(tcp_dir, args.size, args.mss, port, args.window)
+                walls.append(wall)
+                senders.append(sender_cpu)
+                receivers.append(receiver_cpu)
+                port += 2
+            megabytes = args.size / 1e6
+            print(f"{name}: wall = {sum(walls) / len(walls):.3f}s, "
+                  f"sender cpu_s_per_MB = {sum(senders) / len(senders) / megabytes:.3f}, "
+                  f"receiver cpu_s_per_MB = {sum(receivers) / len(receivers) / megabytes:.3f}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="CPU seconds per MB of a loopback TCP transfer, optionally against an earlier revision.")
+    parser.add_argument("--baseline",   help="Git revision to measure before the working tree, e.g. HEAD~1.")
+    parser.add_argument("--size",       type=int, default=2_000_000, help="Number of bytes in each transfer.")
+    parser.add_argument("--mss",        type=int, default=5000, help="Data bytes per segment, matching tcp_client.py.")
+    parser.add_argument("--window",     type=int, default=65535, help="Send and receive window of both endpoints, in bytes.")
+    parser.add_argument("--repeats",    type=int, default=3)
+    parser.add_argument("--port",       type=int, default=58000)
+    parser.add_argument("--measure",    help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.measure:
+        measure(args.measure, args.size, args.mss, args.port, args.window)
+    else:
+        main(args)
@@ -0,0 +1,221 @@
+#!/usr/bin/env python3
+import argparse
+import collections
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+ROOT = os.path.join(os.path.dirname(os.path.realpath(__file__)), "..")
+
+##
+# @class    PatternLossSocket
+# @brief    Wrapper for the sending socket of a TCP endpoint that drops chosen data segments the first time
+#           they are sent, so every run sees the same losses. Segment i of the transfer is dropped when
+#           i % period is in drops. Resent segments are always delivered.
+class PatternLossSocket:
+    def __init__(self, sock, endpoint, mss, period, drops):
+        self._sock      = sock
+        self._endpoint  = endpoint
+        self._mss       = mss
+        self._period    = period
+        self._drops     = drops
+        self._sent      = set()     # Sequence numbers of the segments sent at least once.
+        self.dropped    = 0
+
+    def __getattr__(self, name):
+        return getattr(self._sock, name)
+
+    def sendto(self, packet, address):
+        # Handshake and FIN packets carry no data and are always delivered.
+        if len(packet) > 60:
+            seq_no = int.from_bytes(bytes(packet[4:8]), "big") - self._endpoint._client_isn
+            if (not seq_no in self._sent) and (((seq_no // self._mss) % self._period) in self._drops):
+                self._sent.add(seq_no)
+                self.dropped += 1
+                return len(packet)
+            self._sent.add(seq_no)
+        return self._sock.sendto(packet, address)
+
+##
+# @class    LinkSocket
+# @brief    Wrapper for the sending socket of a TCP endpoint that emulates a bottleneck link: packets are
+#           serialised at a fixed rate through a drop-tail queue holding a limited number of packets, then
+#           held for a fixed propagation delay before being sent. Packets arriving to a full queue are dropped,
+#           as bursts are by a router or a full receive buffer. Packets are sent in order by a background thread.
+class LinkSocket:
+    def __init__(self, sock, delay, rate, queue):
+        self._sock      = sock
+        self._delay     = delay
+        self._rate      = rate                      # Link rate in bytes per second, 0 for no rate limit.
+        self._queue_len = queue
+        self._queued    = collections.deque()       # Times at which the packets in the link queue finish serialising.
+        self._pending   = collections.deque()       # Packets awaiting their send time, as (time, packet, address).
+        self._pending_c = threading.Condition()
+        self.dropped    = 0
+        threading.Thread(target=self._run, daemon=True).start()
+
+    def __getattr__(self, name):
+        return getattr(self._sock, name)
+
+    def sendto(self, packet, address):
+        now  = time.perf_counter()
+        sent = now
+        if self._rate > 0:
+            while self._queued and (self._queued[0] <= now):
+                self._queued.popleft()
+            if len(self._queued) >= self._queue_len:
+                self.dropped += 1
+                return len(packet)
+            sent = (max(now, self._queued[-1]) if self._queued else now) + (len(packet) / self._rate)
+            self._queued.append(sent)
+
+        with self._pending_c:
+            self._pending.append(((sent + self._delay), bytes(packet), address))
+            self._pending_c.notify()
+        return len(packet)
+
+    def _run(self):
+        while True:
+            with self._pending_c:
+                while not self._pending:
+                    self._pending_c.wait()
+                due, packet, address = self._pending.popleft()
+            time.sleep(max(0, (due - time.perf_counter())))
+            self._sock.sendto(packet, address)
+
+##
+# @fn       measure
+# @brief    Transfers data between two TCP endpoints over loopback, dropping data segments of the sender in
+#           a fixed pattern, and prints the time taken to deliver the data and the number of segments the
+#           sender resent. The transfer ends when the sender learns that the last byte was acknowledged, not
+#           when send() returns, which waits for the ACK receiving thread to time out.
+#
+# @param    tcp_dir - Directory containing the lib.tcp package to measure.
+# @param    size    - Number of bytes to transfer.
+# @param    mss     - Data bytes per segment.
+# @param    port    - First loopback port used by the endpoints.
+# @param    period  - Number of segments after which the loss pattern repeats.
+# @param    drops   - Set of segment indices within each period that are dropped.
+# @param    link    - Tuple of the delay in seconds, rate in bytes per second and queue length in packets of
+#                     the link emulated for the packets of the sender, or None to send them directly.
+# @param    options - Dictionary of further keyword arguments for both endpoints.
+#
+# @return   None, prints the transfer time in seconds, the retransmissions, the dropped segments and the
+#           packets dropped by the link queue.
+def measure(tcp_dir, size, mss, port, period, drops, link, options):
+    sys.path.insert(0, tcp_dir)
+    import lib.tcp.tcp as tcp
+    tcp.DEBUG = False
+
+    data   = bytearray(os.urandom(size))
+    result = {}
+    server = tcp.TCP("127.0.0.1", port, "127.0.0.1", port + 1, mss, **options)
+    client = tcp.TCP("127.0.0.1", port + 1, "127.0.0.1", port, mss, **options)
+    link_sock = None
+    if not link is None:
+        client._send_sock = link_sock = LinkSocket(client._send_sock, *link)
+    client._send_sock = PatternLossSocket(client._send_sock, client, mss, period, drops)
+
+    def receive():
+        result["data"] = server.recv()
+
+    server_t = threading.Thread(target=receive, daemon=True)
+    server_t.start()
+
+    def acknowledged():
+        client._send_complete_f.wait()
+        result["acknowledged"] = time.perf_counter()
+
+    acknowledged_t = threading.Thread(target=acknowledged, daemon=True)
+    acknowledged_t.start()
+
+    start = time.perf_counter()
+    client.connect()
+    client.send(data)
+    acknowledged_t.join()
+    elapsed = result["acknowledged"] - start
+    client.close()
+    server_t.join()
+
+    assert result["data"] == data
+    print(f"{elapsed} {client.retransmissions} {client._send_sock.dropped} {0 if (link_sock is None) else link_sock.dropped}", flush=True)
+    os._exit(0)     # Timers of the closed connection may still be pending.
+
+##
+# @fn       checkout
+# @brief    Extracts the tcp directory of a git revision into a temporary directory, to measure the
+#           implementation before a change.
+#
+# @return   Returns the path of the extracted tcp directory.
+def checkout(revision, directory):
+    archive = subprocess.run(["git", "-C", ROOT, "archive", revision, "tcp"], capture_output=True, check=True).stdout
+    subprocess.run(["tar", "-x", "-C", directory], input=archive, check=True)
+    return os.path.join(directory, "tcp")
+
+def run(tcp_dir, args, port):
+    output = subprocess.run([sys.executable, os.path.realpath(__file__), "--measure", tcp_dir, "--size", str(args.size), "--mss", str(args.mss),
+                             "--port", str(port), "--period", str(args.period), "--drops", args.drops]
+                            + (["--congestion-control", args.congestion_control] if args.congestion_control else [])
+                            + (["--delay", str(args.delay), "--rate", str(args.rate), "--queue", str(args.queue)] if (args.delay or args.rate) else [])
+                            + (["--window", str(args.window)] if args.window else [])
+                            + (["--pacing", "--pacing-burst", str(args.pacing_burst)] if args.pacing else [])
+                            + (["--no-hystart"] if args.no_hystart else []),
+                            capture_output=True, text=True, check=True).stdout
+    elapsed, retransmissions, dropped, queue_drops = output.split()[-4:]
+    return float(elapsed), int(retransmissions), int(dropped), int(queue_drops)
+
+def main(args):
+    with tempfile.TemporaryDirectory() as directory:
+        trees = [("after", os.path.join(ROOT, "tcp"))]
+        if args.baseline:
+            trees.insert(0, (f"before ({args.baseline})", checkout(args.baseline, directory)))
+
+        port = args.port
+        for name, tcp_dir in trees:
+            times, retransmissions, queue_drops = [], [], []
+            for _ in range(args.repeats):
+                elapsed, resent, dropped, queue_dropped = run(tcp_dir, args, port)
+                times.append(elapsed)
+                retransmissions.append(resent)
+                queue_drops.append(queue_dropped)
+                port += 2
+            elapsed = sum(times) / len(times)
+            print(f"{name}: time = {elapsed:.3f}s, goodput = {(args.size * 8) / elapsed / 1e6:.2f} Mbit/s, "
+                  f"dropped = {dropped}, queue drops = {sum(queue_drops) / len(queue_drops):.1f}, "
+                  f"retransmissions = {sum(retransmissions) / len(retransmissions):.1f}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Goodput of a loopback TCP transfer under a repeatable loss pattern, optionally against an earlier revision.")
+    parser.add_argument("--baseline",   help="Git revision to measure before the working tree, e.g. HEAD~1.")
+    parser.add_argument("--size",       type=int, default=2_000_000, help="Number of bytes in each transfer.")
+    parser.add_argument("--mss",        type=int, default=1000, help="Data bytes per segment.")
+    parser.add_argument("--period",     type=int, default=50, help="Number of segments after which the loss pattern repeats.")
+    parser.add_argument("--drops",      default="10", help="Comma separated segment indices within each period that are dropped, e.g. 10,12,14.")
+    parser.add_argument("--congestion-control", help="Congestion control algorithm of both endpoints, e.g. cubic. Not accepted by revisions without pluggable congestion control.")
+    parser.add_argument("--delay",      type=float, default=0, help="Seconds each packet of the sender is delayed by, emulating a longer path.")
+    parser.add_argument("--rate",       type=float, default=0, help="Rate of the emulated link in Mbit/s, 0 for no limit.")
+    parser.add_argument("--queue",      type=int, default=20, help="Packets held by the drop-tail queue of a rate limited link.")
+    parser.add_argument("--window",     type=int, help="Send and receive window of both endpoints in bytes. Windows above 65535 need window scaling.")
+    parser.add_argument("--pacing",     action="store_true", help="Pace the sender. Not accepted by revisions without pacing.")
+    parser.add_argument("--pacing-burst", type=int, default=4, help="Segments the paced sender may send back to back.")
+    parser.add_argument("--no-hystart", action="store_true", help="End the initial slow start only on a loss. Not accepted by revisions without HyStart++.")
+    parser.add_argument("--repeats",    type=int, default=3)
+    parser.add_argument("--port",       type=int, default=58200)
+    parser.add_argument("--measure",    help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.measure:
+        options = {"congestion_control": args.congestion_control} if args.congestion_control else {}
+        if args.window:
+            options.update(send_window=args.window, recv_window=args.window)
+        if args.pacing:
+            options.update(pacing=True, pacing_burst=args.pacing_burst)
+        if args.no_hystart:
+            options.update(hystart=False)
+        link = (args.delay, (args.rate * 1e6 / 8), args.queue) if (args.delay or args.rate) else None
+        measure(args.measure, args.size, args.mss, args.port, args.period, {int(index) for index in args.drops.split(",")}, link, options)
+    else:
+        main(args)
@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+import gc
+import os
+import socket
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.realpath(__file__)), "..", "tcp"))
+
+from lib.tcp.components.tcp_packet import TCP_Packet, HEADER_LEN
+from lib.tcp.components.packet_pool import TCP_PacketPool
+
+RECV_SIZE = 10000 + HEADER_LEN     # Receive size used by TCP._recv_data.
+
+##
+# @class    GCTimer
+# @brief    Class used to accumulate the number of garbage collections and the time spent in them.
+class GCTimer:
+    def __init__(self):
+        self.collections = 0
+        self.time        = 0.0
+        self._start      = 0.0
+
+    def __call__(self, phase, info):
+        if phase == "start":
+            self._start = time.perf_counter()
+        else:
+            self.collections += 1
+            self.time        += time.perf_counter() - self._start
+
+##
+# @fn       recv_allocate
+# @brief    Receive path prior to the packet pool: a new TCP_Packet is created for every datagram.
+def recv_allocate(sock, pool, count):
+    queue = []
+    for _ in range(count):
+        packet, _           = sock.recvfrom(RECV_SIZE)
+        tcp_packet          = TCP_Packet(0, 0, 0, 0, 0, None)
+        tcp_packet.packet   = packet
+        queue.append(tcp_packet)
+    return queue
+
+##
+# @fn       recv_pool
+# @brief    Receive path using the packet pool: datagrams are received directly into pooled packets.
+def recv_pool(sock, pool, count):
+    queue = []
+    for _ in range(count):
+        tcp_packet = pool.acquire()
+        tcp_packet.receive(sock)
+        queue.append(tcp_packet)
+    return queue
+
+##
+# @fn       process
+# @brief    Consumes the queued packets in the same way as TCP._process_recv_buffer.
+def process(queue, pool, data_buffer, release):
+    for tcp_packet in queue:
+        if tcp_packet.is_valid():
+            data_buffer[0:len(tcp_packet.data)] = tcp_packet.data
+        if release:
+            pool.release(tcp_packet)
+
+##
+# @fn       run
+# @brief    Sends packets over loopback in batches of queue_depth datagrams, and receives each batch with the
+#           given receive path before processing it, modelling a backlog in the TCP receive buffer.
+#
+# @return   Returns a dictionary of the measured results.
+def run(name, recv, packets, queue_depth, mss, trace):
+    send_sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    recv_sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    recv_sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, 4 * 1024 * 1024)
+    recv_sock.bind(("127.0.0.1", 0))
+    address     = recv_sock.getsockname()
+    segment     = bytes(TCP_Packet(55000, 54000, 1, 1, 65535, os.urandom(mss), ack=1).packet)
+    pool        = TCP_PacketPool(queue_depth, RECV_SIZE)
+    data_buffer = bytearray(mss)
+    release     = recv is recv_pool
+    gc_timer    = GCTimer()
+    blocks      = 0
+    traced      = 0
+
+    gc.collect()
+    gc.callbacks.append(gc_timer)
+    if trace:
+        tracemalloc.start()
+    start_cpu  = time.process_time()
+    start_wall = time.perf_counter()
+    for _ in range(packets // queue_depth):
+        for _ in range(queue_depth):
+            send_sock.sendto(segment, address)
+
+        # Count the allocations made by the receive path while the batch is queued.
+        start_blocks = sys.getallocatedblocks()
+        start_traced = tracemalloc.get_traced_memory()[0] if trace else 0
+        queue        = recv(recv_sock, pool, queue_depth)
+        blocks      += sys.getallocatedblocks() - start_blocks
+        traced      += (tracemalloc.get_traced_memory()[0] - start_traced) if trace else 0
+
+        process(queue, pool, data_buffer, release)
+        del queue
+    wall = time.perf_counter() - start_wall
+    cpu  = time.process_time() - start_cpu
+    if trace:
+        tracemalloc.stop()
+    gc.callbacks.remove(gc_timer)
+
+    send_sock.close()
+    recv_sock.close()
+    received = (packets // queue_depth) * queue_depth
+    return {
+        "path":                 name,
+        "packets":              received,
+        "us_per_packet":        round(1e6 * wall / received, 2),
+        "cpu_us_per_packet":    round(1e6 * cpu / received, 2),
+        "blocks_per_packet":    round(blocks / received, 2),
+        "bytes_per_packet":     round(traced / received, 1) if trace else None,
+        "gc_collections":       gc_timer.collections,
+        "gc_ms":                round(1e3 * gc_timer.time, 3),
+    }
+
+def main(packets, queue_depth, mss):
+    # Keep a population of long-lived objects so that collections have realistic cost.
+    heap = [[i] for i in range(200_000)]
+
+    for trace in (False, True):
+        print("tracemalloc enabled (timings inflated):" if trace else "timings:")
+        for name, recv in (("allocate", recv_allocate), ("pool", recv_pool)):
+            result = run(name, recv, packets, queue_depth, mss, trace)
+            print("  " + ", ".join(f"{k} = {v}" for k, v in result.items() if (v is not None)))
+    del heap
+
+if __name__ == "__main__":
+    packets     = 20000     # Number of datagrams received by each receive path.
+    queue_depth = 256       # Number of datagrams queued in the receive buffer before processing.
+    mss         = 5000      # Data bytes per segment, matching tcp_client.py.
+    main(packets, queue_depth, mss)
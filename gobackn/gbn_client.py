@@ -16,13 +16,14 @@ def main(option, error, timeout, window):
 
     # Run this version if the operating system is Windows based.
     if os.name == "nt":
-        packets = Packets.file2packets("client_data\\test.bmp", 1000)
+        packets = PacketSource("client_data\\test.bmp", 1000)
     # Run this version in all other cases. Should cover all TA operating systems.
     else:
-        packets = Packets.file2packets("client_data/test.bmp", 1000)
+        packets = PacketSource("client_data/test.bmp", 1000)
 
     print("Sending data...")
     rdtclient.send(packets)
+    packets.close()
     print("\nSending complete.")
     
     
\ No newline at end of file
@@ -0,0 +1,58 @@
+#!/usr/bin/env python3
+import struct
+from .integrity import INTERNET_CHECKSUM
+
+SEGMENT_HEADER      = struct.Struct('!II')      # State number and total number of packets in the transfer.
+
+##
+# @fn       encode_segments
+#
+# @brief    This function adds the message header and integrity value to a list of packets in one pass,
+#           writing every encoded packet into a single contiguous buffer.
+#
+# @param    packets         - List of byte objects containing packet data.
+# @param    transfer_size   - Total number of packets in the transfer.
+# @param    first_state     - (optional) State number of the first packet in the list.
+# @param    integrity       - (optional) Integrity algorithm used to calculate the value appended to each packet.
+#
+# @return   Returns a list of memoryview objects, one for each encoded packet, referencing the shared buffer.
+#
+# @note     Packet Structure:
+# |            |             Data              |
+# |    Byte    | 7 | 6 | 5 | 4 | 3 | 2 | 1 | 0 |
+# |           0|       State Number [31:24]    | Header
+# |           1|       State Number [23:16]    | Header
+# |           2|       State Number [15:8]     | Header
+# |           3|       State Number [7:0]      | Header
+# |           4|       Packet Count [31:24]    | Total # of Packets in Transfer
+# |           5|       Packet Count [23:16]    | Total # of Packets in Transfer
+# |           6|       Packet Count [15:8]     | Total # of Packets in Transfer
+# |           7|       Packet Count [7:0]      | Total # of Packets in Transfer
+# |           8|              Data             |
+# |         ...|              Data             |
+# |         N-2|              Data             |
+# |         N-1|         Checksum[15:8]        | Checksum
+# |           N|         Checksum[7:0]         | Checksum
+#
+# @note     The checksum shown is the 2 byte Internet checksum. A CRC32C value occupies the last 4 bytes
+#           of the packet instead, and no bytes are added when the integrity algorithm is "none".
+def encode_segments(packets, transfer_size, first_state=0, integrity=INTERNET_CHECKSUM):
+    overhead = SEGMENT_HEADER.size + integrity.size     # Number of header and integrity bytes added to each packet.
+    buffer   = bytearray(sum(len(packet) for packet in packets) + (overhead * len(packets)))
+    view     = memoryview(buffer)
+    segments = []
+    start    = 0
+
+    for state, packet in enumerate(packets, first_state):
+        data_start = start + SEGMENT_HEADER.size
+        cs_start   = data_start + len(packet)
+        cs_end     = cs_start + integrity.size
+
+        SEGMENT_HEADER.pack_into(buffer, start, state, transfer_size)           # FSM state and number of packets.
+        view[data_start:cs_start]   = packet                                    # Packet data.
+        view[cs_start:cs_end]       = integrity.calculate(view[start:cs_start]) # Integrity value calculation.
+
+        segments.append(view[start:cs_end])
+        start = cs_end
+
+    return segments
@@ -1,15 +1,16 @@
 import socket
 import threading
 from time import time
-from .components.checksum import *
 from .components.fault_injection import *
+from .components.segment_encoder import *
+from .components.integrity import get_integrity
 
 DEBUG = False
 
 class GoBackN:
     ACK = 0x00
 
-    def __init__(self, send_address, send_port, recv_address, recv_port, window_size, mss=500,corruption=0, corruption_option=[1, 2, 3], loss=0, loss_option=[1, 2, 3], timeout=None):
+    def __init__(self, send_address, send_port, recv_address, recv_port, window_size, mss=500,corruption=0, corruption_option=[1, 2, 3], loss=0, loss_option=[1, 2, 3], timeout=None, integrity="internet"):
         # Public Parameters
         self.base           = 0             ## Base index of the sending window used by GBN and SR protocols.
         self.window_size    = window_size   ## Sending window size used by GBN and SR protocols.
@@ -25,6 +26,12 @@ class GoBackN:
         self.loss_option        = loss_option       ## List of selected debug options. 1=No Packet Loss, 2=ACK Packet Loss, 3=Data Packet Loss.
         self.timeout            = timeout           ## Time in seconds before a connection is considered to have experienced a timeout.
 
+        # Public Parameters (Integrity)
+        self.integrity          = get_integrity(integrity)  ## Integrity algorithm appended to each packet: "internet", "crc32c" or "none".
+
+        # Public Parameters (Statistics)
+        self.retransmissions    = 0                 ## Number of packets sent again, including sends dropped by fault injection.
+
         # Private Parameters
         self._seqnum             = 0
         self._ack_pending_timers = []
@@ -90,7 +97,7 @@ class GoBackN:
             cs                      = int.from_bytes(cs, 'big')             # Packet checksum.
 
             # Verify the integrity of the received packet.
-            if verify_checksum(packet) and ((not ((packet_corrupted(self.corruption)) and (3 in self.corruption_option))) or (1 in self.corruption_option)):
+            if self.integrity.verify(packet) and ((not ((packet_corrupted(self.corruption)) and (3 in self.corruption_option))) or (1 in self.corruption_option)):
                 total_packets = int.from_bytes(packet_cnt, 'big')  # Total number of packets in the transfer.
 
                 # When the data packet's sequence number is equal to the base number, buffer the data,
@@ -122,6 +129,11 @@ class GoBackN:
     def _send(self, data):
         self.base   = 0
         self.seqnum = 0
+        sent_end    = 0     # Sequence number following the last packet sent for the first time.
+
+        # Encode every packet in the transfer in a single pass before sending, so retransmissions
+        # of a packet reuse the same encoded segment.
+        segments = encode_segments(data, len(data), integrity=self.integrity)
 
         while True:
             # Calculate the end of the data send window based on the current base value, and the configured 
@@ -140,7 +152,13 @@ class GoBackN:
             # packet of the sending window has been properly ACK'd, the sequence will add a new packet to the 
             # sending window.
             while self.seqnum < window_end:
-                packet = self._add_header(data[self.seqnum], self.seqnum, len(data))
+                packet = segments[self.seqnum]
+
+                # Packets below sent_end are being resent after a timeout reset the sequence number.
+                if self.seqnum < sent_end:
+                    self.retransmissions += 1
+                else:
+                    sent_end = self.seqnum + 1
 
                 if DEBUG: 
                     print(f"GBN: Sending Packet {self.seqnum}/{len(data) - 1}")
@@ -213,7 +231,7 @@ class GoBackN:
             
             # If the checkusm is invalid for the received packet, discard the received packet
             # and wait to receive more ACKs from the receiving host.
-            if (not verify_checksum(packet)) or (packet_corrupted(self.corruption) and (2 in self.corruption_option) and (not 1 in self.corruption_option)) and (header != total_packets):
+            if (not self.integrity.verify(packet)) or (packet_corrupted(self.corruption) and (2 in self.corruption_option) and (not 1 in self.corruption_option)) and (header != total_packets):
                 if DEBUG:
                     print(f"GBN: Checksum invalid.")
                 continue
@@ -311,7 +329,7 @@ class GoBackN:
     # @param    packet  - A byte array object containing packet data.
     #
     # @return   Returns the input packet with the header appended to the front of the message, and the
-    #           packet checksum appended to the end of the message.
+    #           packet checksum appended to the end of the message, as a memoryview object.
     #
     # @note     Packet Structure:
     # |            |             Data              |
@@ -329,12 +347,8 @@ class GoBackN:
     # |         N-2|              Data             |  
     # |         N-1|         Checksum[15:8]        | Checksum
     # |           N|         Checksum[7:0]         | Checksum
-    def _add_header(self, packet, state, transfer_size):        
-        header   = state.to_bytes(4, byteorder='big')                   # FSM State.
-        header   = header + transfer_size.to_bytes(4, byteorder='big')  # Number of total packets in the transfer.
-        cs       = checksum(header + packet)                         # Checksum calculation.
-
-        return header + packet + cs
+    def _add_header(self, packet, state, transfer_size):
+        return encode_segments([packet], transfer_size, state, self.integrity)[0]
 
     ##
     # @fn       _parse_packet
@@ -346,6 +360,7 @@ class GoBackN:
     def _parse_packet(self, packet):
         header          = packet[0:4]                  # Extract the header bytes.
         total_packets   = packet[4:8]                  # Extract the total number of packets in the transfer.
-        data            = packet[8:(len(packet) - 2)]  # Extract the packet application data.
-        cs              = packet[-2:]                  # Extract the packet checksum bytes.
+        cs_start        = len(packet) - self.integrity.size
+        data            = packet[8:cs_start]           # Extract the packet application data.
+        cs              = packet[cs_start:]            # Extract the packet integrity bytes.
         return header, total_packets, data, cs
\ No newline at end of file
@@ -7,13 +7,14 @@ if __name__ == "__main__":
 
     # Run this version if the operating system is Windows based.
     if os.name == "nt":
-        packets = Packets.file2packets("client_data\\test.bmp", 1024)
+        packets = PacketSource("client_data\\test.bmp", 1024)
     # Run this version in all other cases. Should cover all TA operating systems.
     else:
-        packets = Packets.file2packets("client_data/test.bmp", 1024)
+        packets = PacketSource("client_data/test.bmp", 1024)
 
     print("Sending data...")
     rdtclient.send(packets)
+    packets.close()
     print("Sending complete.")
     
     
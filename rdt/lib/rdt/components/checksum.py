@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+
+##
+# @fn       ones_complement_sum
+#
+# @brief    This function calculates the folded 16-bit one's complement sum of a packet. The packet is
+#           treated as a series of big-endian 16-bit words, with a trailing odd byte added as-is.
+#
+# @param    packet  - Data packet formatted as a bytes-like object.
+#
+# @return   Returns the folded sum as an integer in the range 0x0000-0xFFFF. A sum of 0x0000 is only
+#           returned when every byte in the packet is zero.
+#
+# @note     The words are summed in bulk by reading the packet as one big-endian integer. Since
+#           0x10000 is congruent to 1 modulo 0xFFFF, that integer is congruent to the sum of its
+#           16-bit words, so the end-around carry fold reduces to a single modulo operation.
+def ones_complement_sum(packet):
+    if len(packet) & 1:
+        sum_ = int.from_bytes(packet[:-1], 'big') + packet[-1]
+    else:
+        sum_ = int.from_bytes(packet, 'big')
+
+    # An all-zero packet is the only input whose folded sum is 0x0000, every
+    # other input folds into the range 0x0001-0xFFFF.
+    if sum_ == 0:
+        return 0
+
+    sum_ %= 0xFFFF
+    return sum_ if sum_ else 0xFFFF
+
+##
+# @fn       checksum
+#
+# @brief    This function calculates the checksum value of a packet that is used to validate
+#           the integrity of the data within the packet.
+#
+# @param    packet  - Data packet formatted as bytes.
+#
+# @return   Returns a checksum value as a bytes object.
+def checksum(packet):
+    return (0xFFFF - ones_complement_sum(packet)).to_bytes(2, 'big')
+
+##
+# @fn       update_checksum
+#
+# @brief    This function incrementally updates a checksum after part of the packet has changed,
+#           following RFC 1624 (HC' = ~(~HC + ~m + m')), without re-reading the rest of the packet.
+#
+# @param    cs      - Current checksum of the packet as a bytes object.
+# @param    old     - Previous contents of the changed region of the packet.
+# @param    new     - Current contents of the changed region of the packet.
+#
+# @return   Returns the updated checksum value as a bytes object.
+#
+# @note     The changed region must start at an even offset in the packet and contain the same
+#           number of bytes in old and new, padded out to whole 16-bit words. The packet must not be
+#           entirely zero, which always holds for a packet with a header, so the result is identical
+#           to recalculating the checksum over the whole packet.
+def update_checksum(cs, old, new):
+    sum_ = (0xFFFF - int.from_bytes(cs, 'big')) + (0xFFFF - ones_complement_sum(old)) + ones_complement_sum(new)
+    sum_ %= 0xFFFF
+    return (0xFFFF - (sum_ if sum_ else 0xFFFF)).to_bytes(2, 'big')
+
+##
+# @fn       verify_checksum
+#
+# @brief    This function is used to extract the packet checksum and verify the data integrity
+#           of the data packet.
+#
+# @param    packet  - Data packet formatted as bytes that contains a header and checksum.
+#
+# @ return  Returns a True value if the checksum value is correct.
+#           Returns a False value if the checksum value is incorrect.
+def verify_checksum(packet):
+    packet_data = packet[:-2]                   # Extract the data and header without the checksum.
+    packet_cs   = packet[-2:]                   # Extract the original checksum.
+    cs          = checksum(packet_data)   # Recalculate the checksum to check against the original checksum.
+
+    # Check if the two checksum values match and return a status.
+    if packet_cs == cs:
+        return True
+    else:
+        return False
+
+if __name__ == "__main__":
+    '\x00\x00\x00\t\x00\x03\xb0\x00\x00O\xf3'
+    packet = int(0x12345678).to_bytes(4, 'big')
+    cs = checksum(packet)
+    print(cs)
+    verify = checksum(packet + cs)
+    print(verify)
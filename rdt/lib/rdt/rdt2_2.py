@@ -1,6 +1,7 @@
 #!/usr/bin/env python3
 from random import randrange
 import socket
+from .components import checksum as cslib
 
 ##
 # @class    RDT2_2
@@ -322,34 +323,7 @@ class RDT2_2:
     #
     # @return   Returns a checksum value as a bytes object.
     def _checksum(self, packet):
-        sum_ = 0
-        k = 16
-
-        # Divide a packet into 2 bytes (16 bits) and calculate the sum of a packet
-        for i in range(0, len(packet), 2):
-            sum_ += int.from_bytes(packet[i:i + 2], 'big')
-    
-        sum_ = bin(sum_)[2:]  # Change to binary
-    
-        # Add the overflow bits
-        while len(sum_) != k:
-            if len(sum_) > k:
-                x = len(sum_) - k
-                sum_ = bin(int(sum_[0:x], 2) + int(sum_[x:], 2))[2:]
-            if len(sum_) < k:
-                sum_ = '0' * (k - len(sum_)) + sum_
-    
-        # Calculate the complement of sum_
-        checksum = ''
-        for i in sum_:
-            if i == '1':
-                checksum += '0'
-            else:
-                checksum += '1'
-    
-        # Convert 8 bits into 1 byte
-        checksum = bytes(int(checksum[i: i + 8], 2) for i in range(0, len(checksum), 8))
-        return checksum
+        return cslib.checksum(packet)
 
     def _verify_checksum(self, packet):
         packet_data = packet[:-2]                   # Extract the data and header without the checksum.
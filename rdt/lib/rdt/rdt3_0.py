@@ -1,6 +1,7 @@
 #!/usr/bin/env python3
 from random import randrange
 import socket
+from .components.integrity import get_integrity
 
 DEBUG = True
 
@@ -14,6 +15,7 @@ DEBUG = True
 # @param    recv_address    - Address used by the receiving socket.
 # @param    recv_port       - Port used by the receiving socket.
 # @param    packet_size     - Number of bytes in each packet that will be sent and received.
+# @param    integrity       - (optional) Integrity algorithm appended to each packet: "internet", "crc32c" or "none".
 #
 # @return   None.
 class RDT3_0:
@@ -23,10 +25,11 @@ class RDT3_0:
     ##
     # @fn       __init__
     # @brief    Constructor for the RDT3_0 class.
-    def __init__(self, send_address, send_port, recv_address, recv_port, packet_size=1024, corruption=0, corruption_option=[1, 2, 3], loss=0, loss_option=[1, 2, 3], timeout=None):
+    def __init__(self, send_address, send_port, recv_address, recv_port, packet_size=1024, corruption=0, corruption_option=[1, 2, 3], loss=0, loss_option=[1, 2, 3], timeout=None, integrity="internet"):
+        self.integrity    = get_integrity(integrity)    ## Integrity algorithm used to validate each packet.
         self._state       = 0               ## State used for packet retransmission, can be 0 or 1.
         self._prev_state  = 1               ## Previous state of the FSM used for packet retransmission, can be 0 or 1.
-        self._header_size = 3               ## Number of bytes contained in the packet header.
+        self._header_size = 1 + self.integrity.size ## Number of header and integrity bytes added to each packet.
 
         self.send_address       = send_address      ## Address of the sending socket.
         self.recv_address       = recv_address      ## Address of the receiving socket.
@@ -37,6 +40,7 @@ class RDT3_0:
         self.corruption_option  = corruption_option ## List of selected debug options. 1=No Packet Corruption, 2=ACK Packet Corruption, 3=Data Packet Corruption.
         self.loss               = loss              ## Packet loss percentage used for debug.
         self.loss_option        = loss_option       ## List of selected debug options. 1=No Packet Loss, 2=ACK Packet Loss, 3=Data Packet Loss.
+        self.retransmissions    = 0                 ## Number of packets sent again, including sends dropped by fault injection.
 
         self.send_sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)   ## Sending socket.
         self.recv_sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)   ## Receiving socket.
@@ -56,10 +60,16 @@ class RDT3_0:
     def send(self, packets):
         packet_idx = 0
         retries    = 0
+        sent       = False  # Set once the packet count has been sent.
+        sent_idx   = None   # Index of the last packet sent.
 
         # Gets the number of packets to send based on the length of the packet list
         # and sends that value to the receiving side.
         while True: 
+            if sent:
+                self.retransmissions += 1
+            sent = True
+
             if not DEBUG:
                 print(f"RDT3.0: (Retry {retries}) Sending packet count = {len(packets)}" + (" " * 5), end="\r", flush=True)
             else:
@@ -91,6 +101,10 @@ class RDT3_0:
         
         # Iterate over the packet list and send each packet to the receiving end.
         while packet_idx < len(packets):
+            if packet_idx == sent_idx:
+                self.retransmissions += 1
+            sent_idx = packet_idx
+
             if not DEBUG:
                 print(f"RDT3.0: (Retry {retries}) Sending packet {packet_idx}/{len(packets) - 1} to receiving process" + (" " * 5), end="\r", flush=True)
             else:
@@ -304,8 +318,9 @@ class RDT3_0:
     # @return   Returns the header, data, and checksum fields of the packet.
     def _parse_packet(self, packet):
         header   = packet[0]                    # Extract the header bytes.
-        data     = packet[1:(len(packet) - 2)]  # Extract the packet application data.
-        checksum = packet[-2:]                  # Extract the packet checksum bytes.
+        cs_start = len(packet) - self.integrity.size
+        data     = packet[1:cs_start]           # Extract the packet application data.
+        checksum = packet[cs_start:]            # Extract the packet integrity bytes.
         return header, data, checksum
     
     ##
@@ -382,45 +397,10 @@ class RDT3_0:
     #
     # @return   Returns a checksum value as a bytes object.
     def _checksum(self, packet):
-        sum_ = 0
-        k    = 16
-
-        # Divide a packet into 2 bytes (16 bits) and calculate the sum of a packet
-        for i in range(0, len(packet), 2):
-            sum_ += int.from_bytes(packet[i:i + 2], 'big')
-    
-        sum_ = bin(sum_)[2:]  # Change to binary
-    
-        # Add the overflow bits
-        while len(sum_) != k:
-            if len(sum_) > k:
-                x = len(sum_) - k
-                sum_ = bin(int(sum_[0:x], 2) + int(sum_[x:], 2))[2:]
-            if len(sum_) < k:
-                sum_ = '0' * (k - len(sum_)) + sum_
-    
-        # Calculate the complement of sum_
-        checksum = ''
-        for i in sum_:
-            if i == '1':
-                checksum += '0'
-            else:
-                checksum += '1'
-    
-        # Convert 8 bits into 1 byte
-        checksum = bytes(int(checksum[i: i + 8], 2) for i in range(0, len(checksum), 8))
-        return checksum
+        return self.integrity.calculate(packet)
 
     def _verify_checksum(self, packet):
-        packet_data = packet[:-2]                   # Extract the data and header without the checksum.
-        packet_cs   = packet[-2:]                   # Extract the original checksum.
-        checksum    = self._checksum(packet_data)   # Recalculate the checksum to check against the original checksum.
-
-        # Check if the two checksum values match and return a status.
-        if packet_cs == checksum:
-            return True
-        else:
-            return False
+        return self.integrity.verify(packet)
 
 
 
@@ -1,4 +1,5 @@
 #!/usr/bin/env python3
+import mmap
 import os
 
 ##
@@ -53,17 +54,202 @@ class Packets:
 
         # Run this version if the operating system is Windows based.
         if os.name == "nt":
-            with open(f"{path}\\{fn}", "wb") as data:
-                # Iterate over each packet in the list of packets 
-                # and construct a file from its contents.
-                for packet in packets:
-                    data.write(packet)
+            file = f"{path}\\{fn}"
         # Run this version in all other cases. Should cover all TA operating systems.
         else:
-            with open(f"{path}/{fn}", "wb") as data:
-                # Iterate over each packet in the list of packets 
-                # and construct a file from its contents.
-                for packet in packets:
-                    data.write(packet)
+            file = f"{path}/{fn}"
 
+        # Write the packets to the file in large batches, rather than one call per packet.
+        with PacketSink(file) as data:
+            data.writelines(packets)
+
+        return
+
+##
+# @class    PacketSource
+# @brief    This class memory-maps a file and provides its contents as packets without copying them. The
+#           packets can be iterated over lazily, or indexed like a list by windowed protocols, with one
+#           segment per packet_size bytes of the file, with the file name as the first packet, matching the
+#           list returned by Packets.file2packets. Segments are memoryview objects into the mapped file and
+#           are only created when they are accessed, so opening a file does not read it into memory.
+#
+# @param    file        - File that will be turned into packets.
+# @param    packet_size - Indicates the number of bytes in each packet.
+#
+# @note     The whole file is also available as a single memoryview through PacketSource.data. The packets
+#           reference the mapped file, so they must no longer be in use when the source is closed.
+class PacketSource:
+    def __init__(self, file, packet_size):
+        self.name        = (os.path.split(file)[-1]).encode()   ## File name, sent as the first packet.
+        self.packet_size = packet_size                          ## Number of bytes in each packet.
+
+        # An empty file cannot be mapped, so it is represented by an empty buffer.
+        with open(file, "rb") as data:
+            if os.fstat(data.fileno()).st_size > 0:
+                self._map = mmap.mmap(data.fileno(), 0, access=mmap.ACCESS_READ)
+            else:
+                self._map = None
+        self.data        = memoryview(self._map if self._map is not None else b'')  ## Contents of the file.
+        self._count      = 1 + (-(-len(self.data) // packet_size))   # File name and data packets.
+        return
+
+    def __len__(self):
+        return self._count
+
+    ##
+    # @fn       __getitem__
+    # @brief    Returns the packet at an index, or a list of packets for a slice.
+    #
+    # @param    index   - Index or slice of the packets to return.
+    #
+    # @return   Returns the packet as a memoryview object.
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(self._count))]
+
+        if index < 0:
+            index += self._count
+        if (index < 0) or (index >= self._count):
+            raise IndexError("packet index out of range")
+
+        if index == 0:
+            return self.name
+        start = (index - 1) * self.packet_size
+        return self.data[start:(start + self.packet_size)]
+
+    ##
+    # @fn       __iter__
+    # @brief    Generator yielding each packet of the file in order.
+    #
+    # @param    None.
+    #
+    # @return   Yields each packet as a memoryview object.
+    def __iter__(self):
+        yield self.name
+        for start in range(0, len(self.data), self.packet_size):
+            yield self.data[start:(start + self.packet_size)]
+
+    ##
+    # @fn       close
+    # @brief    Releases the memory-mapped file.
+    #
+    # @param    None.
+    #
+    # @return   None.
+    def close(self):
+        self.data.release()
+        if self._map is not None:
+            self._map.close()
+            self._map = None
         return
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+##
+# @class    PacketSink
+# @brief    This class writes received packets to a file in large, coalesced writes. Packets can be appended
+#           in order, or written at their offset in the file, so data does not have to be reassembled in
+#           memory before it is written.
+#
+# @param    file        - File that will be created from the packets.
+# @param    size        - (optional) Size of the file if it is known in advance. The file is then preallocated
+#                         and memory-mapped, and packets are copied directly into the mapped file.
+# @param    chunk_size  - (optional) Number of bytes buffered before appended packets are written to the file.
+#
+# @note     Appended packets are copied into the write buffer (or mapped file) before write() returns, so the
+#           caller may reuse the packet buffer immediately. Small packets are coalesced in the buffer and
+#           written with one system call per chunk_size bytes, while packets larger than the buffer are
+#           written directly without being copied.
+class PacketSink:
+    def __init__(self, file, size=None, chunk_size=(1 << 20)):
+        self._end = 0   # End of the furthest packet written, where appended packets are written.
+
+        if size:
+            self._file = open(file, "w+b")
+            self._file.truncate(size)
+            if hasattr(os, "posix_fallocate"):
+                os.posix_fallocate(self._file.fileno(), 0, size)    # Allocate the blocks up front, not per page fault.
+            self._map  = mmap.mmap(self._file.fileno(), size)
+        else:
+            self._file = open(file, "wb", buffering=chunk_size)
+            self._map  = None
+        return
+
+    ##
+    # @fn       write
+    # @brief    Appends a packet after the data written so far.
+    #
+    # @param    packet  - Bytes-like object containing packet data.
+    #
+    # @return   None.
+    def write(self, packet):
+        if self._map is None:
+            self._end += self._file.write(packet)
+        else:
+            self.write_at(self._end, packet)
+        return
+
+    ##
+    # @fn       writelines
+    # @brief    Appends a list of packets after the data written so far.
+    #
+    # @param    packets - Iterable of bytes-like objects containing packet data.
+    #
+    # @return   None.
+    def writelines(self, packets):
+        for packet in packets:
+            self.write(packet)
+        return
+
+    ##
+    # @fn       write_at
+    # @brief    Writes a packet at a byte offset in the file.
+    #
+    # @param    offset  - Byte offset in the file to write the packet at.
+    # @param    packet  - Bytes-like object containing packet data.
+    #
+    # @return   None.
+    def write_at(self, offset, packet):
+        end = offset + len(packet)
+
+        if self._map is None:
+            self._file.flush()
+            self._file.seek(offset)
+            self._file.write(packet)
+            self._file.flush()
+            self._end = max(self._end, end)
+            self._file.seek(self._end)
+            return
+
+        # Grow the mapped file if the packet is written past the end of it.
+        if end > len(self._map):
+            self._map.resize(max(end, 2 * len(self._map)))
+        self._map[offset:end] = packet
+        self._end = max(self._end, end)
+        return
+
+    ##
+    # @fn       close
+    # @brief    Writes any buffered data and closes the file, trimming the file to the end of the furthest
+    #           packet written.
+    #
+    # @param    None.
+    #
+    # @return   None.
+    def close(self):
+        if self._map is not None:
+            self._map.close()
+            self._map = None
+            self._file.truncate(self._end)
+        self._file.close()
+        return
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
@@ -1,14 +1,15 @@
 import socket
 import threading
-from .components.checksum import *
 from .components.fault_injection import *
+from .components.segment_encoder import *
+from .components.integrity import get_integrity
 
 DEBUG = False
 
 class SelectiveRepeat:
     ACK = 0x00
 
-    def __init__(self, send_address, send_port, recv_address, recv_port, window_size, mss=500,corruption=0, corruption_option=[1, 2, 3], loss=0, loss_option=[1, 2, 3], timeout=None):
+    def __init__(self, send_address, send_port, recv_address, recv_port, window_size, mss=500,corruption=0, corruption_option=[1, 2, 3], loss=0, loss_option=[1, 2, 3], timeout=None, integrity="internet"):
         # Public Parameters
         self.base           = 0             ## Base index of the sending window used by GBN and SR protocols.
         self.window_size    = window_size   ## Sending window size used by GBN and SR protocols.
@@ -24,6 +25,12 @@ class SelectiveRepeat:
         self.loss_option        = loss_option       ## List of selected debug options. 1=No Packet Loss, 2=ACK Packet Loss, 3=Data Packet Loss.
         self.timeout            = timeout           ## Time in seconds before a connection is considered to have experienced a timeout.
 
+        # Public Parameters (Integrity)
+        self.integrity          = get_integrity(integrity)  ## Integrity algorithm appended to each packet: "internet", "crc32c" or "none".
+
+        # Public Parameters (Statistics)
+        self.retransmissions    = 0                 ## Number of packets sent again, including sends dropped by fault injection.
+
         # Private Parameters
         self._ack_pending_buffer = []
 
@@ -85,7 +92,7 @@ class SelectiveRepeat:
             cs                      = int.from_bytes(cs, 'big')             # Packet checksum.
 
             # Send ACK to the sending host.
-            if verify_checksum(packet) and ((not ((packet_corrupted(self.corruption)) and (3 in self.corruption_option))) or (1 in self.corruption_option)):
+            if self.integrity.verify(packet) and ((not ((packet_corrupted(self.corruption)) and (3 in self.corruption_option))) or (1 in self.corruption_option)):
                 total_packets = int.from_bytes(packet_cnt, 'big')  # Total number of packets in the transfer.
                 self._send_ack(header, total_packets)
             else:
@@ -120,6 +127,10 @@ class SelectiveRepeat:
     def _send(self, data):
         seqnum = 0
 
+        # Encode every packet in the transfer in a single pass before sending, so retransmissions
+        # of a packet reuse the same encoded segment.
+        segments = encode_segments(data, len(data), integrity=self.integrity)
+
         while True:
             # Calculate the end of the data send window based on the current base value, and the configured
             # window size. The window end is limited to a max value based on the total amount of data that
@@ -137,7 +148,7 @@ class SelectiveRepeat:
             # packet of the sending window has been properly ACK'd, the sequence will add a new packet to the
             # sending window.
             while seqnum < window_end:
-                packet = self._add_header(data[seqnum], seqnum, len(data))
+                packet = segments[seqnum]
 
                 # Start the timeout monitor for the data send. When that packet's timeout is reached, the
                 # timeout process resends the packet and restarts the timer.
@@ -205,7 +216,7 @@ class SelectiveRepeat:
 
             # If the checkusm is invalid for the received packet, discard the received packet
             # and wait to receive more ACKs from the receiving host.
-            if not verify_checksum(packet) or (packet_corrupted(self.corruption) and (2 in self.corruption_option)):
+            if not self.integrity.verify(packet) or (packet_corrupted(self.corruption) and (2 in self.corruption_option)):
                 if DEBUG:
                     print(f"SR: Checksum invalid.")
                 continue
@@ -263,6 +274,7 @@ class SelectiveRepeat:
 
         if DEBUG:
             print(f"SR: ACK{header} receive timed out. Resending packet {header}.")
+        self.retransmissions += 1
         if packet_lost(self.loss) and (3 in self.loss_option) and (not 1 in self.loss_option):
             pass
         else:
@@ -306,7 +318,7 @@ class SelectiveRepeat:
     # @param    packet  - A byte array object containing packet data.
     #
     # @return   Returns the input packet with the header appended to the front of the message, and the
-    #           packet checksum appended to the end of the message.
+    #           packet checksum appended to the end of the message, as a memoryview object.
     #
     # @note     Packet Structure:
     # |            |             Data              |
@@ -325,11 +337,7 @@ class SelectiveRepeat:
     # |         N-1|         Checksum[15:8]        | Checksum
     # |           N|         Checksum[7:0]         | Checksum
     def _add_header(self, packet, state, transfer_size):
-        header   = state.to_bytes(4, byteorder='big')                   # FSM State.
-        header   = header + transfer_size.to_bytes(4, byteorder='big')  # Number of total packets in the transfer.
-        cs       = checksum(header + packet)                         # Checksum calculation.
-
-        return header + packet + cs
+        return encode_segments([packet], transfer_size, state, self.integrity)[0]
 
     ##
     # @fn       _parse_packet
@@ -341,6 +349,7 @@ class SelectiveRepeat:
     def _parse_packet(self, packet):
         header          = packet[0:4]                  # Extract the header bytes.
         total_packets   = packet[4:8]                  # Extract the total number of packets in the transfer.
-        data            = packet[8:(len(packet) - 2)]  # Extract the packet application data.
-        cs              = packet[-2:]                  # Extract the packet checksum bytes.
+        cs_start        = len(packet) - self.integrity.size
+        data            = packet[8:cs_start]           # Extract the packet application data.
+        cs              = packet[cs_start:]            # Extract the packet integrity bytes.
         return header, total_packets, data, cs
@@ -0,0 +1,5 @@
+import os
+import sys
+
+# The tests import the library as the client and server scripts do, from the tcp directory.
+sys.path.insert(0, os.path.dirname(os.path.realpath(__file__)))
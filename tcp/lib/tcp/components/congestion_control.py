@@ -0,0 +1,389 @@
+#!/usr/bin/env python3
+import abc
+import time
+
+##
+# @class    HyStart
+# @brief    Class implementing HyStart++ (RFC 9406), which ends the initial slow start before the buffers along
+#           the path overflow. The minimum RTT of each round of slow start is compared with that of the previous
+#           round, and once it has increased by more than a threshold the window enters conservative slow start
+#           (CSS), growing at a quarter of the slow start rate. If the RTT falls back to its earlier value the
+#           delay increase was spurious and slow start resumes, otherwise slow start ends after CSS_ROUNDS rounds.
+#
+# @note     A round ends once the data in flight at its start has been acknowledged. The limit on the window
+#           growth per ACK (L) is not applied, as the sender applies ACKs in batches.
+class HyStart:
+    __slots__ = ('css', '_round_left', '_rtt', '_last_round_min_rtt', '_round_min_rtt', '_samples', '_css_baseline_min_rtt', '_css_rounds')
+
+    MIN_RTT_THRESH      = 0.004     ## Smallest RTT increase that ends slow start, in seconds.
+    MAX_RTT_THRESH      = 0.016     ## Largest RTT increase required to end slow start, in seconds.
+    MIN_RTT_DIVISOR     = 8         ## Fraction of the previous round's minimum RTT used as the RTT increase threshold.
+    N_RTT_SAMPLE        = 8         ## RTT samples required in a round before its minimum RTT is compared.
+    CSS_GROWTH_DIVISOR  = 4         ## Divisor of the window growth in conservative slow start.
+    CSS_ROUNDS          = 5         ## Rounds of conservative slow start before slow start ends.
+
+    def __init__(self):
+        self.css                    = False             ## The window is in conservative slow start.
+        self._round_left            = 0                 # Bytes left to acknowledge before the current round ends.
+        self._rtt                   = None              # RTT sample taken for the ACK being processed.
+        self._last_round_min_rtt    = float("inf")
+        self._round_min_rtt         = float("inf")
+        self._samples               = 0                 # RTT samples taken in the current round.
+        self._css_baseline_min_rtt  = float("inf")      # Minimum RTT of the round in which CSS was entered.
+        self._css_rounds            = 0                 # Rounds completed in CSS.
+        return
+
+    ##
+    # @fn       on_rtt_sample
+    # @brief    Records an RTT sample, which is taken into account by the next call to on_ack.
+    #
+    # @param    rtt     - Sampled round trip time, in seconds.
+    #
+    # @return   None.
+    def on_rtt_sample(self, rtt):
+        self._rtt = rtt
+        return
+
+    ##
+    # @fn       on_ack
+    # @brief    Called for a cumulative ACK in slow start, starting a new round if the ACK ends the current one,
+    #           and checking the minimum RTT of the round.
+    #
+    # @param    acked   - Number of bytes newly acknowledged.
+    # @param    flight  - Number of bytes sent and not yet acknowledged.
+    #
+    # @return   Returns True if slow start should end.
+    def on_ack(self, acked, flight):
+        self._round_left -= acked
+        if self._round_left <= 0:
+            self._round_left            = flight
+            self._last_round_min_rtt    = self._round_min_rtt
+            self._round_min_rtt         = float("inf")
+            self._samples               = 0
+            if self.css:
+                self._css_rounds += 1
+                if self._css_rounds >= self.CSS_ROUNDS:
+                    return True
+
+        if self._rtt is None:
+            return False
+        self._round_min_rtt = min(self._round_min_rtt, self._rtt)
+        self._samples      += 1
+        self._rtt           = None
+        if self._samples < self.N_RTT_SAMPLE:
+            return False
+
+        if not self.css:
+            # Enter CSS once the RTT has grown by a fraction of its previous value, within fixed bounds.
+            if self._last_round_min_rtt != float("inf"):
+                rtt_thresh = max(self.MIN_RTT_THRESH, min((self._last_round_min_rtt / self.MIN_RTT_DIVISOR), self.MAX_RTT_THRESH))
+                if self._round_min_rtt >= (self._last_round_min_rtt + rtt_thresh):
+                    self.css                    = True
+                    self._css_baseline_min_rtt  = self._round_min_rtt
+                    self._css_rounds            = 0
+        elif self._round_min_rtt < self._css_baseline_min_rtt:
+            # The RTT has fallen back below the value that started CSS, so the increase was spurious.
+            self.css                    = False
+            self._css_baseline_min_rtt  = float("inf")
+        return False
+
+##
+# @class    CongestionControl
+# @brief    Base class of the congestion control algorithms used by the TCP sender. An algorithm owns the
+#           congestion window and slow-start threshold, in bytes, and the sender reports the events that
+#           change them through the on_* hooks. The base class provides the window changes of NewReno fast
+#           recovery (RFC 6582), which the loss recovery of the sender relies on, and subclasses provide the
+#           window growth and the reduction on a loss or timeout. The initial slow start may be ended early
+#           by HyStart++.
+#
+# @note     The object is not thread safe, callers must hold the lock protecting it.
+class CongestionControl(abc.ABC):
+    name = None     ## Name used to select the algorithm.
+
+    def __init__(self, mss, hystart=True):
+        self.mss        = mss
+        self.cwnd       = mss               ## Congestion window, in bytes.
+        self.ssthresh   = float("inf")      ## Slow-start threshold, in bytes.
+        self._hystart   = HyStart() if hystart else None
+        return
+
+    ##
+    # @fn       slow_start
+    # @brief    Property which checks whether the window is in the slow start phase.
+    #
+    # @return   Returns True if the congestion window is below the slow-start threshold.
+    @property
+    def slow_start(self):
+        return self.cwnd < self.ssthresh
+
+    ##
+    # @fn       _slow_start_increase
+    # @brief    Calculates the growth of the congestion window in slow start. In the initial slow start, while
+    #           the slow-start threshold is unset, HyStart++ reduces the growth in conservative slow start and
+    #           ends slow start by setting the threshold to the congestion window (RFC 9406). Later slow starts
+    #           grow the window by the data acknowledged.
+    #
+    # @param    acked   - Number of bytes newly acknowledged.
+    # @param    flight  - Number of bytes sent and not yet acknowledged.
+    #
+    # @return   Returns the number of bytes to add to the congestion window.
+    def _slow_start_increase(self, acked, flight):
+        if (self._hystart is None) or (self.ssthresh != float("inf")):
+            return acked
+        if self._hystart.on_ack(acked, flight):
+            self.ssthresh = self.cwnd
+            return 0
+        return (acked / HyStart.CSS_GROWTH_DIVISOR) if self._hystart.css else acked
+
+    ##
+    # @fn       on_ack
+    # @brief    Called when a cumulative ACK acknowledges new data outside fast recovery.
+    #
+    # @param    acked   - Number of bytes newly acknowledged.
+    # @param    flight  - Number of bytes sent and not yet acknowledged.
+    #
+    # @return   None.
+    @abc.abstractmethod
+    def on_ack(self, acked, flight):
+        pass
+
+    ##
+    # @fn       on_dupack
+    # @brief    Called for duplicate ACKs received in fast recovery. Each one reports a segment that has left
+    #           the network, so the window is inflated by one segment for each.
+    #
+    # @param    dup_acks    - Number of duplicate ACKs received.
+    #
+    # @return   None.
+    def on_dupack(self, dup_acks):
+        self.cwnd += dup_acks * self.mss
+        return
+
+    ##
+    # @fn       on_loss
+    # @brief    Called when the third duplicate ACK starts fast retransmit and fast recovery.
+    #
+    # @param    flight      - Number of bytes sent and not yet acknowledged.
+    # @param    dup_acks    - Number of duplicate ACKs received, by which the reduced window is inflated.
+    #
+    # @return   None.
+    @abc.abstractmethod
+    def on_loss(self, flight, dup_acks):
+        pass
+
+    ##
+    # @fn       on_partial_ack
+    # @brief    Called for an ACK in fast recovery that does not cover all the data sent before recovery
+    #           started. The window is deflated by the data acknowledged, adding back one segment if a full
+    #           segment was acknowledged.
+    #
+    # @param    acked   - Number of bytes newly acknowledged.
+    #
+    # @return   None.
+    def on_partial_ack(self, acked):
+        self.cwnd -= acked
+        if acked >= self.mss:
+            self.cwnd += self.mss
+        self.cwnd = max(self.cwnd, self.mss)
+        return
+
+    ##
+    # @fn       on_recovery_exit
+    # @brief    Called for the full ACK that ends fast recovery. The window is deflated to the slow-start
+    #           threshold, limited to one segment more than the data still in flight.
+    #
+    # @param    flight  - Number of bytes sent and not yet acknowledged.
+    #
+    # @return   None.
+    def on_recovery_exit(self, flight):
+        self.cwnd = min(self.ssthresh, (max(flight, self.mss) + self.mss))
+        return
+
+    ##
+    # @fn       on_timeout
+    # @brief    Called when a retransmission timer expires.
+    #
+    # @param    flight  - Number of bytes sent and not yet acknowledged.
+    #
+    # @return   None.
+    @abc.abstractmethod
+    def on_timeout(self, flight):
+        pass
+
+    ##
+    # @fn       undo_state
+    # @brief    Saves the state changed by a reduction of the window, so that it can be restored if the
+    #           reduction turns out to be spurious.
+    #
+    # @param    None.
+    #
+    # @return   Returns an object to pass to on_spurious_timeout.
+    def undo_state(self):
+        return (self.cwnd, self.ssthresh)
+
+    ##
+    # @fn       on_spurious_timeout
+    # @brief    Called when a retransmission timeout is found to be spurious, the original segments having been
+    #           delayed rather than lost. The window and slow-start threshold are restored to their values before
+    #           the timeout, unless they have since grown larger.
+    #
+    # @param    state   - Object returned by undo_state before the timeout.
+    #
+    # @return   None.
+    def on_spurious_timeout(self, state):
+        cwnd, ssthresh  = state
+        self.cwnd       = max(self.cwnd, cwnd)
+        self.ssthresh   = max(self.ssthresh, ssthresh)
+        return
+
+    ##
+    # @fn       on_rtt_sample
+    # @brief    Called for every RTT sample taken by the sender.
+    #
+    # @param    rtt     - Sampled round trip time, in seconds.
+    #
+    # @return   None.
+    def on_rtt_sample(self, rtt):
+        if not self._hystart is None:
+            self._hystart.on_rtt_sample(rtt)
+        return
+
+##
+# @class    Reno
+# @brief    Reno congestion control (RFC 5681). The window grows by the data acknowledged in slow start and
+#           by one segment per window of data acknowledged in congestion avoidance, and is halved on a loss.
+class Reno(CongestionControl):
+    name = "reno"
+
+    def on_ack(self, acked, flight):
+        if self.slow_start:
+            self.cwnd = min((self.cwnd + self._slow_start_increase(acked, flight)), max(self.ssthresh, self.cwnd))
+        else:
+            self.cwnd += (self.mss * acked) / self.cwnd
+        return
+
+    def on_loss(self, flight, dup_acks):
+        self.ssthresh   = max((flight / 2), (2 * self.mss))
+        self.cwnd       = self.ssthresh + (dup_acks * self.mss)
+        return
+
+    def on_timeout(self, flight):
+        self.ssthresh   = max((flight / 2), (2 * self.mss))
+        self.cwnd       = self.mss
+        return
+
+##
+# @class    CUBIC
+# @brief    CUBIC congestion control (RFC 8312). In congestion avoidance the window follows a cubic function
+#           of the time since the last loss, centred on the window at which the loss occurred, so that it
+#           regains that window quickly on links with a large bandwidth-delay product and probes slowly
+#           around it. The window never grows slower than an estimate of the Reno window.
+class CUBIC(Reno):
+    name = "cubic"
+
+    C       = 0.4   ## Scaling constant of the cubic function, in segments per second cubed.
+    BETA    = 0.7   ## Multiplicative decrease factor applied on a loss.
+
+    def __init__(self, mss, hystart=True):
+        super().__init__(mss, hystart)
+        self._w_max         = 0         # Window before the last reduction, in segments.
+        self._w_last_max    = 0         # Previous value of _w_max, used for fast convergence.
+        self._w_est         = 0         # Estimate of the Reno window since the start of the epoch, in segments.
+        self._k             = 0         # Time taken to grow back to _w_max, in seconds.
+        self._epoch_start   = None      # Time at which the current congestion avoidance epoch started.
+        self._min_rtt       = None
+        return
+
+    def on_ack(self, acked, flight):
+        if self.slow_start:
+            super().on_ack(acked, flight)
+            return
+
+        cwnd = self.cwnd / self.mss
+        now  = time.monotonic()
+        if self._epoch_start is None:
+            self._epoch_start = now
+            self._w_est       = cwnd
+            if cwnd < self._w_max:
+                self._k = ((self._w_max - cwnd) / self.C) ** (1 / 3)
+            else:
+                self._k     = 0
+                self._w_max = cwnd
+
+        # Window of the cubic function one RTT ahead, limited to 1.5 times the current window.
+        rtt    = self._min_rtt or 0
+        t      = (now - self._epoch_start) + rtt
+        target = (self.C * ((t - self._k) ** 3)) + self._w_max
+        target = min(max(target, cwnd), (1.5 * cwnd))
+
+        # Reno-friendly region: the estimated Reno window grows by the equivalent of one segment per
+        # window of data acknowledged, adjusted for the smaller decrease factor.
+        self._w_est += ((3 * (1 - self.BETA)) / (1 + self.BETA)) * ((acked / self.mss) / cwnd)
+        if self._w_est > target:
+            cwnd = self._w_est
+        else:
+            cwnd += ((target - cwnd) / cwnd) * (acked / self.mss)
+        self.cwnd = cwnd * self.mss
+        return
+
+    ##
+    # @fn       _reduce
+    # @brief    Records the window at which a loss occurred and sets the slow-start threshold to the reduced
+    #           window. With fast convergence, a window that is below the previous one releases bandwidth
+    #           for new flows by lowering the recorded window further.
+    #
+    # @param    None.
+    #
+    # @return   None.
+    def _reduce(self):
+        cwnd = self.cwnd / self.mss
+        if cwnd < self._w_last_max:
+            self._w_last_max = cwnd
+            self._w_max      = cwnd * ((1 + self.BETA) / 2)
+        else:
+            self._w_last_max = cwnd
+            self._w_max      = cwnd
+        self._epoch_start = None
+        self.ssthresh     = max((self.cwnd * self.BETA), (2 * self.mss))
+        return
+
+    def on_loss(self, flight, dup_acks):
+        self._reduce()
+        self.cwnd = self.ssthresh + (dup_acks * self.mss)
+        return
+
+    def on_timeout(self, flight):
+        self._reduce()
+        self.cwnd = self.mss
+        return
+
+    def undo_state(self):
+        return (super().undo_state(), self._w_max, self._w_last_max, self._w_est, self._k, self._epoch_start)
+
+    def on_spurious_timeout(self, state):
+        state, self._w_max, self._w_last_max, self._w_est, self._k, self._epoch_start = state
+        super().on_spurious_timeout(state)
+        return
+
+    def on_rtt_sample(self, rtt):
+        super().on_rtt_sample(rtt)
+        if (self._min_rtt is None) or (rtt < self._min_rtt):
+            self._min_rtt = rtt
+        return
+
+ALGORITHMS = {algorithm.name: algorithm for algorithm in (Reno, CUBIC)}
+
+##
+# @fn       get_congestion_control
+#
+# @brief    This function creates a congestion control algorithm for a connection by name.
+#
+# @param    name    - Name of the algorithm: "reno" or "cubic".
+# @param    mss     - Maximum segment size of the connection, in bytes.
+# @param    hystart - (optional) End the initial slow start with HyStart++.
+#
+# @return   Returns a new congestion control object.
+def get_congestion_control(name, mss, hystart=True):
+    if not name in ALGORITHMS:
+        raise ValueError(f"Unknown congestion control algorithm '{name}', expected one of {list(ALGORITHMS)}.")
+    return ALGORITHMS[name](mss, hystart)
@@ -0,0 +1,250 @@
+#!/usr/bin/env python3
+import struct
+from . import checksum as cslib
+
+##
+# @fn       _crc32c_tables
+#
+# @brief    This function generates the lookup tables used by the table-driven CRC32C calculation. Table 0
+#           is the standard byte-wise table for the reflected Castagnoli polynomial, and table k gives the
+#           CRC of a byte followed by k zero bytes, allowing 8 bytes to be processed per step.
+#
+# @param    None.
+#
+# @return   Returns a tuple of 8 lists, each containing 256 CRC values.
+def _crc32c_tables():
+    table = []
+    for i in range(256):
+        crc = i
+        for _ in range(8):
+            crc = (crc >> 1) ^ 0x82F63B78 if (crc & 1) else (crc >> 1)
+        table.append(crc)
+
+    tables = [table]
+    for _ in range(7):
+        tables.append([(crc >> 8) ^ table[crc & 0xFF] for crc in tables[-1]])
+    return tuple(tables)
+
+_CRC32C_TABLES  = _crc32c_tables()
+_U64            = struct.Struct('<Q')
+
+##
+# @fn       crc32c
+#
+# @brief    This function calculates the CRC32C (Castagnoli) value of a packet using slicing-by-8 lookup
+#           tables. A previous result can be passed in to continue the calculation over a further region.
+#
+# @param    packet  - Data packet formatted as a bytes-like object.
+# @param    crc     - (optional) CRC32C value of the data preceding the packet.
+#
+# @return   Returns the CRC32C value as an integer.
+def crc32c(packet, crc=0):
+    t0, t1, t2, t3, t4, t5, t6, t7 = _CRC32C_TABLES
+    view = memoryview(packet)
+    end  = len(view) & ~7
+    crc ^= 0xFFFFFFFF
+
+    for (word,) in _U64.iter_unpack(view[0:end]):
+        word ^= crc
+        crc   = t7[word & 0xFF] ^ t6[(word >> 8) & 0xFF] ^ t5[(word >> 16) & 0xFF] ^ t4[(word >> 24) & 0xFF] ^ \
+                t3[(word >> 32) & 0xFF] ^ t2[(word >> 40) & 0xFF] ^ t1[(word >> 48) & 0xFF] ^ t0[word >> 56]
+
+    for byte in view[end:]:
+        crc = t0[(crc ^ byte) & 0xFF] ^ (crc >> 8)
+
+    return crc ^ 0xFFFFFFFF
+
+##
+# @class    InternetChecksum
+# @brief    Integrity algorithm using the 16-bit one's complement Internet checksum.
+class InternetChecksum:
+    name        = "internet"    ## Name used to select the algorithm.
+    number      = 0             ## Alternate checksum number used to negotiate the algorithm (RFC 1146).
+    size        = 2             ## Number of bytes in the integrity value.
+    incremental = True          ## The value can be updated in place when part of the packet changes.
+
+    ##
+    # @fn       value
+    # @brief    Calculates the integrity value over one or more consecutive regions of a packet. Each region
+    #           must start at an even offset within the packet.
+    #
+    # @param    regions - Bytes-like objects that make up the packet.
+    #
+    # @return   Returns the integrity value as an integer.
+    def value(self, *regions):
+        sum_ = 0
+        for region in regions:
+            sum_ += cslib.ones_complement_sum(region)
+
+        if sum_ != 0:
+            sum_ %= 0xFFFF
+            if sum_ == 0:
+                sum_ = 0xFFFF
+        return 0xFFFF - sum_
+
+    ##
+    # @fn       calculate
+    # @brief    Calculates the integrity value appended to the end of a packet.
+    #
+    # @param    packet  - Data packet formatted as bytes.
+    #
+    # @return   Returns the integrity value as a bytes object of self.size bytes.
+    def calculate(self, packet):
+        return cslib.checksum(packet)
+
+    ##
+    # @fn       verify
+    # @brief    Verifies the integrity value appended to the end of a packet.
+    #
+    # @param    packet  - Data packet formatted as bytes, ending with the integrity value.
+    #
+    # @return   Returns True if the integrity value is correct, and False if it is not.
+    def verify(self, packet):
+        return cslib.verify_checksum(packet)
+
+    ##
+    # @fn       update
+    # @brief    Incrementally updates an integrity value after part of the packet has changed (RFC 1624).
+    #
+    # @param    value   - Current integrity value as a bytes object.
+    # @param    old     - Previous contents of the changed region of the packet.
+    # @param    new     - Current contents of the changed region of the packet.
+    #
+    # @return   Returns the updated integrity value as a bytes object.
+    def update(self, value, old, new):
+        return cslib.update_checksum(value, old, new)
+
+##
+# @class    CRC32CChecksum
+# @brief    Integrity algorithm using the table-driven CRC32C (Castagnoli) checksum. This detects far more
+#           error patterns than the Internet checksum, at a higher CPU cost per byte.
+class CRC32CChecksum:
+    name        = "crc32c"      ## Name used to select the algorithm.
+    number      = 4             ## Alternate checksum number, numbers above 3 are local to this implementation.
+    size        = 4             ## Number of bytes in the integrity value.
+    incremental = False         ## The value is recalculated over the whole packet when part of it changes.
+
+    ##
+    # @fn       value
+    # @brief    Calculates the integrity value over one or more consecutive regions of a packet, continuing
+    #           the CRC from each region into the next.
+    #
+    # @param    regions - Bytes-like objects that make up the packet.
+    #
+    # @return   Returns the integrity value as an integer.
+    def value(self, *regions):
+        crc = 0
+        for region in regions:
+            crc = crc32c(region, crc)
+        return crc
+
+    ##
+    # @fn       calculate
+    # @brief    Calculates the integrity value appended to the end of a packet.
+    #
+    # @param    packet  - Data packet formatted as bytes.
+    #
+    # @return   Returns the integrity value as a bytes object of self.size bytes, most significant byte first.
+    def calculate(self, packet):
+        return crc32c(packet).to_bytes(4, 'big')
+
+    ##
+    # @fn       verify
+    # @brief    Verifies the integrity value appended to the end of a packet.
+    #
+    # @param    packet  - Data packet formatted as bytes, ending with the integrity value.
+    #
+    # @return   Returns True if the integrity value is correct, and False if it is not or the packet is too
+    #           short to hold one.
+    def verify(self, packet):
+        if len(packet) < 4:
+            return False
+        return packet[-4:] == self.calculate(packet[:-4])
+
+##
+# @class    NoIntegrity
+# @brief    Integrity "algorithm" that performs no check at all. Intended for trusted loopback connections,
+#           where the checksum of the underlying UDP datagram already covers the data.
+class NoIntegrity:
+    name        = "none"        ## Name used to select the algorithm.
+    number      = 5             ## Alternate checksum number used to negotiate the algorithm.
+    size        = 0             ## Number of bytes in the integrity value.
+    incremental = True          ## The value never changes, so it does not need recalculating.
+
+    ##
+    # @fn       value
+    # @brief    Calculates the integrity value over one or more consecutive regions of a packet.
+    #
+    # @param    regions - Bytes-like objects that make up the packet.
+    #
+    # @return   Returns 0.
+    def value(self, *regions):
+        return 0
+
+    ##
+    # @fn       calculate
+    # @brief    Calculates the integrity value appended to the end of a packet.
+    #
+    # @param    packet  - Data packet formatted as bytes.
+    #
+    # @return   Returns an empty bytes object, nothing is appended.
+    def calculate(self, packet):
+        return b''
+
+    ##
+    # @fn       verify
+    # @brief    Verifies the integrity value appended to the end of a packet.
+    #
+    # @param    packet  - Data packet formatted as bytes.
+    #
+    # @return   Returns True.
+    def verify(self, packet):
+        return True
+
+    ##
+    # @fn       update
+    # @brief    Incrementally updates an integrity value after part of the packet has changed.
+    #
+    # @param    value   - Current integrity value.
+    # @param    old     - Previous contents of the changed region of the packet.
+    # @param    new     - Current contents of the changed region of the packet.
+    #
+    # @return   Returns the value unchanged.
+    def update(self, value, old, new):
+        return value
+
+INTERNET_CHECKSUM   = InternetChecksum()
+CRC32C_CHECKSUM     = CRC32CChecksum()
+NO_INTEGRITY        = NoIntegrity()
+
+ALGORITHMS = {integrity.name: integrity for integrity in (INTERNET_CHECKSUM, CRC32C_CHECKSUM, NO_INTEGRITY)}
+
+##
+# @fn       get_integrity
+#
+# @brief    This function looks up an integrity algorithm by name.
+#
+# @param    name    - Name of the algorithm: "internet", "crc32c" or "none".
+#
+# @return   Returns the integrity algorithm object.
+def get_integrity(name):
+    if not name in ALGORITHMS:
+        raise ValueError(f"Unknown integrity algorithm '{name}', expected one of {list(ALGORITHMS)}.")
+    return ALGORITHMS[name]
+
+##
+# @fn       find_integrity
+#
+# @brief    This function looks up an integrity algorithm by its negotiation number.
+#
+# @param    number  - Alternate checksum number received from the remote host.
+#
+# @return   Returns the integrity algorithm object, or None if the number is not supported.
+def find_integrity(number):
+    for integrity in ALGORITHMS.values():
+        if integrity.number == number:
+            return integrity
+    return None
+
+if __name__ == "__main__":
+    print(hex(crc32c(b"123456789")))    # Expected check value 0xe3069283.
@@ -0,0 +1,70 @@
+import time
+
+PACING_GAIN_SLOW_START  = 2     # Multiplier of cwnd / SRTT in slow start, letting the rate keep up with the window doubling each RTT.
+PACING_GAIN             = 1.2   # Multiplier of cwnd / SRTT in congestion avoidance, leaving headroom for the window growth.
+
+##
+# @class    Pacer
+# @brief    Class used by the sender to spread the segments of a window over the round trip time rather than
+#           sending them in a single burst. The pacing rate is derived from the congestion window and the
+#           smoothed RTT, and a token bucket, filled at the pacing rate and holding at most a burst allowance
+#           of bytes, decides when the next segment may be sent.
+#
+# @note     The pacer is only used by the sending thread, so no lock is required.
+class Pacer:
+    __slots__ = ('rate', '_burst', '_tokens', '_last')
+
+    ##
+    # @fn       __init__
+    # @brief    Class constructor for the Pacer class.
+    #
+    # @param    burst   Largest number of bytes that may be sent back to back, at least one segment.
+    #
+    # @return   None.
+    def __init__(self, burst):
+        self.rate       = None              ## Pacing rate in bytes per second, None while segments are not paced.
+        self._burst     = burst
+        self._tokens    = burst             # Bytes that may be sent before the next token is due.
+        self._last      = time.monotonic()  # Time at which the bucket was last filled.
+        return
+
+    ##
+    # @fn       set_rate
+    # @brief    Sets the pacing rate to the congestion window sent per smoothed RTT, scaled by the pacing gain.
+    #           Segments are not paced until the first RTT sample is taken, nor while the window is closed, as
+    #           the window then holds back the sender.
+    #
+    # @param    cwnd        Window the sender may use, in bytes.
+    # @param    srtt        Smoothed RTT in seconds, or None if no sample has been taken.
+    # @param    slow_start  The congestion window is in the slow start phase.
+    #
+    # @return   None.
+    def set_rate(self, cwnd, srtt, slow_start):
+        if (not srtt) or (cwnd <= 0):
+            self.rate = None
+        else:
+            self.rate = ((PACING_GAIN_SLOW_START if slow_start else PACING_GAIN) * cwnd) / srtt
+        return
+
+    ##
+    # @fn       delay
+    # @brief    Takes the tokens for a segment from the bucket if it holds enough of them, after adding the
+    #           tokens earned at the pacing rate since the bucket was last filled.
+    #
+    # @param    size    Number of bytes in the segment, at most the burst allowance.
+    #
+    # @return   Returns 0 if the segment may be sent now, or the number of seconds until enough tokens have
+    #           been earned. The tokens are only taken when 0 is returned.
+    def delay(self, size):
+        now         = time.monotonic()
+        elapsed     = now - self._last
+        self._last  = now
+        if not self.rate:
+            self._tokens = self._burst
+            return 0
+
+        self._tokens = min((self._tokens + (elapsed * self.rate)), self._burst)
+        if self._tokens < size:
+            return (size - self._tokens) / self.rate
+        self._tokens -= size
+        return 0
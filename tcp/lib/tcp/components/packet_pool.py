@@ -0,0 +1,53 @@
+from .tcp_packet import TCP_Packet
+
+##
+# @class    TCP_PacketPool
+# @brief    Class used to provide a bounded free-list of TCP_Packet objects with preallocated buffers, so that
+#           packets can be reused on the receive path instead of being allocated for every datagram.
+#
+# @note     Packets are acquired by the thread receiving datagrams and released by the thread processing
+#           the receive buffer. list.append() and list.pop() are atomic, so no lock is required.
+class TCP_PacketPool:
+    __slots__ = ('_free', '_size', '_buffer_size')
+
+    ##
+    # @fn       __init__
+    # @brief    Class constructor for the TCP_PacketPool class.
+    #
+    # @param    size        Maximum number of free packets held by the pool.
+    # @param    buffer_size Number of bytes in the buffer of each packet, which limits the size of a received datagram.
+    # @param    preallocate (optional) Number of packets allocated up front, the pool is filled to its size by
+    #                       released packets. Defaults to the size of the pool.
+    #
+    # @return   None.
+    def __init__(self, size, buffer_size, preallocate=None):
+        self._size          = size
+        self._buffer_size   = buffer_size
+        self._free          = [TCP_Packet.empty(buffer_size) for _ in range(size if (preallocate is None) else min(preallocate, size))]
+        return
+
+    ##
+    # @fn       acquire
+    # @brief    Takes a packet from the pool, allocating a new packet if the pool is empty.
+    #
+    # @param    None.
+    #
+    # @return   Returns a TCP_Packet object with a writable buffer of buffer_size bytes.
+    def acquire(self):
+        try:
+            return self._free.pop()
+        except IndexError:
+            return TCP_Packet.empty(self._buffer_size)
+
+    ##
+    # @fn       release
+    # @brief    Returns a packet to the pool once its contents are no longer needed. The packet is discarded if
+    #           the pool is already full. Data referenced through the packet is overwritten once it is reused.
+    #
+    # @param    packet  TCP_Packet object previously taken from the pool with acquire().
+    #
+    # @return   None.
+    def release(self, packet):
+        if len(self._free) < self._size:
+            self._free.append(packet)
+        return
@@ -0,0 +1,139 @@
+DUP_THRESH          = 3         # SACKed segments after which a loss is assumed without waiting for the reordering window.
+WC_DEL_ACK_T        = 0.2       # Worst case delay of a delayed ACK, added to the probe timeout when one segment is in flight.
+INITIAL_PTO         = 1         # Probe timeout before the first RTT sample, in seconds.
+
+##
+# @class    RACK
+# @brief    Class used by the sender to detect lost segments from the time at which they were sent (RACK,
+#           RFC 8985). The send time of the most recently sent segment known to have been delivered, either
+#           by a cumulative ACK or a SACK block, is tracked along with its RTT. A segment sent before it that is
+#           still missing once that RTT and a reordering window have passed since its own send time is marked
+#           as lost, so that a loss is detected one RTT after it occurs however few segments follow it.
+#
+# @note     Segments are PendingSegment entries of the retransmission queue, with send times taken from
+#           time.time(). The object is not thread safe, callers must hold the lock protecting the queue.
+class RACK:
+    __slots__ = ('xmit_ts', 'end_seq', 'rtt', 'min_rtt', 'reordering_seen', '_fack', '_granularity')
+
+    ##
+    # @fn       __init__
+    # @brief    Class constructor for the RACK class.
+    #
+    # @param    granularity Resolution of the timers in seconds, below which RTT differences are not significant.
+    #
+    # @return   None.
+    def __init__(self, granularity):
+        self.xmit_ts            = 0         ## Send time of the most recently sent segment that was delivered.
+        self.end_seq            = 0         ## Sequence number following that segment.
+        self.rtt                = None      ## RTT of that segment, in seconds.
+        self.min_rtt            = None      ## Smallest RTT measured from delivered segments, in seconds.
+        self.reordering_seen    = False     ## A segment was delivered after a segment sent after it.
+        self._fack              = 0         # Highest sequence number delivered.
+        self._granularity       = granularity
+        return
+
+    ##
+    # @fn       _sent_before
+    # @brief    Checks whether a segment was sent before the segment recorded by RACK, using the sequence number
+    #           to order segments sent at the same time.
+    #
+    # @param    segment - PendingSegment entry.
+    #
+    # @return   Returns True if the segment was sent before the recorded segment.
+    def _sent_before(self, segment):
+        return (segment.sent_time < self.xmit_ts) or ((segment.sent_time == self.xmit_ts) and (segment.end < self.end_seq))
+
+    ##
+    # @fn       update
+    # @brief    Records a segment that has been delivered, taking its RTT and checking for reordering.
+    #
+    # @param    segment - PendingSegment entry of the segment, acknowledged or newly SACKed.
+    # @param    now     - Current time.
+    #
+    # @return   None.
+    def update(self, segment, now):
+        rtt = now - segment.sent_time
+
+        # An ACK that arrives sooner than the minimum RTT after a segment was resent is for an earlier
+        # transmission, and does not show when the resent segment was delivered. The comparison allows for the
+        # timer resolution, as on short paths the RTT varies by more than the minimum RTT itself.
+        if segment.retransmitted and (not self.min_rtt is None) and ((rtt + self._granularity) < self.min_rtt):
+            return
+        self.min_rtt = rtt if (self.min_rtt is None) else min(self.min_rtt, rtt)
+        if not self._sent_before(segment):
+            self.xmit_ts = segment.sent_time
+            self.end_seq = segment.end
+            self.rtt     = rtt
+
+        # A segment sent once that is delivered after data beyond it was reordered by the network.
+        if (not segment.retransmitted) and (segment.end < self._fack):
+            self.reordering_seen = True
+        self._fack = max(self._fack, segment.end)
+        return
+
+    ##
+    # @fn       reo_wnd
+    # @brief    Calculates the reordering window, the time allowed for a segment to arrive out of order before
+    #           it is marked as lost. Until reordering has been seen, no time is allowed once the sender is in
+    #           recovery or enough segments have been SACKed to assume a loss.
+    #
+    # @param    srtt        - Smoothed RTT in seconds, which bounds the window.
+    # @param    recovery    - The sender is in fast recovery.
+    # @param    sacked      - Number of segments awaiting an ACK that have been SACKed.
+    #
+    # @return   Returns the reordering window in seconds.
+    def reo_wnd(self, srtt, recovery, sacked):
+        if (not self.reordering_seen) and (recovery or (sacked >= DUP_THRESH)):
+            return 0
+        return min((self.min_rtt / 4), srtt or self.min_rtt)
+
+    ##
+    # @fn       detect_loss
+    # @brief    Marks the segments sent before the recorded segment that have not been delivered within the RTT
+    #           of the recorded segment and the reordering window as lost.
+    #
+    # @param    segments    - Iterable of the PendingSegment entries awaiting an ACK.
+    # @param    now         - Current time.
+    # @param    srtt        - Smoothed RTT in seconds.
+    # @param    recovery    - The sender is in fast recovery.
+    #
+    # @return   Returns a list of the segments newly marked as lost, and the number of seconds until the
+    #           remaining segments sent before the recorded segment may be marked, or 0 if there are none.
+    def detect_loss(self, segments, now, srtt, recovery):
+        lost, timeout = [], 0
+        if self.rtt is None:
+            return lost, timeout
+
+        sacked  = 0 if (self.reordering_seen or recovery) else sum(1 for segment in segments if segment.sacked)
+        reo_wnd = self.reo_wnd(srtt, recovery, sacked)
+        for segment in segments:
+            if segment.sacked or segment.lost or (not self._sent_before(segment)):
+                continue
+            remaining = (segment.sent_time + self.rtt + reo_wnd) - now
+            if remaining <= 0:
+                segment.lost = True
+                lost.append(segment)
+            else:
+                timeout = max(timeout, remaining)
+        return lost, timeout
+
+##
+# @fn       probe_timeout
+#
+# @brief    This function calculates the tail loss probe timeout (TLP, RFC 8985): two smoothed RTTs, allowing
+#           for a delayed ACK when only one segment is in flight, and no later than the retransmission timeout.
+#
+# @param    srtt    - Smoothed RTT in seconds, or None if no sample has been taken.
+# @param    rto     - Retransmission timeout in seconds.
+# @param    flight  - Number of bytes sent and not yet acknowledged.
+# @param    mss     - Maximum segment size, in bytes.
+#
+# @return   Returns the probe timeout in seconds.
+def probe_timeout(srtt, rto, flight, mss):
+    if srtt is None:
+        pto = INITIAL_PTO
+    else:
+        pto = 2 * srtt
+        if flight <= mss:
+            pto += WC_DEL_ACK_T
+    return min(pto, rto)
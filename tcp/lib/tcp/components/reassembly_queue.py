@@ -0,0 +1,115 @@
+from bisect import bisect_left, bisect_right
+
+##
+# @class    ReassemblyQueue
+# @brief    Class used by the receiver to hold data that arrives ahead of the base value, until the data
+#           before it arrives. The data is kept as a sorted interval map of contiguous runs: segments that
+#           overlap or touch a run are merged into it, so duplicate and overlapping segments are only held
+#           once, and every run that becomes contiguous with the base is passed on in a single step.
+#
+# @note     The queue only holds data within capacity bytes of the base value, which bounds its memory to
+#           the receive window advertised to the sender. Sequence numbers are relative to the ISN. The queue
+#           is only used by the thread processing the receive buffer, so no lock is required.
+class ReassemblyQueue:
+    __slots__ = ('_starts', '_ends', '_runs', '_capacity', '_latest')
+
+    ##
+    # @fn       __init__
+    # @brief    Class constructor for the ReassemblyQueue class.
+    #
+    # @param    capacity    Number of bytes beyond the base value that the queue will hold data for.
+    #
+    # @return   None.
+    def __init__(self, capacity):
+        self._starts    = []        # First sequence number of each run.
+        self._ends      = []        # Sequence number following each run.
+        self._runs      = []        # Data of each run, as bytearrays.
+        self._capacity  = capacity
+        self._latest    = None      # Sequence number of the last segment that added data to the queue.
+        return
+
+    def __len__(self):
+        return len(self._runs)
+
+    ##
+    # @fn       insert
+    # @brief    Adds a segment received ahead of the base value to the queue. Data below the base value or
+    #           beyond the capacity of the queue is discarded, and data already held is kept as it is.
+    #
+    # @param    base    Base value of the receiver.
+    # @param    seq_no  Sequence number of the segment.
+    # @param    data    Bytes-like object holding the data of the segment.
+    #
+    # @return   Returns True if the segment added data that was not already held.
+    def insert(self, base, seq_no, data):
+        view  = memoryview(data)
+        end   = min(seq_no + len(view), base + self._capacity)
+        if seq_no < base:
+            view    = view[(base - seq_no):]
+            seq_no  = base
+        if end <= seq_no:
+            return False
+        view = view[0:(end - seq_no)]
+
+        # Find the runs that overlap or touch the segment, and merge them with the segment into one run,
+        # extending the first run in place when the segment does not start before it.
+        first = bisect_left(self._ends, seq_no)
+        last  = bisect_right(self._starts, end)
+        if (first < last) and (self._starts[first] <= seq_no):
+            start, run, index = self._starts[first], self._runs[first], first + 1
+        else:
+            start, run, index = seq_no, bytearray(), first
+
+        held = sum(len(self._runs[i]) for i in range(first, last))
+        run_end = start + len(run)
+        for i in range(index, last):
+            if run_end < self._starts[i]:
+                run += view[(run_end - seq_no):(self._starts[i] - seq_no)]
+            run += self._runs[i]
+            run_end = self._ends[i]
+        if run_end < end:
+            run += view[(run_end - seq_no):]
+            run_end = end
+
+        self._starts[first:last] = [start]
+        self._ends[first:last]   = [run_end]
+        self._runs[first:last]   = [run]
+        if len(run) == held:
+            return False
+        self._latest = seq_no
+        return True
+
+    ##
+    # @fn       pop
+    # @brief    Removes the data that follows on from the base value, discarding runs the base value has
+    #           already passed.
+    #
+    # @param    base    Base value of the receiver.
+    #
+    # @return   Returns a bytes-like object holding the data starting at the base value, or None if the
+    #           queue holds no data at the base value.
+    def pop(self, base):
+        while self._runs and (self._ends[0] <= base):
+            del self._starts[0], self._ends[0], self._runs[0]
+
+        if (not self._runs) or (self._starts[0] > base):
+            return None
+        start, run = self._starts[0], self._runs[0]
+        del self._starts[0], self._ends[0], self._runs[0]
+        return run if (start == base) else memoryview(run)[(base - start):]
+
+    ##
+    # @fn       blocks
+    # @brief    Returns the ranges of data held by the queue, for use as SACK blocks. The range holding the
+    #           most recently added segment is returned first (RFC 2018), followed by the others in order.
+    #
+    # @param    None.
+    #
+    # @return   Returns a list of (start, end) tuples.
+    def blocks(self):
+        blocks = list(zip(self._starts, self._ends))
+        if not self._latest is None:
+            index = bisect_right(self._starts, self._latest) - 1
+            if (index > 0) and (self._latest < self._ends[index]):
+                blocks.insert(0, blocks.pop(index))
+        return blocks
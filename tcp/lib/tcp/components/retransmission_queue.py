@@ -0,0 +1,97 @@
+from collections import deque
+
+##
+# @class    PendingSegment
+# @brief    Entry of the retransmission queue for a segment that has been sent but not acknowledged.
+class PendingSegment:
+    __slots__ = ('timer', 'seq_no', 'end', 'sent_time', 'sacked', 'retransmitted', 'lost')
+
+    def __init__(self, timer, seq_no, end, sent_time):
+        self.timer          = timer         ## Retransmission timer of the segment.
+        self.seq_no         = seq_no        ## Sequence number of the first byte of the segment, relative to the ISN.
+        self.end            = end           ## Sequence number following the last byte of the segment.
+        self.sent_time      = sent_time     ## Time at which the segment was last sent, used to sample the RTT.
+        self.sacked         = False         ## The receiver has reported holding the segment in a SACK block.
+        self.retransmitted  = False         ## The segment has been sent more than once, so its ACK gives no RTT sample.
+        self.lost           = False         ## The segment has been marked as lost and not sent again since.
+        return
+
+##
+# @class    RetransmissionQueue
+# @brief    Class used to track the segments awaiting an ACK. Segments are kept in a deque in the order they
+#           were first sent, which is the order of their sequence numbers, along with a map from sequence
+#           number to entry. Resending a segment updates its entry in place through the map, and an ACK
+#           removes the acknowledged entries from the front of the deque, so each operation is O(1) per
+#           segment and the queue never holds more than the segments in flight.
+#
+# @note     The queue is not thread safe, callers must hold the lock protecting it.
+class RetransmissionQueue:
+    __slots__ = ('_queue', '_index')
+
+    def __init__(self):
+        self._queue = deque()   # Pending segments ordered by sequence number.
+        self._index = {}        # Pending segments by sequence number.
+        return
+
+    def __len__(self):
+        return len(self._queue)
+
+    def __iter__(self):
+        return iter(self._queue)
+
+    def __reversed__(self):
+        return reversed(self._queue)
+
+    def __contains__(self, seq_no):
+        return seq_no in self._index
+
+    ##
+    # @fn       get
+    # @brief    Looks up a pending segment by its sequence number.
+    #
+    # @param    seq_no  Sequence number of the segment.
+    #
+    # @return   Returns the PendingSegment entry of the segment, or None if it is not awaiting an ACK.
+    def get(self, seq_no):
+        return self._index.get(seq_no)
+
+    ##
+    # @fn       push
+    # @brief    Records that a segment has been sent. If the segment is already pending, it is being resent, so
+    #           its previous timer is cancelled and replaced.
+    #
+    # @param    seq_no      Sequence number of the segment.
+    # @param    end         Sequence number following the segment.
+    # @param    timer       Retransmission timer of the segment, providing a cancel() method.
+    # @param    sent_time   Time at which the segment was sent.
+    #
+    # @return   Returns the PendingSegment entry of the segment.
+    def push(self, seq_no, end, timer, sent_time):
+        segment = self._index.get(seq_no)
+        if segment is None:
+            segment = PendingSegment(timer, seq_no, end, sent_time)
+            self._index[seq_no] = segment
+            self._queue.append(segment)
+        else:
+            segment.timer.cancel()
+            segment.timer           = timer
+            segment.sent_time       = sent_time
+            segment.retransmitted   = True
+            segment.lost            = False
+        return segment
+
+    ##
+    # @fn       acknowledge
+    # @brief    Removes the segments that start before an acknowledgement number from the queue.
+    #
+    # @param    ack_no  Acknowledgement number received, relative to the ISN.
+    #
+    # @return   Returns a list of the removed PendingSegment entries, in sequence number order. Their timers
+    #           are left for the caller to cancel.
+    def acknowledge(self, ack_no):
+        acked = []
+        while self._queue and (self._queue[0].seq_no < ack_no):
+            segment = self._queue.popleft()
+            del self._index[segment.seq_no]
+            acked.append(segment)
+        return acked
@@ -0,0 +1,124 @@
+import math
+import time
+
+TIMESTAMP_HZ    = 1_000_000     # Ticks per second of the TCP timestamps clock.
+INITIAL_RTO     = 1             # Retransmission timeout before the first RTT sample, in seconds (RFC 6298).
+MAX_RTO         = 60            # Upper bound of the retransmission timeout, in seconds.
+
+##
+# @fn       timestamp_now
+#
+# @brief    This function reads the clock used for the TSval field of the TCP timestamps option (RFC 7323).
+#           The clock counts microseconds, as loopback round trip times are well below the 1 ms resolution
+#           usual for TCP, and wraps every 71 minutes. Only the host that sets a TSval interprets it, so the
+#           resolution is local to this implementation.
+#
+# @param    None.
+#
+# @return   Returns the current timestamp as a 32-bit integer.
+def timestamp_now():
+    return int(time.monotonic() * TIMESTAMP_HZ) & 0xFFFFFFFF
+
+##
+# @fn       timestamp_elapsed
+#
+# @brief    This function calculates the time since a timestamp was taken, such as a TSecr value echoed by the
+#           remote host, allowing for the clock wrapping.
+#
+# @param    timestamp   - Timestamp returned by timestamp_now().
+#
+# @return   Returns the elapsed time in seconds.
+def timestamp_elapsed(timestamp):
+    return ((timestamp_now() - timestamp) & 0xFFFFFFFF) / TIMESTAMP_HZ
+
+##
+# @fn       timestamp_before
+#
+# @brief    This function checks whether a timestamp was taken before another, allowing for the clock wrapping
+#           as for the sequence numbers of TCP (RFC 7323).
+#
+# @param    timestamp   - Timestamp returned by timestamp_now().
+# @param    other       - Timestamp returned by timestamp_now().
+#
+# @return   Returns True if timestamp was taken before other.
+def timestamp_before(timestamp, other):
+    return 0 < ((other - timestamp) & 0xFFFFFFFF) < 0x80000000
+
+##
+# @class    RTTEstimator
+# @brief    Class used by the sender to compute the retransmission timeout (RTO) from round trip time samples
+#           as specified by RFC 6298: a smoothed RTT and RTT variance are kept, the RTO is the smoothed RTT plus
+#           four times the variance, bounded below by a minimum RTO and above by MAX_RTO, and each timeout
+#           doubles the RTO until the next sample is taken.
+#
+# @note     When many samples are taken per round trip, as with timestamps, the gains are divided by the
+#           number of samples expected per window (RFC 7323, Appendix G), so that the estimate does not
+#           forget the variance within a single round trip.
+class RTTEstimator:
+    __slots__ = ('srtt', 'rttvar', 'rto', '_min_rto', '_granularity')
+
+    ALPHA   = 1 / 8     ## Gain of the smoothed RTT.
+    BETA    = 1 / 4     ## Gain of the RTT variance.
+    K       = 4         ## Multiplier of the RTT variance in the RTO.
+
+    ##
+    # @fn       __init__
+    # @brief    Class constructor for the RTTEstimator class.
+    #
+    # @param    min_rto     Lower bound of the RTO in seconds. RFC 6298 recommends 1 second.
+    # @param    granularity Resolution of the retransmission timers in seconds.
+    #
+    # @return   None.
+    def __init__(self, min_rto, granularity):
+        self.srtt           = None          ## Smoothed RTT in seconds, None until the first sample.
+        self.rttvar         = None          ## RTT variance in seconds.
+        self.rto            = INITIAL_RTO   ## Current retransmission timeout in seconds.
+        self._min_rto       = min_rto
+        self._granularity   = granularity
+        return
+
+    ##
+    # @fn       sample
+    # @brief    Updates the smoothed RTT and RTT variance with an RTT sample and recomputes the RTO, which
+    #           also clears any backoff. Samples must not be taken from retransmitted segments unless the
+    #           timestamps option identifies which transmission was acknowledged (Karn's algorithm).
+    #
+    # @param    rtt                 Round trip time measured, in seconds.
+    # @param    expected_samples    (optional) Number of samples expected per round trip.
+    #
+    # @return   None.
+    def sample(self, rtt, expected_samples=1):
+        if self.srtt is None:
+            self.srtt   = rtt
+            self.rttvar = rtt / 2
+        else:
+            alpha       = self.ALPHA / expected_samples
+            beta        = self.BETA  / expected_samples
+            self.rttvar = ((1 - beta) * self.rttvar) + (beta * abs(self.srtt - rtt))
+            self.srtt   = ((1 - alpha) * self.srtt) + (alpha * rtt)
+        self.rto = min(max((self.srtt + max(self._granularity, (self.K * self.rttvar))), self._min_rto), MAX_RTO)
+        return
+
+    ##
+    # @fn       backoff
+    # @brief    Doubles the RTO after a retransmission timer expires, up to MAX_RTO.
+    #
+    # @param    None.
+    #
+    # @return   None.
+    def backoff(self):
+        self.rto = min((self.rto * 2), MAX_RTO)
+        return
+
+    ##
+    # @fn       expected_samples
+    # @brief    Calculates the number of RTT samples expected per round trip when every other segment is
+    #           acknowledged (RFC 7323, Appendix G).
+    #
+    # @param    flight  Number of bytes sent and not yet acknowledged.
+    # @param    mss     Maximum segment size, in bytes.
+    #
+    # @return   Returns the expected number of samples, at least 1.
+    @staticmethod
+    def expected_samples(flight, mss):
+        return max(1, math.ceil(flight / (2 * mss)))
@@ -0,0 +1,90 @@
+from bisect import bisect_left, bisect_right
+
+##
+# @class    SACKScoreboard
+# @brief    Class used by the sender to record the ranges of data that the receiver has reported holding in
+#           selective acknowledgement (SACK) blocks (RFC 2018), so that only the missing ranges are sent
+#           again after a loss. Ranges are kept sorted and merged, as two parallel lists of start and end
+#           sequence numbers.
+#
+# @note     Sequence numbers are relative to the ISN. The scoreboard is not thread safe, callers must hold
+#           the lock protecting it.
+class SACKScoreboard:
+    __slots__ = ('_starts', '_ends')
+
+    def __init__(self):
+        self._starts    = []    # First sequence number of each SACKed range.
+        self._ends      = []    # Sequence number following each SACKed range.
+        return
+
+    def __len__(self):
+        return len(self._starts)
+
+    def __iter__(self):
+        return zip(self._starts, self._ends)
+
+    ##
+    # @fn       update
+    # @brief    Adds the SACK blocks of an ACK to the scoreboard, merging them with the recorded ranges.
+    #
+    # @param    blocks  Iterable of (start, end) tuples, with end being the sequence number following the block.
+    #
+    # @return   Returns True if any of the blocks reported data that was not already recorded.
+    def update(self, blocks):
+        changed = False
+        for start, end in blocks:
+            if end <= start:
+                continue
+
+            # Find the recorded ranges that overlap or touch the block, and replace them with their union.
+            first = bisect_left(self._ends, start)
+            last  = bisect_right(self._starts, end)
+            if (first == (last - 1)) and (self._starts[first] <= start) and (end <= self._ends[first]):
+                continue
+            if first < last:
+                start = min(start, self._starts[first])
+                end   = max(end, self._ends[last - 1])
+            self._starts[first:last] = [start]
+            self._ends[first:last]   = [end]
+            changed = True
+        return changed
+
+    ##
+    # @fn       advance
+    # @brief    Discards the recorded data below a cumulative acknowledgement number.
+    #
+    # @param    ack_no  Cumulative acknowledgement number received.
+    #
+    # @return   None.
+    def advance(self, ack_no):
+        first = bisect_right(self._ends, ack_no)
+        if first > 0:
+            del self._starts[:first]
+            del self._ends[:first]
+        if self._starts and (self._starts[0] < ack_no):
+            self._starts[0] = ack_no
+        return
+
+    ##
+    # @fn       is_sacked
+    # @brief    Checks whether a range of data has been reported as received by the receiver.
+    #
+    # @param    start   First sequence number of the range.
+    # @param    end     Sequence number following the range.
+    #
+    # @return   Returns True if the whole range is within a SACKed range.
+    def is_sacked(self, start, end):
+        index = bisect_right(self._starts, start) - 1
+        return (index >= 0) and (end <= self._ends[index])
+
+    ##
+    # @fn       clear
+    # @brief    Discards every recorded range.
+    #
+    # @param    None.
+    #
+    # @return   None.
+    def clear(self):
+        self._starts.clear()
+        self._ends.clear()
+        return
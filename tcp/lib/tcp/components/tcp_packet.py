@@ -1,10 +1,53 @@
-from . import checksum as cslib
+import struct
+from .integrity import INTERNET_CHECKSUM
+
+HEADER_LEN      = 24                                # Number of bytes in the TCP header without variable-length options.
+HEADER_LEN_BITS = (HEADER_LEN // 4) << 4            # Value stored in the header length byte of the TCP header, in 32-bit words.
+MAX_HEADER_LEN  = 60                                # Number of bytes in the TCP header with the largest header length value.
+
+_HEADER = struct.Struct('!HHIIBBHHHI')              # Source port through TCP options, see the packet structure below.
+_U8     = struct.Struct('!B')
+_U16    = struct.Struct('!H')
+_U32    = struct.Struct('!I')
+_OPTION = struct.Struct('!BBH')                     # Option kind, option length and 16 bits of option data.
+_SACK_BLOCK = struct.Struct('!II')                  # Left and right edge of a SACK block.
+_TIMESTAMPS = struct.Struct('!II')                  # TSval and TSecr fields of the timestamps option.
+
+OPTION_EOL              = 0                         # Option kind marking the end of the option list.
+OPTION_NOP              = 1                         # Option kind used to pad options to a 32-bit boundary.
+WINDOW_SCALE            = 3                         # Option kind carrying the window scale shift count in a SYN (RFC 7323).
+MAX_WINDOW_SCALE        = 14                        # Largest window scale shift count (RFC 7323).
+SACK_PERMITTED          = 4                         # Option kind enabling selective acknowledgements in a SYN (RFC 2018).
+SACK                    = 5                         # Option kind carrying selective acknowledgement blocks (RFC 2018).
+MAX_SACK_BLOCKS         = 4                         # Number of SACK blocks that fit in the variable-length options.
+TIMESTAMPS              = 8                         # Option kind carrying the TSval and TSecr timestamps (RFC 7323).
+
+ALT_CHECKSUM_REQUEST    = 14                        # Option kind requesting an alternate checksum in a SYN (RFC 1146).
+ALT_CHECKSUM_DATA       = 15                        # Option kind carrying the high 16 bits of a 32-bit checksum.
+
+_ZERO_CHECKSUM  = bytes(2)
+_ZERO_OPTIONS   = bytes(4)
 
 ##
 # @class    Packet
 # @brief    Class used to encapsulate the TCP packet structure and provide an interface
 #           for providing access to values within the TCP packet on demand.
 #
+# @note     The packet is held in a single buffer. Header fields are read from and written to the
+#           buffer in place, and the data of a parsed packet is a memoryview into the received buffer.
+#           Nothing is decoded when a packet is received, each field is decoded from the buffer when it
+#           is accessed, and the checksum is only verified the first time is_valid() is called.
+#
+# @note     The checksum is calculated with the packet's integrity algorithm (see integrity.py). SYN packets
+#           always use the Internet checksum, as the algorithm is negotiated during the handshake (RFC 1146).
+#           A 32-bit CRC32C value is split between the checksum field (low 16 bits) and an option of kind
+#           ALT_CHECKSUM_DATA in the TCP options (high 16 bits). Algorithms that cannot be updated
+#           incrementally are recalculated once, when the packet is next read, rather than on every change.
+#
+# @note     The TCP options hold a fixed 4-byte slot, used by the alternate checksum options, followed by
+#           variable-length options such as SACK, up to the header length. The header length is stored in
+#           32-bit words as in RFC 793, and the data follows the header.
+#
 # @note     Packet Structure:
 # |            |             Data              |
 # |    Byte    | 7 | 6 | 5 | 4 | 3 | 2 | 1 | 0 | Details
@@ -32,11 +75,15 @@ from . import checksum as cslib
 # |          21|       TCP Options   [23:16]   | Options
 # |          22|       TCP Options   [15:8]    | Options
 # |          23|       TCP Options   [7:0]     | Options
-# |          24|              Data             | Data
+# |          24|  Variable-length TCP Options  | Options, if the header length is more than 24 bytes.
+# |         ...|  Variable-length TCP Options  | Options
+# |           H|              Data             | Data, starting at the header length H.
 # |         ...|              Data             | Data
 # |         N-1|              Data             | Data
 # |           N|              Data             | Data
 class TCP_Packet:
+    __slots__ = ('_buffer', '_view', '_length', '_valid', '_integrity', '_stale')
+
     ##
     # @fn       __init__
     # @brief    Class constructor for the TCP_Packet class.
@@ -55,50 +102,65 @@ class TCP_Packet:
     # @param    rst         (optional) TCP managements bits RST-bit value.
     # @param    syn         (optional) TCP managements bits SYN-bit value.
     # @param    fin         (optional) TCP managements bits FIN-bit value.
+    # @param    integrity   (optional) Integrity algorithm used to calculate the checksum of the packet.
     #
     # @return   None.
-    def __init__(self, src_port, dst_port, seq_no, ack_no, rcv_window, data, cwr=0, ece=0, urg=0, ack=0, psh=0, rst=0, syn=0, fin=0):
-        self._src_port      = bytearray(src_port.to_bytes(2, byteorder='big'))
-        self._dst_port      = bytearray(dst_port.to_bytes(2, byteorder='big'))
-        self._seq_no        = bytearray(seq_no.to_bytes(4, byteorder='big'))
-        self._ack_no        = bytearray(ack_no.to_bytes(4, byteorder='big'))
-        self._header_len    = bytearray(int((24 & 0xF) << 4).to_bytes(1, byteorder='big'))
-        self._mgmt_bits     = bytearray(int((cwr << 7) | (ece << 6) | (urg << 5) | (ack << 4) | (psh << 3) | (rst << 2) | (syn << 1) | (fin)).to_bytes(1, 'big'))
-        self._rcv_window    = bytearray(rcv_window.to_bytes(2, byteorder='big'))
-        self._checksum      = bytearray(int(0).to_bytes(2, byteorder='big'))
-        self._urg_data_ptr  = bytearray(int(0).to_bytes(2, byteorder='big'))
-        self._options       = bytearray(int(0).to_bytes(4, byteorder='big'))
-        self._data          = data
+    def __init__(self, src_port, dst_port, seq_no, ack_no, rcv_window, data, cwr=0, ece=0, urg=0, ack=0, psh=0, rst=0, syn=0, fin=0, integrity=INTERNET_CHECKSUM):
+        data_len        = 0 if data is None else len(data)
+        mgmt_bits       = (cwr << 7) | (ece << 6) | (urg << 5) | (ack << 4) | (psh << 3) | (rst << 2) | (syn << 1) | (fin)
+        self._buffer    = bytearray(HEADER_LEN + data_len)  # Buffer holding the packet, sized to fit the largest data assigned.
+        self._view      = memoryview(self._buffer)          # View used to access the buffer without copying.
+        self._length    = HEADER_LEN + data_len             # Number of bytes of the buffer in use by the packet.
+        self._valid     = True                              # Cached result of is_valid(), None until the checksum is verified.
+        self._integrity = integrity                         # Integrity algorithm used for the checksum.
+        self._stale     = False                             # True if the checksum must be recalculated before the packet is read.
 
         # Construct the TCP packet based on the provided input data.
-        if self._data is None:
-            self._packet =  self._src_port     + \
-                            self._dst_port     + \
-                            self._seq_no       + \
-                            self._ack_no       + \
-                            self._header_len   + \
-                            self._mgmt_bits    + \
-                            self._rcv_window   + \
-                            self._checksum     + \
-                            self._urg_data_ptr + \
-                            self._options
-        else:
-            self._packet =  self._src_port     + \
-                            self._dst_port     + \
-                            self._seq_no       + \
-                            self._ack_no       + \
-                            self._header_len   + \
-                            self._mgmt_bits    + \
-                            self._rcv_window   + \
-                            self._checksum     + \
-                            self._urg_data_ptr + \
-                            self._options      + \
-                            self._data
-        cs = bytearray(cslib.checksum(self._packet))  #TODO: Insert checksum library.
-        self._packet[16:18] = cs
-        self._checksum      = cs
+        _HEADER.pack_into(self._buffer, 0, src_port, dst_port, seq_no, ack_no, HEADER_LEN_BITS, mgmt_bits, rcv_window, 0, 0, 0)
+        if data_len > 0:
+            self._view[HEADER_LEN:self._length] = data
+        self._recalculate_checksum()
         return
 
+    ##
+    # @fn       empty
+    # @brief    Class method used to create a packet with an empty, writable buffer that can be filled by a
+    #           receiving socket. No header is written and no checksum is calculated.
+    #
+    # @param    buffer_size Number of bytes to allocate for the packet buffer.
+    #
+    # @return   Returns the new TCP_Packet object.
+    @classmethod
+    def empty(cls, buffer_size):
+        packet          = cls.__new__(cls)
+        packet._buffer  = bytearray(buffer_size)
+        packet._view    = memoryview(packet._buffer)
+        packet._length  = 0
+        packet._valid       = None
+        packet._integrity   = INTERNET_CHECKSUM
+        packet._stale       = False
+        return packet
+
+    ##
+    # @fn       receive
+    # @brief    Receives a datagram from a socket directly into the packet buffer, replacing the contents of
+    #           the packet without allocating a new buffer.
+    #
+    # @param    sock        Socket object the datagram is received from.
+    # @param    integrity   (optional) Integrity algorithm the datagram was sent with.
+    #
+    # @return   Returns the address the datagram was received from.
+    #
+    # @note     The packet must own a writable buffer large enough for the datagram, such as a packet created
+    #           by TCP_Packet.empty(). Datagrams larger than the buffer are truncated by the socket.
+    def receive(self, sock, integrity=None):
+        self._length, address = sock.recvfrom_into(self._buffer)
+        self._valid           = None
+        self._stale           = False
+        if not integrity is None:
+            self._integrity = integrity
+        return address
+
     ##
     # @fn       is_valid
     # @brief    Validates the checksum of the packet.
@@ -106,233 +168,479 @@ class TCP_Packet:
     # @param    None.
     #
     # @return   Returns True if the checksum is valid, and returns False if the checksum is invalid.
+    #
+    # @note     The checksum is verified once per received buffer and the result is cached. Changing a header
+    #           field keeps the cached result, since the checksum is updated incrementally from its old value.
     def is_valid(self):
-        cs         = self._checksum
-        pkt        = self._packet
-        pkt[16:18] = bytearray(int(0).to_bytes(2, byteorder='big'))
-        if cs == bytearray(cslib.checksum(pkt)):
-            return True
-        else:
-            return False
+        if self._stale:
+            self._recalculate_checksum()
+
+        if self._valid is None:
+            integrity = self._active_integrity()
+            if (self._length < HEADER_LEN) or not (HEADER_LEN <= self.header_len <= self._length):
+                self._valid = False
+            elif integrity.size == 0:
+                self._valid = True
+            else:
+                self._valid = (self._stored_checksum(integrity) == self._calculate_checksum(integrity))
+        return self._valid
 
-    ## 
+    ##
+    # @fn       _active_integrity
+    # @brief    Private method used to get the integrity algorithm that applies to the packet in its current state.
+    #
+    # @param    None.
+    #
+    # @return   Returns the integrity algorithm object.
+    def _active_integrity(self):
+        if self._view[13] & 0b0000_0010:
+            return INTERNET_CHECKSUM
+        return self._integrity
+
+    ##
+    # @fn       _stored_checksum
+    # @brief    Private method used to read the checksum stored in the packet.
+    #
+    # @param    integrity   Integrity algorithm the checksum was calculated with.
+    #
+    # @return   Returns the checksum as an integer, or None if the packet does not carry a checksum of the
+    #           size used by the algorithm.
+    def _stored_checksum(self, integrity):
+        checksum = _U16.unpack_from(self._view, 16)[0]
+        if integrity.size > 2:
+            kind, length, high = _OPTION.unpack_from(self._view, 20)
+            if (kind != ALT_CHECKSUM_DATA) or (length != 4):
+                return None
+            checksum |= high << 16
+        return checksum
+
+    ##
+    # @fn       _calculate_checksum
+    # @brief    Private method used to calculate the packet checksum over the packet, treating the checksum
+    #           field (and for 32-bit checksums, the TCP options) as zero without modifying the packet.
+    #
+    # @param    integrity   Integrity algorithm used to calculate the checksum.
+    #
+    # @return   Returns the checksum as an integer.
+    def _calculate_checksum(self, integrity):
+        # Every region starts on a 16-bit word boundary, so the Internet checksum
+        # can sum each region separately and combine them.
+        view = self._view
+        return integrity.value(view[0:16], _ZERO_CHECKSUM, view[18:20],
+                               _ZERO_OPTIONS if (integrity.size > 2) else view[20:24], view[24:self._length])
+
+    ##
+    # @fn       _make_writable
+    # @brief    Private method used to copy a packet that references a read-only buffer into a writable buffer
+    #           before one of its fields is changed.
+    #
+    # @param    None.
+    #
+    # @return   None.
+    def _make_writable(self):
+        if self._view.readonly:
+            self._buffer = bytearray(self._view[0:self._length])
+            self._view   = memoryview(self._buffer)
+
+    ##
+    # @fn       _update_field
+    # @brief    Private method used to write a header field into the packet in place and incrementally update
+    #           the packet checksum from the old and new 16-bit words covering the field (RFC 1624).
+    #
+    # @param    offset  Byte offset of the field within the packet.
+    # @param    fmt     struct.Struct object used to pack the field.
+    # @param    value   Integer value of the field.
+    #
+    # @return   None.
+    #
+    # @note     If the integrity algorithm cannot be updated incrementally, the field is written and the
+    #           checksum is marked stale, to be recalculated once when the packet is next read.
+    def _update_field(self, offset, fmt, value):
+        self._make_writable()
+        integrity = self._active_integrity()
+        if self._stale or not integrity.incremental:
+            fmt.pack_into(self._buffer, offset, value)
+            self._stale = True
+            return
+
+        start = offset & ~1                             # First byte of the 16-bit words covering the field.
+        end   = (offset + fmt.size + 1) & ~1            # End of the 16-bit words covering the field.
+        old   = self._buffer[start:end]
+
+        fmt.pack_into(self._buffer, offset, value)
+        self._view[16:18] = integrity.update(self._view[16:18], old, self._view[start:end])
+
+    ##
     # @fn       _recalculate_checksum
-    # @brief    Private method used to recalculate the packet checksum when a value is changed using a setter method.
+    # @brief    Private method used to recalculate the packet checksum over the full packet.
     #
     # @param    None.
     #
     # @return   None.
     def _recalculate_checksum(self):
-        self._checksum = int(0).to_bytes(2, byteorder='big')
-        
-        if self._data is None:
-            self._packet =  self._src_port     + \
-                            self._dst_port     + \
-                            self._seq_no       + \
-                            self._ack_no       + \
-                            self._header_len   + \
-                            self._mgmt_bits    + \
-                            self._rcv_window   + \
-                            self._checksum     + \
-                            self._urg_data_ptr + \
-                            self._options
-        else:
-            self._packet =  self._src_port     + \
-                            self._dst_port     + \
-                            self._seq_no       + \
-                            self._ack_no       + \
-                            self._header_len   + \
-                            self._mgmt_bits    + \
-                            self._rcv_window   + \
-                            self._checksum     + \
-                            self._urg_data_ptr + \
-                            self._options      + \
-                            self._data
-
-        cs = bytearray(cslib.checksum(self._packet))
-        self._packet[16:18] = cs
-        self._checksum      = cs
+        integrity = self._active_integrity()
+        checksum  = self._calculate_checksum(integrity)
+        _U16.pack_into(self._buffer, 16, checksum & 0xFFFF)
+        if integrity.size > 2:
+            _OPTION.pack_into(self._buffer, 20, ALT_CHECKSUM_DATA, 4, checksum >> 16)
+        self._valid = True
+        self._stale = False
 
     # self._packet getter and setter properties.
     @property
-    def packet(self):        
-        return self._packet
+    def packet(self):
+        if self._stale:
+            self._recalculate_checksum()
+        return self._view[0:self._length]
 
     @packet.setter
     def packet(self, packet):
-        self._packet        = bytearray(packet)
-        self._src_port      = self._packet[0:2]
-        self._dst_port      = self._packet[2:4]
-        self._seq_no        = self._packet[4:8]
-        self._ack_no        = self._packet[8:12]
-        self._header_len    = self._packet[12].to_bytes(1, 'big')
-        self._mgmt_bits     = self._packet[13].to_bytes(1, 'big')
-        self._rcv_window    = self._packet[14:16]
-        self._checksum      = self._packet[16:18]
-        self._urg_data_ptr  = self._packet[18:20]
-        self._options       = self._packet[20:25]
-
-        if len(packet) < 25:
-            self._data = None
-        else:
-            self._data = self._packet[24:]
-        
+        # Reference the received buffer rather than copying it. A read-only buffer
+        # is only copied if a header field of the packet is changed.
+        self._buffer = packet
+        self._view   = memoryview(packet)
+        self._length = len(self._view)
+        self._valid  = None
+        self._stale  = False
+
+    # self._integrity getter and setter properties.
+    @property
+    def integrity(self):
+        return self._integrity
+
+    @integrity.setter
+    def integrity(self, integrity):
+        # Changing the algorithm recalculates the checksum of the packet, so this is only
+        # meant for packets being sent. Received packets take the algorithm from receive().
+        self._integrity = integrity
+        self._make_writable()
+        self._recalculate_checksum()
+
     # self._src_port getter and setter properties.
     @property
     def src_port(self):
-        return int.from_bytes(self._src_port, 'big')
+        return _U16.unpack_from(self._view, 0)[0]
 
     @src_port.setter
     def src_port(self, port_no):
-        self._src_port = port_no.to_bytes(2, byteorder='big')
-        self._recalculate_checksum()
+        self._update_field(0, _U16, port_no)
 
     # self._dst_port getter and setter properties.
     @property
     def dst_port(self):
-        return int.from_bytes(self._dst_port, 'big')
+        return _U16.unpack_from(self._view, 2)[0]
 
     @dst_port.setter
     def dst_port(self, port_no):
-        self._dst_port = port_no.to_bytes(2, byteorder='big')
-        self._recalculate_checksum()
+        self._update_field(2, _U16, port_no)
 
     # self._seq_no getter and setter properties.
     @property
     def seq_no(self):
-        return int.from_bytes(self._seq_no, 'big')
+        return _U32.unpack_from(self._view, 4)[0]
 
     @seq_no.setter
     def seq_no(self, seq_no):
-        self._seq_no = seq_no.to_bytes(4, byteorder='big')
-        self._recalculate_checksum()
+        self._update_field(4, _U32, seq_no)
 
     # self._ack_no getter and setter properties.
     @property
     def ack_no(self):
-        return int.from_bytes(self._ack_no, 'big')
+        return _U32.unpack_from(self._view, 8)[0]
 
     @ack_no.setter
     def ack_no(self, ack_no):
-        self._ack_no = ack_no.to_bytes(4, byteorder='big')
-        self._recalculate_checksum()
+        self._update_field(8, _U32, ack_no)
 
-    # self._header_len getter property.
+    # self._header_len getter property, in bytes.
     @property
     def header_len(self):
-        return ((int.from_bytes(self._header_len, 'big') >> 4) & 0xF)
+        return ((self._view[12] >> 4) & 0xF) * 4
 
     # self._rcv_window getter and setter properties.
     @property
     def rcv_window(self):
-        return int.from_bytes(self._rcv_window, 'big')
+        return _U16.unpack_from(self._view, 14)[0]
 
     @rcv_window.setter
     def rcv_window(self, rcv_window):
-        self._rcv_window = rcv_window.to_bytes(2, byteorder='big')
-        self._recalculate_checksum()
+        self._update_field(14, _U16, rcv_window)
 
     # self._checksum getter and setter properties.
     @property
     def checksum(self):
-        return self._checksum
+        if self._stale:
+            self._recalculate_checksum()
+        return bytes(self._view[16:18])
 
     @checksum.setter
     def checksum(self, checksum):
-        self._checksum = checksum
-        self._recalculate_checksum()
+        # The two bytes given are written as they are, so that a packet can be given a chosen checksum, such
+        # as a corrupted one. A header field or the data changed afterwards updates the checksum from them.
+        self._make_writable()
+        self._view[16:18] = checksum
+        self._valid = None
+        self._stale = False
 
     # self._data getter and setter properties.
     @property
     def data(self):
-        return self._data
+        header_len = self.header_len
+        if self._length <= header_len:
+            return None
+        return self._view[header_len:self._length]
 
     @data.setter
     def data(self, data):
-        self._data = data
+        # The data is copied into the packet buffer after the header rather than referenced, as sendto() sends a
+        # datagram from a single contiguous buffer. Only the received path references its buffer without copying.
+        header_len = self.header_len
+        length     = header_len + (0 if data is None else len(data))
+
+        # Reuse the packet buffer when the data fits, only allocating a larger buffer
+        # (and carrying over the header) when the data has outgrown it.
+        if self._view.readonly or (length > len(self._buffer)):
+            buffer = bytearray(length)
+            buffer[0:header_len] = self._view[0:header_len]
+            self._buffer = buffer
+            self._view   = memoryview(buffer)
+
+        if not data is None:
+            self._view[header_len:length] = data
+        self._length = length
+        if self._active_integrity().incremental:
+            self._recalculate_checksum()
+        else:
+            self._stale = True
+
+    # self._options getter and setter properties.
+    @property
+    def options(self):
+        return bytes(self._view[20:24])
+
+    @options.setter
+    def options(self, options):
+        self._update_field(20, _U32, int.from_bytes(options, 'big'))
 
-        if len(self._packet) > 24:
-            self._packet = self._packet[0:24]
+    ##
+    # @fn       _variable_options
+    # @brief    Private method used to parse the variable-length options following the fixed options slot.
+    #
+    # @param    None.
+    #
+    # @return   Returns a list of (kind, start, end) tuples, giving the offsets of the option data in the packet.
+    def _variable_options(self):
+        view    = self._view
+        offset  = HEADER_LEN
+        end     = min(self.header_len, self._length)
+        options = []
+        while offset < end:
+            kind = view[offset]
+            if kind == OPTION_EOL:
+                break
+            if kind == OPTION_NOP:
+                offset += 1
+                continue
+            if (offset + 1) >= end:
+                break
+            length = view[offset + 1]
+            if (length < 2) or ((offset + length) > end):
+                break
+            options.append((kind, (offset + 2), (offset + length)))
+            offset += length
+        return options
 
-        if self._data is None:
-            self._packet = self._packet[0:24]
+    ##
+    # @fn       _find_option
+    # @brief    Private method used to find a variable-length option in the packet.
+    #
+    # @param    kind    Option kind to find.
+    #
+    # @return   Returns a memoryview of the option data, or None if the packet does not hold the option.
+    def _find_option(self, kind):
+        if self.header_len <= HEADER_LEN:
+            return None
+        for option_kind, start, end in self._variable_options():
+            if option_kind == kind:
+                return self._view[start:end]
+        return None
+
+    ##
+    # @fn       _set_option
+    # @brief    Private method used to add, replace or remove a variable-length option. The options are padded
+    #           to a 32-bit boundary with leading NOP options, and the header length and the position of the
+    #           data are updated to match.
+    #
+    # @param    kind    Option kind to set.
+    # @param    data    Bytes object holding the option data, or None to remove the option.
+    #
+    # @return   None.
+    def _set_option(self, kind, data):
+        header_len = self.header_len
+        if (data is None) and (header_len <= HEADER_LEN):
+            return
+
+        options = [(option_kind, bytes(self._view[start:end])) for option_kind, start, end in self._variable_options() if option_kind != kind]
+        if not data is None:
+            options.append((kind, data))
+        encoded = b''.join(bytes((option_kind, len(option_data) + 2)) + option_data for option_kind, option_data in options)
+        encoded = bytes([OPTION_NOP] * (-len(encoded) % 4)) + encoded
+
+        new_header_len = HEADER_LEN + len(encoded)
+        if new_header_len > MAX_HEADER_LEN:
+            raise ValueError(f"TCP options of {len(encoded)} bytes do not fit in the TCP header.")
+        if (new_header_len == header_len) and (self._view[HEADER_LEN:header_len] == encoded):
+            return
+
+        # Move the data to follow the new options, and store the new header length.
+        data_bytes = bytes(self._view[header_len:self._length])
+        length     = new_header_len + len(data_bytes)
+        if self._view.readonly or (length > len(self._buffer)):
+            buffer = bytearray(length)
+            buffer[0:HEADER_LEN] = self._view[0:HEADER_LEN]
+            self._buffer = buffer
+            self._view   = memoryview(buffer)
+        self._view[HEADER_LEN:new_header_len] = encoded
+        self._view[new_header_len:length]     = data_bytes
+        self._buffer[12]                      = ((new_header_len // 4) << 4) | (self._buffer[12] & 0xF)
+        self._length                          = length
+        if self._active_integrity().incremental:
+            self._recalculate_checksum()
         else:
-            self._packet += self._data
+            self._stale = True
 
-        self._recalculate_checksum()
+    # Window scale option getter and setter properties, as the shift count, or None if the packet does not
+    # carry the option.
+    @property
+    def window_scale(self):
+        option_data = self._find_option(WINDOW_SCALE)
+        if (option_data is None) or (len(option_data) != 1):
+            return None
+        return option_data[0]
+
+    @window_scale.setter
+    def window_scale(self, shift):
+        self._set_option(WINDOW_SCALE, None if (shift is None) else bytes((shift,)))
+
+    # SACK-permitted option getter and setter properties.
+    @property
+    def sack_permitted(self):
+        return not self._find_option(SACK_PERMITTED) is None
+
+    @sack_permitted.setter
+    def sack_permitted(self, permitted):
+        self._set_option(SACK_PERMITTED, b'' if permitted else None)
+
+    # SACK option getter and setter properties, as a list of (left edge, right edge) tuples.
+    @property
+    def sack_blocks(self):
+        option_data = self._find_option(SACK)
+        if option_data is None:
+            return []
+        return [_SACK_BLOCK.unpack_from(option_data, offset) for offset in range(0, len(option_data) - 7, 8)]
+
+    @sack_blocks.setter
+    def sack_blocks(self, blocks):
+        # Only send the blocks that fit alongside the other options, such as timestamps.
+        room   = (MAX_HEADER_LEN - HEADER_LEN) - sum((end - start) + 2 for kind, start, end in self._variable_options() if kind != SACK)
+        blocks = blocks[:min(MAX_SACK_BLOCKS, ((room - 2) // _SACK_BLOCK.size))]
+        self._set_option(SACK, b''.join(_SACK_BLOCK.pack(left, right) for left, right in blocks) if blocks else None)
+
+    # Timestamps option getter and setter properties, as a (TSval, TSecr) tuple, or None if the packet does
+    # not carry the option. Setting the timestamps of a packet that already carries the option updates them
+    # in place, so that they can be set cheaply on every packet sent.
+    @property
+    def timestamps(self):
+        option_data = self._find_option(TIMESTAMPS)
+        if (option_data is None) or (len(option_data) != _TIMESTAMPS.size):
+            return None
+        return _TIMESTAMPS.unpack_from(option_data)
+
+    @timestamps.setter
+    def timestamps(self, timestamps):
+        if not timestamps is None:
+            for kind, start, end in self._variable_options():
+                if (kind == TIMESTAMPS) and ((end - start) == _TIMESTAMPS.size):
+                    self._update_field(start, _U32, timestamps[0])
+                    self._update_field((start + 4), _U32, timestamps[1])
+                    return
+        self._set_option(TIMESTAMPS, None if (timestamps is None) else _TIMESTAMPS.pack(*timestamps))
 
     # TCP management bit getter and setter properties.
+    def _set_mgmt_bit(self, bit, value):
+        mgmt_bits = (self._view[13] & ~(1 << bit)) | ((value & 0b1) << bit)
+
+        # Setting or clearing the SYN bit can change the integrity algorithm that applies to the packet.
+        if (bit == 1) and not (self._integrity is INTERNET_CHECKSUM):
+            self._make_writable()
+            self._buffer[13] = mgmt_bits
+            self._stale      = True
+            return
+        self._update_field(13, _U8, mgmt_bits)
+
     @property
     def mgmt_cwr(self):
-        return ((int.from_bytes(self._mgmt_bits, 'big') & 0b1000_0000) >> 7)
+        return ((self._view[13] & 0b1000_0000) >> 7)
 
     @mgmt_cwr.setter
     def mgmt_cwr(self, cwr):
-        self._mgmt_bits = ((int.from_bytes(self._mgmt_bits, 'big') & 0b0111_1111) | ((cwr & 0b1) << 7)).to_bytes(1, 'big')
-        self._recalculate_checksum()
+        self._set_mgmt_bit(7, cwr)
 
     @property
     def mgmt_ece(self):
-        return ((int.from_bytes(self._mgmt_bits, 'big') & 0b0100_0000) >> 6)
+        return ((self._view[13] & 0b0100_0000) >> 6)
 
     @mgmt_ece.setter
     def mgmt_ece(self, ece):
-        self._mgmt_bits = ((int.from_bytes(self._mgmt_bits, 'big') & 0b1011_1111) | ((ece & 0b1) << 6)).to_bytes(1, 'big')
-        self._recalculate_checksum()
+        self._set_mgmt_bit(6, ece)
 
     @property
     def mgmt_urg(self):
-        return ((int.from_bytes(self._mgmt_bits, 'big') & 0b0010_0000) >> 5)
+        return ((self._view[13] & 0b0010_0000) >> 5)
 
     @mgmt_urg.setter
     def mgmt_urg(self, urg):
-        self._mgmt_bits = ((int.from_bytes(self._mgmt_bits, 'big') & 0b1101_1111) | ((urg & 0b1) << 5)).to_bytes(1, 'big')
-        self._recalculate_checksum()
+        self._set_mgmt_bit(5, urg)
 
     @property
     def mgmt_ack(self):
-        return ((int.from_bytes(self._mgmt_bits, 'big') & 0b0001_0000) >> 4)
+        return ((self._view[13] & 0b0001_0000) >> 4)
 
     @mgmt_ack.setter
     def mgmt_ack(self, ack):
-        self._mgmt_bits = ((int.from_bytes(self._mgmt_bits, 'big') & 0b1110_1111) | ((ack & 0b1) << 4)).to_bytes(1, 'big')
-        self._recalculate_checksum()
+        self._set_mgmt_bit(4, ack)
 
     @property
     def mgmt_psh(self):
-        return ((int.from_bytes(self._mgmt_bits, 'big') & 0b0000_1000) >> 3)
+        return ((self._view[13] & 0b0000_1000) >> 3)
 
     @mgmt_psh.setter
     def mgmt_psh(self, psh):
-        self._mgmt_bits = ((int.from_bytes(self._mgmt_bits, 'big') & 0b1111_0111) | ((psh & 0b1) << 3)).to_bytes(1, 'big')
-        self._recalculate_checksum()
+        self._set_mgmt_bit(3, psh)
 
     @property
     def mgmt_rst(self):
-        return ((int.from_bytes(self._mgmt_bits, 'big') & 0b0000_0100) >> 2)
+        return ((self._view[13] & 0b0000_0100) >> 2)
 
     @mgmt_rst.setter
     def mgmt_rst(self, rst):
-        self._mgmt_bits = ((int.from_bytes(self._mgmt_bits, 'big') & 0b1111_1011) | ((rst & 0b1) << 2)).to_bytes(1, 'big')
-        self._recalculate_checksum()
+        self._set_mgmt_bit(2, rst)
 
     @property
     def mgmt_syn(self):
-        return ((int.from_bytes(self._mgmt_bits, 'big') & 0b0000_0010) >> 1)
+        return ((self._view[13] & 0b0000_0010) >> 1)
 
     @mgmt_syn.setter
     def mgmt_syn(self, syn):
-        self._mgmt_bits = ((int.from_bytes(self._mgmt_bits, 'big') & 0b1111_1101) | ((syn & 0b1) << 1)).to_bytes(1, 'big')
-        self._recalculate_checksum()
+        self._set_mgmt_bit(1, syn)
 
     @property
     def mgmt_fin(self):
-        return ((int.from_bytes(self._mgmt_bits, 'big') & 0b0000_0001) >> 0)
+        return ((self._view[13] & 0b0000_0001) >> 0)
 
     @mgmt_fin.setter
     def mgmt_fin(self, fin):
-        self._mgmt_bits = ((int.from_bytes(self._mgmt_bits, 'big') & 0b1111_1110) | ((fin & 0b1) << 0)).to_bytes(1, 'big')
-        self._recalculate_checksum()
+        self._set_mgmt_bit(0, fin)
 
 if __name__ == "__main__":
     data = bytearray(10)
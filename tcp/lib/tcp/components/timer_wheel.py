@@ -0,0 +1,153 @@
+import math
+import sys
+import threading
+import time
+
+##
+# @class    WheelTimer
+# @brief    Handle to a callback scheduled on a TimerWheel. Provides the cancel() method of threading.Timer,
+#           so that it can be used in its place.
+class WheelTimer:
+    __slots__ = ('_wheel', 'tick', 'function', 'args', 'cancelled')
+
+    def __init__(self, wheel, tick, function, args):
+        self._wheel     = wheel
+        self.tick       = tick          ## Tick of the wheel at which the timer expires.
+        self.function   = function      ## Function called when the timer expires.
+        self.args       = args          ## Arguments passed to the function.
+        self.cancelled  = False         ## The timer was cancelled, and its function will not be called.
+        return
+
+    ##
+    # @fn       cancel
+    # @brief    Stops the timer if its function has not been called yet, including when the timer has expired
+    #           in the same tick as the caller. Cancelling an expired or cancelled timer has no effect.
+    #
+    # @param    None.
+    #
+    # @return   None.
+    def cancel(self):
+        self.cancelled = True
+        self._wheel.cancel(self)
+        return
+
+##
+# @class    TimerWheel
+# @brief    Hashed timing wheel used to run the retransmission timers of every TCP connection in the process
+#           on a single thread. Time is divided into ticks of a fixed resolution, and each timer is stored in
+#           the slot of the wheel matching the tick at which it expires, so that arming and cancelling a timer
+#           are O(1). Timers expiring more than one revolution ahead share a slot with earlier timers, and are
+#           skipped until their own tick is reached.
+#
+# @note     Timers expire on the first tick at or after their timeout, so they fire up to one resolution late.
+#           Callbacks run on the wheel thread one after another, and must not block for long.
+class TimerWheel:
+    ##
+    # @fn       __init__
+    # @brief    Class constructor for the TimerWheel class. The wheel thread is started by the first schedule()
+    #           call, and sleeps while no timers are pending.
+    #
+    # @param    resolution  Duration of a tick in seconds.
+    # @param    slots       Number of slots in the wheel.
+    #
+    # @return   None.
+    def __init__(self, resolution=0.001, slots=1024):
+        self._resolution    = resolution
+        self._slots         = [{} for _ in range(slots)]    # Timers by expiry slot, dicts give O(1) removal in insertion order.
+        self._pending       = 0                             # Number of timers in the wheel.
+        self._start         = time.monotonic()
+        self._tick          = 0                             # Last tick processed by the wheel thread.
+        self._cond          = threading.Condition()
+        self._thread        = None
+        return
+
+    ##
+    # @fn       resolution
+    # @brief    Property giving the duration of a tick in seconds, the precision with which timers expire.
+    @property
+    def resolution(self):
+        return self._resolution
+
+    ##
+    # @fn       schedule
+    # @brief    Arms a timer that calls function(*args) on the wheel thread once the delay has passed.
+    #
+    # @param    delay       Delay before the timer expires in seconds.
+    # @param    function    Function called when the timer expires.
+    # @param    args        (optional) Arguments passed to the function.
+    #
+    # @return   Returns a WheelTimer object that can be used to cancel the timer.
+    def schedule(self, delay, function, args=()):
+        with self._cond:
+            tick  = max(self._now() + math.ceil(delay / self._resolution), self._tick + 1)
+            timer = WheelTimer(self, tick, function, args)
+            self._slots[tick % len(self._slots)][timer] = None
+            self._pending += 1
+
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="TimerWheel", daemon=True)
+                self._thread.start()
+            elif self._pending == 1:
+                self._cond.notify()
+        return timer
+
+    ##
+    # @fn       cancel
+    # @brief    Removes a timer from the wheel if it has not expired yet.
+    #
+    # @param    timer   WheelTimer object returned by schedule().
+    #
+    # @return   None.
+    def cancel(self, timer):
+        with self._cond:
+            if self._slots[timer.tick % len(self._slots)].pop(timer, 1) is None:
+                self._pending -= 1
+        return
+
+    ##
+    # @fn       _now
+    # @brief    Returns the current tick of the wheel.
+    def _now(self):
+        return int((time.monotonic() - self._start) / self._resolution)
+
+    ##
+    # @fn       _run
+    # @brief    Body of the wheel thread, which advances the wheel once per tick and calls the functions of
+    #           the expired timers outside of the lock, allowing them to arm and cancel timers.
+    #
+    # @param    None.
+    #
+    # @return   None.
+    def _run(self):
+        while True:
+            expired = []
+            with self._cond:
+                while self._pending == 0:
+                    self._cond.wait()
+
+                # Visit every slot passed since the last tick, at most one revolution of the wheel. The last
+                # tick is kept while the wheel is idle, as the thread may wake after a new timer has expired.
+                now = self._now()
+                for tick in range(max(self._tick + 1, now - len(self._slots) + 1), now + 1):
+                    slot = self._slots[tick % len(self._slots)]
+                    for timer in [timer for timer in slot if timer.tick <= now]:
+                        del slot[timer]
+                        expired.append(timer)
+                self._tick     = now
+                self._pending -= len(expired)
+
+            # A timer may be cancelled by the function of an earlier timer that expired in the same tick,
+            # after it was taken out of its slot.
+            for timer in expired:
+                if timer.cancelled:
+                    continue
+                try:
+                    timer.function(*timer.args)
+                except Exception:
+                    sys.excepthook(*sys.exc_info())
+
+            # Sleep until the start of the next tick.
+            time.sleep(max(0, ((self._tick + 1) * self._resolution) - (time.monotonic() - self._start)))
+
+## Timer wheel shared by every TCP connection in the process.
+TIMER_WHEEL = TimerWheel()
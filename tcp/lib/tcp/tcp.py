@@ -3,17 +3,25 @@ import threading
 import time
 from .components.fault_injection import *
 from .components.tcp_packet import *
+from .components.packet_pool import TCP_PacketPool
+from .components.integrity import *
+from .components.timer_wheel import TIMER_WHEEL
+from .components.retransmission_queue import RetransmissionQueue
+from .components.sack_scoreboard import SACKScoreboard
+from .components.reassembly_queue import ReassemblyQueue
+from .components.congestion_control import get_congestion_control
+from .components.rtt_estimator import RTTEstimator, timestamp_now, timestamp_elapsed, timestamp_before
+from .components.pacer import Pacer
+from .components.rack import RACK, probe_timeout
 import random
 
 DEBUG = True
 
-class WildCard:
-    def __eq__(self, anything):
-        return True
-
 class TCP:
-    def __init__(self, src_ip, src_port, dst_ip, dst_port, mss, send_window=65535, recv_window=65535, corruption=0, loss=0, debug_option=1):
+    def __init__(self, src_ip, src_port, dst_ip, dst_port, mss, send_window=65535, recv_window=65535, corruption=0, loss=0, debug_option=1, integrity="internet", sack=True, ack_delay=0, ack_batch=64, congestion_control="reno", timestamps=True, min_rto=1, window_scale=True, pacing=False, pacing_burst=4, hystart=True, rack=True, eifel=True):
         # Public Parameters
+        self.retransmissions = 0    # Number of data segments sent again, including sends dropped by fault injection.
+        self.spurious_timeouts = 0  # Number of retransmission timeouts found to be spurious, the data having been delayed rather than lost.
 
         # Private Parameters (Input Paramters)
         self._src_ip        = src_ip
@@ -24,46 +32,83 @@ class TCP:
         self._corruption    = corruption
         self._loss          = loss
         self._debug_option  = debug_option
+        self._integrity_req = get_integrity(integrity)  # Integrity algorithm requested from the remote host in the handshake.
+        self._sack_req      = sack                      # Selective acknowledgements are offered to the remote host in the handshake.
+        self._ack_delay     = ack_delay                 # Seconds an ACK for a single full segment may be delayed, 0 to ACK every segment.
+        self._ack_batch     = ack_batch                 # Most queued ACKs applied to the connection state as one batch, 1 to apply each ACK separately.
+        self._timestamps_req = timestamps               # Timestamps are offered to the remote host in the handshake.
+        self._window_scale_req = window_scale           # Window scaling is offered to the remote host in the handshake.
+        self._rack_req      = rack                      # Losses are detected with RACK-TLP when selective acknowledgements are agreed.
+        self._eifel_req     = eifel                     # Spurious timeouts are detected and undone with Eifel when timestamps are agreed.
 
         # Private Parameters (Network Transfer Control)
         self._base                  = 0
         self._seq_no                = 0
+        self._sent_end              = 0                     # Sequence number following the data sent for the first time.
         self._window_size           = send_window
         self._recv_window           = recv_window
+        self._recv_buffer_size      = recv_window           # Largest receive window advertised, in bytes, set by recv_window.
         self._recv_buffer           = []
+        self._ooo_queue             = ReassemblyQueue(recv_window)  # Data received ahead of the base, bounded by the receive window.
+        self._recv_pool             = TCP_PacketPool(max(1, recv_window // mss), 10000 + MAX_HEADER_LEN, preallocate=max(1, min(recv_window, 0xFFFF) // mss))  # Reusable packets for the receive path.
         self._client_isn            = 0
         self._server_isn            = 0
-        self._ack_pending_timers    = []
+        self._ack_pending_queue     = RetransmissionQueue() # Segments awaiting an ACK, with their retransmission timers.
         self._data                  = None
+        self._integrity             = INTERNET_CHECKSUM     # Integrity algorithm negotiated with the remote host.
+        self._sack                  = False                 # Selective acknowledgements were agreed with the remote host.
+        self._sack_scoreboard       = SACKScoreboard()      # Data the receiver has reported holding in SACK blocks.
+        self._retransmit_seqs       = []                    # Segments the send thread is asked to resend ahead of new data, protected by _ack_pending_l.
+        self._timestamps            = False                 # Timestamps were agreed with the remote host (RFC 7323).
+        self._ts_recent             = 0                     # TSval received from the remote host, echoed in the next ACK.
+        self._last_ack_sent         = 0                     # ACK number of the last ACK sent by the receiver, relative to the ISN.
+        self._snd_wscale            = 0                     # Shift applied to the windows advertised by the remote host (RFC 7323).
+        self._rcv_wscale            = 0                     # Shift applied to the windows advertised by this host.
 
         # Private Parameters - Congestion Control
-        self._cwnd            = mss     # Base size of the congestion window.
-        self._cwnd_factor     = 1       # Multipler used to scale the congestion window size based on the number of received ACKs.
-        self._ssthresh        = None    # Threshold value used to track the max value of cwnd, after which congestion avoidance should be used.
+        self._cc              = get_congestion_control(congestion_control, mss, hystart) # Congestion window and slow-start threshold, protected by _cwnd_l.
+        self._recovery_f      = False   # The sender is in the fast recovery phase (RFC 6582).
+        self._recover         = 0       # Sequence number following the data sent when fast recovery or a timeout last occurred.
+        self._pacer           = Pacer(pacing_burst * mss) if pacing else None   # Spreads the segments of a window over the RTT, allowing bursts of pacing_burst segments.
+        self._eifel_ts        = None    # Timestamp of the first timeout not yet followed by an ACK, None if there is none (RFC 3522).
+        self._undo_state      = None    # Congestion control state before that timeout, restored if it was spurious.
+
+        # Private Parameters - Loss Detection (RACK-TLP, RFC 8985), protected by _ack_pending_l.
+        self._rack_f          = False   # RACK-TLP is used for the transfer, which requires selective acknowledgements.
+        self._rack            = RACK(TIMER_WHEEL.resolution)    # Send time of the most recently sent segment delivered, used to mark earlier segments as lost.
+        self._rack_timer      = None    # Timer marking segments as lost once their reordering window has passed.
+        self._tlp_timer       = None    # Tail loss probe timer, armed while data is in flight outside recovery.
+        self._tlp_end         = None    # Sequence number following the data sent when the outstanding probe was sent, None if there is none.
+        self._tlp_retransmit  = False   # The outstanding probe resent data rather than sending new data.
+        self._tlp_flight      = 0       # Number of bytes in flight when the outstanding probe was sent.
+        self._probe_f         = False   # Set by the probe timer, asking the send thread to send a probe.
 
         # Private Parameters - Dynamic Timeout
-        self._timeout       = 1
-        self._estimated_rtt = 0
-        self._dev_rtt       = 0
+        self._rtt           = RTTEstimator(min_rto, TIMER_WHEEL.resolution)   # Smoothed RTT and retransmission timeout (RFC 6298).
 
         # Sockets
         self._send_sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)   # Sending socket.
         self._recv_sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)   # Receiving socket.
         self._recv_sock.bind((self._src_ip, self._src_port))
 
+        # A receive window larger than the socket buffer would let the sender overrun the buffer, so raise the
+        # buffer to hold a full window where the system allows.
+        if self._recv_sock.getsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF) < recv_window:
+            self._recv_sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, recv_window)
+
         # Threads and Locks
         self._base_l        = threading.Lock()
         self._seq_no_l      = threading.Lock()
         self._cwnd_l        = threading.Lock()
-        self._recv_buffer_l = threading.Lock()
+        self._recv_buffer_c = threading.Condition()    # Notified when a packet is added to the receive buffer, or a delayed ACK is due.
+        self._ack_due       = False                    # Set by the delayed ACK timer, protected by _recv_buffer_c.
         self._recv_window_l = threading.Lock()
         self._ack_pending_l = threading.Lock()
 
         # Flags
         self._send_complete_f       = threading.Event()
+        self._send_wake_f           = threading.Event()    # Set when an ACK or timeout may allow the sender to send more data.
         self._receive_complete_f    = threading.Event()
-        self._slow_start_f          = threading.Event()
-        self._slow_start_f.set()
 
         return
 
@@ -76,11 +121,18 @@ class TCP:
     #
     # @return   None.
     def connect(self):
-        tcp_syn_packet          = TCP_Packet(self._src_port, self._dst_port, self._client_isn, self._server_isn, self._recv_window, None, syn=1)        # Packet used to encapsulate packets sent by the client in the 3-way handshake.
-        tcp_syn_ack_packet      = TCP_Packet(self._src_port, self._dst_port, self._client_isn, self._server_isn, self._recv_window, None, ack=1, syn=1) # Packet used to process the packets sent by the server in the 3-way handshake.
+        tcp_syn_packet          = TCP_Packet(self._src_port, self._dst_port, self._client_isn, self._server_isn, self._advertised_window(), None, syn=1)        # Packet used to encapsulate packets sent by the client in the 3-way handshake.
+        tcp_syn_ack_packet      = TCP_Packet(self._src_port, self._dst_port, self._client_isn, self._server_isn, self._advertised_window(), None, ack=1, syn=1) # Packet used to process the packets sent by the server in the 3-way handshake.
         self._client_isn        = random.randrange(0, 0xFFFF)   # Generate the client isn.
         tcp_syn_packet.seq_no   = self._client_isn              # Assign the server isn to the response packet sequence number.
         tcp_syn_packet.ack_no   = self._server_isn              # Increment the ACK number of the response packet.
+        if not self._integrity_req is INTERNET_CHECKSUM:
+            tcp_syn_packet.options = self._integrity_option(self._integrity_req)    # Request the alternate checksum.
+        tcp_syn_packet.sack_permitted = self._sack_req                              # Offer selective acknowledgements.
+        if self._timestamps_req:
+            tcp_syn_packet.timestamps = (timestamp_now(), 0)                        # Offer timestamps.
+        if self._window_scale_req:
+            tcp_syn_packet.window_scale = self._window_shift()                      # Offer window scaling.
         
         while True:
             # Send the initial SYN packet to start the syncronization between the client and server.
@@ -93,7 +145,7 @@ class TCP:
 
             # Wait for the server to respond with a SYN-ACK packet containing the server isn.
             try:
-                self._recv_sock.settimeout(self._timeout)
+                self._recv_sock.settimeout(self._rtt.rto)
                 packet, _ = self._recv_sock.recvfrom(1024)
             except:
                 if DEBUG:
@@ -103,10 +155,31 @@ class TCP:
                 tcp_syn_ack_packet.packet = packet
 
             # Extract the isn numbers from the packet sent by the server and exit the connection establishment process.
-            if (tcp_syn_ack_packet.is_valid()) and (tcp_syn_ack_packet.mgmt_syn == 1) and (tcp_syn_ack_packet.mgmt_ack == 1):
+            if (tcp_syn_ack_packet.mgmt_syn == 1) and (tcp_syn_ack_packet.mgmt_ack == 1) and (tcp_syn_ack_packet.is_valid()):
                 if DEBUG:
                     print(f"TCP: (connect) SYN-ACK packet received from client. (seq_no = {tcp_syn_ack_packet.seq_no}, ack_no = {tcp_syn_ack_packet.ack_no})")
                 self._server_isn        = tcp_syn_ack_packet.seq_no
+
+                # The server echoes the requested algorithm if it agrees to use it, otherwise the
+                # connection falls back to the Internet checksum.
+                if self._requested_integrity(tcp_syn_ack_packet) is self._integrity_req:
+                    self._integrity = self._integrity_req
+                else:
+                    self._integrity = INTERNET_CHECKSUM
+                if DEBUG:
+                    print(f"TCP: (connect) Using {self._integrity.name} integrity algorithm.")
+
+                # Selective acknowledgements are used if both hosts offered them.
+                self._sack = self._sack_req and tcp_syn_ack_packet.sack_permitted
+
+                # Timestamps are used if both hosts offered them.
+                timestamps       = tcp_syn_ack_packet.timestamps
+                self._timestamps = self._timestamps_req and (not timestamps is None)
+                if self._timestamps:
+                    self._ts_recent = timestamps[0]
+
+                # Window scaling is used if both hosts offered it, otherwise windows are sent unscaled.
+                self._negotiate_window_scale(tcp_syn_ack_packet.window_scale)
                 tcp_syn_packet.seq_no   = self._client_isn              
                 tcp_syn_packet.ack_no   = self._server_isn
                 self._send_sock.sendto(tcp_syn_packet.packet, (self._dst_ip, self._dst_port))
@@ -115,6 +188,80 @@ class TCP:
                 continue
         return
 
+    ##
+    # @fn       _integrity_option
+    # @brief    Private method used to build the TCP options of a SYN packet requesting an alternate checksum
+    #           (option kind 14, RFC 1146), followed by an end of option list byte.
+    #
+    # @param    integrity   - Integrity algorithm being requested.
+    #
+    # @return   Returns the TCP options as a bytes object.
+    def _integrity_option(self, integrity):
+        return bytes([ALT_CHECKSUM_REQUEST, 3, integrity.number, 0])
+
+    ##
+    # @fn       _requested_integrity
+    # @brief    Private method used to extract the alternate checksum request from the options of a SYN packet.
+    #
+    # @param    tcp_packet  - SYN packet received from the remote host.
+    #
+    # @return   Returns the requested integrity algorithm, the Internet checksum if no alternate checksum was
+    #           requested, or None if the requested algorithm is not supported.
+    def _requested_integrity(self, tcp_packet):
+        kind, length, number, _ = tcp_packet.options
+        if (kind != ALT_CHECKSUM_REQUEST) or (length != 3):
+            return INTERNET_CHECKSUM
+        return find_integrity(number)
+
+    ##
+    # @fn       _window_shift
+    # @brief    Private method used to calculate the window scale shift count this host offers in its SYN, the
+    #           smallest shift that lets the largest receive window fit in the 16-bit window field.
+    #
+    # @param    None.
+    #
+    # @return   Returns the shift count, at most MAX_WINDOW_SCALE.
+    def _window_shift(self):
+        shift = 0
+        while ((self._recv_buffer_size >> shift) > 0xFFFF) and (shift < MAX_WINDOW_SCALE):
+            shift += 1
+        return shift
+
+    ##
+    # @fn       _negotiate_window_scale
+    # @brief    Private method used to set the window scale shift counts of the connection from the window
+    #           scale option received in the remote host's SYN or SYN-ACK (RFC 7323). Scaling is only used in
+    #           either direction if both hosts offered it.
+    #
+    # @param    shift   - Shift count received from the remote host, or None if it did not offer scaling.
+    #
+    # @return   Returns True if window scaling was agreed.
+    def _negotiate_window_scale(self, shift):
+        if self._window_scale_req and (not shift is None):
+            self._snd_wscale = min(shift, MAX_WINDOW_SCALE)
+            self._rcv_wscale = self._window_shift()
+            return True
+        self._snd_wscale = 0
+        self._rcv_wscale = 0
+        return False
+
+    ##
+    # @fn       _advertised_window
+    # @brief    Private method used to calculate the window field of a packet sent by this host, which is the
+    #           receive window shifted right by the agreed shift count. Windows in SYN packets are never scaled,
+    #           so before scaling is agreed the window is limited to the largest unscaled value. An open window
+    #           smaller than one unit of the scale is rounded up rather than advertised as closed, as the sender
+    #           has no persist timer to probe a closed window.
+    #
+    # @param    None.
+    #
+    # @return   Returns the value of the 16-bit window field.
+    def _advertised_window(self):
+        window = min((self._recv_window >> self._rcv_wscale), 0xFFFF)
+        if (window == 0) and (self._recv_window > 0):
+            window = 1
+        return window
+
     ##
     # @fn       close
     # @brief    Public method used to close the connection between a client and server process. This method will signal 
@@ -124,8 +271,8 @@ class TCP:
     #
     # @return   None.
     def close(self):
-        tcp_ack_packet = TCP_Packet(0, 0, 0, 0, 0, None)
-        tcp_fin_packet = TCP_Packet(self._src_port, self._dst_port, 0, 0, self._recv_window, None, fin=1)
+        tcp_ack_packet = TCP_Packet(0, 0, 0, 0, 0, None, integrity=self._integrity)
+        tcp_fin_packet = TCP_Packet(self._src_port, self._dst_port, 0, 0, self._advertised_window(), None, fin=1, integrity=self._integrity)
 
         tcp_fin_packet.seq_no = self._seq_no + self._client_isn
         tcp_fin_packet.ack_no = self._base   + self._server_isn
@@ -142,7 +289,7 @@ class TCP:
 
             # Configure the timeout of the receive socket, causing the initial FIN packet to be resent when the timeout occurs.
             try:
-                self._recv_sock.settimeout(self._timeout)
+                self._recv_sock.settimeout(self._rtt.rto)
                 packet, _ = self._recv_sock.recvfrom(1024)    #TODO: Find programmatic way to determine the number of bytes to receive from the responding host.
             except:
                 continue
@@ -159,7 +306,7 @@ class TCP:
             # If the client receives an ACK packet in response
             if (tcp_ack_packet.mgmt_ack == 1) and (tcp_ack_packet.mgmt_fin == 1):
                 self._base = tcp_ack_packet.ack_no - self._server_isn
-                tcp_ack_packet = TCP_Packet(self._src_port, self._dst_port, self._base + self._client_isn, self._base + self._server_isn, self._recv_window, None, ack=1, fin=1)
+                tcp_ack_packet = TCP_Packet(self._src_port, self._dst_port, self._base + self._client_isn, self._base + self._server_isn, self._advertised_window(), None, ack=1, fin=1, integrity=self._integrity)
                 self._send_sock.sendto(tcp_ack_packet.packet, (self._dst_ip, self._dst_port))
                 break
             
@@ -174,6 +321,7 @@ class TCP:
     #
     # @return   None.
     def send(self, data):
+        self._rack_f = self._rack_req and self._sack
         send_t      = threading.Thread(target=self._send, args=(data,)) # Sending thread.
         recv_ack_t  = threading.Thread(target=self._recv_ack)           # ACK receiving thread.
 
@@ -194,11 +342,12 @@ class TCP:
     # @brief    Public data receive method that initiates threads used for receiving data from the sending
     #           process, and assembling data from the data buffer.
     #
-    # @param    None.
+    # @param    sink    - (optional) Object with a write() method, such as a PacketSink, that the received data
+    #                     is written to as it arrives instead of being collected in memory.
     #
-    # @return   None.
-    def recv(self):
-        process_recv_buffer_t = threading.Thread(target=self._process_recv_buffer)
+    # @return   Returns a bytearray containing the received data, or None if a sink was given.
+    def recv(self, sink=None):
+        process_recv_buffer_t = threading.Thread(target=self._process_recv_buffer, args=(sink,))
         recv_data_t = threading.Thread(target=self._recv_data)
         
         process_recv_buffer_t.start()
@@ -217,66 +366,185 @@ class TCP:
     #
     # @return   None.
     def _send(self, data):
-        wildcard        = WildCard()
-        tcp_data_packet = TCP_Packet(self._src_port, self._dst_port, 0, 0, self._mss, None)
+        data_view       = memoryview(data)   # View used to reference segments of the data without copying them.
+        tcp_data_packet = TCP_Packet(self._src_port, self._dst_port, 0, 0, self._mss, None, integrity=self._integrity)
+        if self._timestamps:
+            tcp_data_packet.timestamps = (0, 0)     # Reserve the option, so that it is updated in place on each send.
 
         while True:
+            # Resend the segments requested by a fast retransmit, partial ACK or RACK ahead of new data, without
+            # regard to the window, as they hold the data the receiver is waiting for.
+            if self._retransmit_seqs:
+                self._ack_pending_l.acquire()
+                retransmit_seqs, self._retransmit_seqs = self._retransmit_seqs, []
+                self._ack_pending_l.release()
+                for retransmit_seq in retransmit_seqs:
+                    if self._base <= retransmit_seq < len(data):
+                        self._send_segment(tcp_data_packet, data_view, retransmit_seq, min(self._mss, (len(data) - retransmit_seq)))
+
+            # Send a tail loss probe once the probe timer has expired.
+            if self._probe_f:
+                self._probe_f = False
+                self._send_probe(tcp_data_packet, data_view)
+
             # Calculate the end of the transmission window based on the base value of the 
             # transfer, and the size of the receive window received from the receiving host.
             self._base_l.acquire()
             self._recv_window_l.acquire()
-            window_end = min(int(self._base + (self._cwnd_factor * self._cwnd)), (self._base + self._recv_window), len(data))
+            window_end = min(int(self._base + self._cc.cwnd), (self._base + self._recv_window), len(data))
             self._base_l.release()
             self._recv_window_l.release()
 
+            # In pacing mode, derive the pacing rate from the smoothed RTT and the window the sender may use,
+            # which is the congestion window unless the receive window is smaller.
+            pace_delay = None
+            if not self._pacer is None:
+                self._cwnd_l.acquire()
+                self._pacer.set_rate(min(self._cc.cwnd, self._recv_window), self._rtt.srtt, self._cc.slow_start)
+                self._cwnd_l.release()
+
             self._seq_no_l.acquire()
+            sent_end = self._sent_end
             while self._seq_no < window_end:  
                 if DEBUG:
-                    print(f"TCP: Sender Status     (wend = {window_end}, seq = {self._seq_no}, base = {self._base}, cwnd = {int(self._cwnd_factor * self._cwnd)})")
+                    print(f"TCP: Sender Status     (wend = {window_end}, seq = {self._seq_no}, base = {self._base}, cwnd = {int(self._cc.cwnd)})")
 
-                # Extract the bytes of data based on the size of the transfer window, and 
-                # the current sequence number of the transfer window.
-                # Insert the sequence and ACK numbers used in the transfer control along with
-                # the syn numbers received in the handshaking process.
-                self._base_l.acquire()
-                tcp_data_packet.data   = data[self._seq_no:(self._seq_no + min(self._mss, (len(data) - self._seq_no)))] #TODO: Add receive window size to min function call.
-                tcp_data_packet.seq_no = self._seq_no + self._client_isn
-                tcp_data_packet.ack_no = self._base   + self._server_isn
-                self._base_l.release()
+                # Data below the base has already been acknowledged, which happens when an ACK for data
+                # sent before the sequence number was reset, or for SACKed data, arrives.
+                if self._seq_no < self._base:
+                    self._seq_no = self._base
+                    continue
 
-                # Transfer the data and increment the sequence number based on the size 
-                # of the transferred data.
-                if DEBUG:
-                    print(f"TCP: Sending data: {self._seq_no}/{len(data)}")
+                segment_len = min(self._mss, (len(data) - self._seq_no))  #TODO: Add receive window size to min function call.
 
-                # Send the data packet, with optional debug to simulate packet loss
-                if (packet_lost(self._loss)) and (self._debug_option == 5):
-                    pass
-                else:
-                    self._send_sock.sendto(tcp_data_packet.packet, (self._dst_ip, self._dst_port))
+                # Skip the segments the receiver has reported holding in SACK blocks, so that
+                # only the missing ranges are sent again after a loss.
+                if self._sack:
+                    self._ack_pending_l.acquire()
+                    sacked = self._sack_scoreboard.is_sacked(self._seq_no, self._seq_no + segment_len)
+                    self._ack_pending_l.release()
+                    if sacked:
+                        self._seq_no += segment_len
+                        continue
 
-                self._ack_pending_l.acquire()
-                if not [wildcard, self._seq_no, wildcard] in self._ack_pending_timers:
-                    self._ack_pending_timers.append([threading.Timer(self._timeout, self._timeout_handle, (self._seq_no,)), self._seq_no, time.time()])
-                else:
-                    self._ack_pending_timers[self._ack_pending_timers.index([wildcard, self._seq_no, wildcard])] = [threading.Timer(self._timeout, self._timeout_handle, (self._seq_no,)), self._seq_no, time.time()]
-                self._ack_pending_timers[self._ack_pending_timers.index([wildcard, self._seq_no, wildcard])][0].start()
-                self._ack_pending_l.release()
+                # In pacing mode, stop once the token bucket runs out, until the tokens for the segment are earned.
+                if not self._pacer is None:
+                    delay = self._pacer.delay(segment_len)
+                    if delay > 0:
+                        pace_delay = delay
+                        break
 
-                self._seq_no += len(tcp_data_packet.data)
+                self._seq_no += self._send_segment(tcp_data_packet, data_view, self._seq_no, segment_len)
             self._seq_no_l.release()
 
+            # Restart the probe timer after sending new data.
+            if self._rack_f and (self._sent_end > sent_end):
+                self._arm_tlp()
+
             # If the data has been completely sent to the receiving host, set the send complete flag, signalling
             # the recv_ack process to exit.
             if self._base >= len(data):
+                self._cancel_loss_timers()
                 self._send_complete_f.set()
                 break
+
+            # The window is full, wait for an ACK or timeout to change the window or sequence number, or for
+            # the pacer to allow the next segment. The flag is cleared before the window is next calculated,
+            # so an event arriving in between is kept.
+            self._send_wake_f.wait(pace_delay)
+            self._send_wake_f.clear()
+        return
+
+    ##
+    # @fn       _send_segment
+    # @brief    This method sends a single data segment, registering its retransmission timer.
+    #
+    # @param    tcp_data_packet - TCP_Packet object used to encapsulate the data.
+    # @param    data_view       - Memoryview of the data being transferred.
+    # @param    seq_no          - Sequence number of the segment, relative to the ISN.
+    # @param    segment_len     - Number of data bytes in the segment.
+    #
+    # @return   Returns the number of data bytes sent.
+    def _send_segment(self, tcp_data_packet, data_view, seq_no, segment_len):
+        # Extract the bytes of the segment from the data, and insert the sequence and ACK numbers
+        # used in the transfer control along with the syn numbers received in the handshaking process.
+        self._base_l.acquire()
+        tcp_data_packet.data   = data_view[seq_no:(seq_no + segment_len)]
+        tcp_data_packet.seq_no = seq_no     + self._client_isn
+        tcp_data_packet.ack_no = self._base + self._server_isn
+        self._base_l.release()
+        if self._timestamps:
+            tcp_data_packet.timestamps = (timestamp_now(), 0)
+
+        # Data below the sent end is being resent after a timeout, fast retransmit or partial ACK.
+        if seq_no < self._sent_end:
+            self.retransmissions += 1
+        self._sent_end = max(self._sent_end, seq_no + segment_len)
+
+        if DEBUG:
+            print(f"TCP: Sending data: {seq_no}/{len(data_view)}")
+
+        # Register the retransmission timer before the packet is sent, so that an ACK
+        # arriving immediately after the send always finds the pending timer.
+        self._ack_pending_l.acquire()
+        self._ack_pending_queue.push(seq_no, seq_no + segment_len, TIMER_WHEEL.schedule(self._rtt.rto, self._timeout_handle, (seq_no,)), time.time())
+        self._ack_pending_l.release()
+
+        # Send the data packet, with optional debug to simulate packet loss
+        if (packet_lost(self._loss)) and (self._debug_option == 5):
+            pass
+        else:
+            self._send_sock.sendto(tcp_data_packet.packet, (self._dst_ip, self._dst_port))
+        return segment_len
+
+    ##
+    # @fn       _send_probe
+    # @brief    This method sends a tail loss probe (RFC 8985) when the probe timer expires, so that the loss of the
+    #           last segments sent is reported by the receiver within a few RTTs rather than by the retransmission
+    #           timeout. The probe is a new segment if the receive window allows one, otherwise the highest
+    #           segment not yet SACKed is resent.
+    #
+    # @param    tcp_data_packet - TCP_Packet object used to encapsulate the data.
+    # @param    data_view       - Memoryview of the data being transferred.
+    #
+    # @return   None.
+    def _send_probe(self, tcp_data_packet, data_view):
+        self._seq_no_l.acquire()
+        self._recv_window_l.acquire()
+        window_end = min((self._base + self._recv_window), len(data_view))
+        self._recv_window_l.release()
+
+        flight = self._sent_end - self._base
+        if self._sent_end <= self._seq_no < window_end:
+            if DEBUG:
+                print(f"TCP: Probe timeout, sending new segment {self._seq_no}.")
+            retransmit    = False
+            self._seq_no += self._send_segment(tcp_data_packet, data_view, self._seq_no, min(self._mss, (len(data_view) - self._seq_no)))
+        else:
+            self._ack_pending_l.acquire()
+            segment = next((segment for segment in reversed(self._ack_pending_queue) if not segment.sacked), None)
+            self._ack_pending_l.release()
+            if segment is None:
+                self._seq_no_l.release()
+                return
+            if DEBUG:
+                print(f"TCP: Probe timeout, resending segment {segment.seq_no}.")
+            retransmit = True
+            self._send_segment(tcp_data_packet, data_view, segment.seq_no, (segment.end - segment.seq_no))
+        self._seq_no_l.release()
+
+        self._ack_pending_l.acquire()
+        self._tlp_end           = self._sent_end
+        self._tlp_retransmit    = retransmit
+        self._tlp_flight        = flight
+        self._ack_pending_l.release()
         return
 
     ##
     # @fn       _recv_ack
     # @brief    This method receives ACK messages from the receiving process and sets the base value used by
-    #           the _send method based on the ACK messages received.
+    #           the _send method based on the ACK messages received. ACKs that are already queued at the
+    #           socket are received together, up to ack_batch of them, and applied as one update.
     #
     # @param    None.
     #
@@ -285,119 +553,205 @@ class TCP:
         self._recv_sock.settimeout(1)
         last_recvd_ack = 0
         ack_recv_cnt   = 0
-        wildcard       = WildCard()
-        tcp_ack_packet = TCP_Packet(0, 0, 0, 0, 0, None)
+        tcp_ack_packet = TCP_Packet(0, 0, 0, 0, 0, None, integrity=self._integrity)
 
         while not self._send_complete_f.is_set():
             try:
-                packet, _ = self._recv_sock.recvfrom(1024)    #TODO: Find programmatic way to determine the number of bytes to receive from the responding host.
+                packets = [self._recv_sock.recvfrom(1024)[0]]    #TODO: Find programmatic way to determine the number of bytes to receive from the responding host.
             except:
                 if self._send_complete_f.is_set():
                     self._send_complete_f.clear()
                     return
                 else:
                     continue
-            else:
+
+            # Drain the ACKs already queued at the socket without blocking, so that the batch can be
+            # applied to the connection state in a single update.
+            if self._ack_batch > 1:
+                self._recv_sock.settimeout(0)
+                try:
+                    while len(packets) < self._ack_batch:
+                        packets.append(self._recv_sock.recvfrom(1024)[0])
+                except OSError:
+                    pass
+                self._recv_sock.settimeout(1)
+
+            # Reduce the batch to the highest cumulative ACK, the number of duplicate ACKs and the
+            # SACK blocks it carries. ACKs below the highest ACK number were overtaken and are ignored.
+            new_ack     = False
+            dup_acks    = 0
+            rcv_window  = None
+            ts_echo     = None
+            sack_blocks = []
+            for packet in packets:
                 tcp_ack_packet.packet = packet
 
-            # Verify the integrity of the packet, discarding the packet in the event that 
-            # the data is corrupted.
-            if (not tcp_ack_packet.is_valid()) or (packet_corrupted(self._loss) and self._debug_option == 2):
-                if DEBUG:
-                    print(f"TCP: (recv_ack) Packet does not have a valid checksum.")
-                continue
+                # Verify the integrity of the packet, discarding the packet in the event that 
+                # the data is corrupted.
+                if (not tcp_ack_packet.is_valid()) or ((self._debug_option == 2) and packet_corrupted(self._loss)):
+                    if DEBUG:
+                        print(f"TCP: (recv_ack) Packet does not have a valid checksum.")
+                    continue
 
-            # If the packet contains a HIGH ACK bit, perform data transfer actions based on the ACK and sequence number.
-            if tcp_ack_packet.mgmt_ack == 1:
+                # Only packets with a HIGH ACK bit carry information for the data transfer.
+                if tcp_ack_packet.mgmt_ack != 1:
+                    continue
                 if DEBUG:
                     print(f"TCP: ACK received      (seq no. = {tcp_ack_packet.seq_no}, ack no. = {tcp_ack_packet.ack_no}, recv window = {tcp_ack_packet.rcv_window})")
-                
-                # Fast retransmit checker.
-                if tcp_ack_packet.ack_no == last_recvd_ack:
-                    ack_recv_cnt      += 1
 
-                    # If the transmission is in the slow start phase, exponentially increase the
-                    # congestion window, if the transmission is in the congestion avoidance phase,
-                    # slowly increment the congestion window size.
-                    if self._slow_start_f.is_set():
-                        self._cwnd_l.acquire()
-                        self._cwnd_factor += 1
-                        self._cwnd_l.release()
-
-                        # If the slow-start threshold has been set, and the congestion window size
-                        # exceeds the slow-start threshold, enter the congestion avoidance phase.
-                        if not self._ssthresh is None:
-                            if (self._cwnd_factor * self._cwnd) >= self._ssthresh:
-                                if DEBUG:
-                                    print(f"TCP: SS-Threshold exceeded, entering congestion avoidance state.")
-                                self._slow_start_f.clear()
-                    else:
-                        self._cwnd_l.acquire()
-                        self._cwnd_factor += self._mss / (self._cwnd_factor * self._cwnd)
-                        self._cwnd_l.release()
+                if self._sack:
+                    sack_blocks.extend(tcp_ack_packet.sack_blocks)
 
+                # Fast retransmit checker.
+                ack_no = tcp_ack_packet.ack_no
+                if ack_no == last_recvd_ack:
+                    ack_recv_cnt += 1
+                    dup_acks     += 1
                     if DEBUG:
-                        print(f"TCP: Duplicate ACK{tcp_ack_packet.ack_no} received {ack_recv_cnt} times")
-                    if ack_recv_cnt >= 3:
-                        if DEBUG:
-                            print(f"TCP: Fast retransmit event occured.")
-                        self._fast_retransmit()
-                    continue
-                else:
-                    last_recvd_ack = tcp_ack_packet.ack_no
+                        print(f"TCP: Duplicate ACK{ack_no} received {ack_recv_cnt} times")
+                elif ack_no > last_recvd_ack:
+                    last_recvd_ack = ack_no
                     ack_recv_cnt   = 0
+                    new_ack        = True
+                    rcv_window     = tcp_ack_packet.rcv_window << self._snd_wscale
+                    timestamps     = tcp_ack_packet.timestamps if self._timestamps else None
+                    ts_echo        = None if (timestamps is None) else timestamps[1]
+
+            # Record the data the receiver reports holding beyond the ACK number, and stop the
+            # timers of the segments it covers, as they no longer need to be resent.
+            acked_segments, sacked_segments = [], []   # Segments delivered by the batch, for RACK.
+            if sack_blocks:
+                self._ack_pending_l.acquire()
+                if self._sack_scoreboard.update([((left - self._server_isn), (right - self._server_isn)) for left, right in sack_blocks]):
+                    for segment in self._ack_pending_queue:
+                        if (not segment.sacked) and self._sack_scoreboard.is_sacked(segment.seq_no, segment.end):
+                            segment.sacked = True
+                            segment.timer.cancel()
+                            sacked_segments.append(segment)
+                self._ack_pending_l.release()
 
-                # Iterate over each timeout timer, stopping timers with sequence numbers 
-                # less than the ACK number of the ACK packet received, and removing them 
-                # from the queue.
+            if new_ack:
+                # Remove the segments with sequence numbers less than the ACK number of the
+                # ACK packet received from the queue, stopping their timeout timers.
                 self._ack_pending_l.acquire()
-                # try:
-                for timer in self._ack_pending_timers[(self._ack_pending_timers.index([wildcard, self._base, wildcard])):]:
-                    if (tcp_ack_packet.ack_no - self._server_isn) > timer[1]:
-                        timer[0].cancel()
-
-                        # Calculate the timeout value based on the sample RTT.
-                        self._estimated_rtt = (0.875 * self._estimated_rtt) + (0.125 * (time.time() - timer[2]))
-                        self._dev_rtt       = (0.75 * self._dev_rtt) + (0.25 * abs((time.time() - timer[2]) - self._estimated_rtt))
-                        self._timeout       = self._estimated_rtt + (4 * self._dev_rtt)
-                        if DEBUG:
-                            print(f"TCP: Timeout set to {self._timeout}s.")
-                    else:
-                        break
-                # except:
-                #     pass
+                self._sack_scoreboard.advance(last_recvd_ack - self._server_isn)
+                flight    = self._sent_end - self._base
+                sent_time = None
+                for segment in self._ack_pending_queue.acknowledge(last_recvd_ack - self._server_isn):
+                    segment.timer.cancel()
+                    if not segment.sacked:
+                        acked_segments.append(segment)
+
+                    # A segment that was resent does not give a sample of the RTT, as the ACK may be for
+                    # either transmission (Karn's algorithm). A segment SACKed before this ACK has waited
+                    # for the missing data before it, and would also overestimate the RTT.
+                    if not (segment.sacked or segment.retransmitted):
+                        sent_time = segment.sent_time if (sent_time is None) else max(sent_time, segment.sent_time)
+
+                # Take the RTT sample from the timestamp echoed by the receiver, which identifies the
+                # transmission that the ACK was sent for. Without timestamps, take it from the most recently
+                # sent segment covered by the ACK, as older segments may have been held by the receiver
+                # until a missing segment before them arrived.
+                sample_rtt = None
+                if not ts_echo is None:
+                    sample_rtt = timestamp_elapsed(ts_echo)
+                elif not sent_time is None:
+                    sample_rtt = time.time() - sent_time
+                if not sample_rtt is None:
+                    self._rtt.sample(sample_rtt, RTTEstimator.expected_samples(flight, self._mss))
+                    if DEBUG:
+                        print(f"TCP: Timeout set to {self._rtt.rto}s.")
                 self._ack_pending_l.release()
 
+                if not sample_rtt is None:
+                    self._cwnd_l.acquire()
+                    self._cc.on_rtt_sample(sample_rtt)
+                    self._cwnd_l.release()
+
+                # The first ACK after a timeout echoes the TSval of the transmission that reached the receiver. A
+                # TSval from before the timeout shows that the original segment was delayed rather than lost, so
+                # the timeout was spurious (Eifel, RFC 3522). The RTT sample above already includes the delay.
+                if not self._eifel_ts is None:
+                    self._eifel_undo(ts_echo)
+
                 # In the event that the ACK number received is larger than the base value,
                 # set the base value equal to the ACK number, incrementing the data transfer
-                # window, and increase the size of the congestion window.
+                # window, and update the congestion window.
+                retransmit_seq = None
                 self._base_l.acquire()
                 self._recv_window_l.acquire()
-                if (tcp_ack_packet.ack_no - self._server_isn) > self._base:
-                    # If the transmission is in the slow start phase, exponentially increase the
-                    # congestion window, if the transmission is in the congestion avoidance phase,
-                    # slowly increment the congestion window size.
-                    if self._slow_start_f.is_set():
-                        self._cwnd_l.acquire()
-                        self._cwnd_factor += ((tcp_ack_packet.ack_no - self._server_isn) - self._base) / self._cwnd
-                        self._cwnd_l.release()
-
-                        # If the slow-start threshold has been set, and the congestion window size
-                        # exceeds the slow-start threshold, enter the congestion avoidance phase.
-                        if not self._ssthresh is None:
-                            if (self._cwnd_factor * self._cwnd) >= self._ssthresh:
+                acked = (last_recvd_ack - self._server_isn) - self._base
+                if acked > 0:
+                    self._base = last_recvd_ack - self._server_isn
+                    flight     = self._sent_end - self._base
+                    self._cwnd_l.acquire()
+                    if self._recovery_f:
+                        if self._base >= self._recover:
+                            # A full ACK covers all the data sent before fast recovery was entered, deflate
+                            # the congestion window and leave fast recovery.
+                            if DEBUG:
+                                print(f"TCP: Full ACK received, leaving fast recovery.")
+                            self._cc.on_recovery_exit(flight)
+                            self._recovery_f = False
+                        else:
+                            # A partial ACK shows that the segment at the new base was also lost, resend it
+                            # and deflate the congestion window by the data acknowledged. With RACK, the
+                            # segment is resent once RACK marks it as lost, as it may already have been resent.
+                            self._cc.on_partial_ack(acked)
+                            if not self._rack_f:
                                 if DEBUG:
-                                    print(f"TCP: SS-Threshold exceeded, entering congestion avoidance state.")
-                                self._slow_start_f.clear()
+                                    print(f"TCP: Partial ACK received, resending segment {self._base}.")
+                                retransmit_seq = self._base
                     else:
+                        self._cc.on_ack(acked, flight)
+                    self._cwnd_l.release()
+                self._recv_window = rcv_window
+                self._base_l.release()
+                self._recv_window_l.release()
+
+                if not retransmit_seq is None:
+                    self._ack_pending_l.acquire()
+                    self._retransmit_seqs.append(retransmit_seq)
+                    self._ack_pending_l.release()
+
+                # A probe episode ends once the data sent up to the probe is acknowledged. If the probe resent
+                # data, either it or the original segment was lost, and without D-SACK the receiver cannot say
+                # which, so the loss is responded to as in a fast recovery (RFC 8985).
+                if (not self._tlp_end is None) and (self._base >= self._tlp_end):
+                    if self._tlp_retransmit:
+                        if DEBUG:
+                            print(f"TCP: Loss repaired by tail loss probe.")
                         self._cwnd_l.acquire()
-                        self._cwnd_factor += self._mss / (self._cwnd_factor * self._cwnd)
+                        self._cc.on_loss(self._tlp_flight, 0)
+                        self._cc.on_recovery_exit(self._sent_end - self._base)
                         self._cwnd_l.release()
+                    self._tlp_end = None
+
+            # Mark the segments sent before the latest segment delivered that have not arrived in time as
+            # lost, and restart the probe timer once new data is acknowledged.
+            if self._rack_f and (acked_segments or sacked_segments):
+                self._rack_detect_loss(acked_segments + sacked_segments)
+                if new_ack:
+                    self._arm_tlp()
+
+            if dup_acks > 0:
+                # Each duplicate ACK in fast recovery reports a segment that has left the network, so
+                # the congestion window is inflated by one segment, allowing a new segment to be sent.
+                if self._recovery_f:
+                    self._cwnd_l.acquire()
+                    self._cc.on_dupack(dup_acks)
+                    self._cwnd_l.release()
+
+                # The third duplicate ACK starts fast retransmit, unless the duplicate ACKs may have been
+                # caused by data that was resent after a timeout, which is still below the recover point.
+                # With RACK, the missing segment is instead marked as lost once three segments are SACKed.
+                elif (ack_recv_cnt >= 3) and (self._base >= self._recover) and (not self._rack_f):
+                    if DEBUG:
+                        print(f"TCP: Fast retransmit event occured.")
+                    self._fast_retransmit(ack_recv_cnt)
 
-                    self._base         = tcp_ack_packet.ack_no - self._server_isn
-                self._recv_window = tcp_ack_packet.rcv_window
-                self._base_l.release()
-                self._recv_window_l.release()
+            if new_ack or (dup_acks > 0):
+                self._send_wake_f.set()
         return
 
     ##
@@ -409,28 +763,30 @@ class TCP:
     #
     # @return   None.
     def _recv_data(self):
-        tcp_data_packet     = TCP_Packet(0, 0, 0, 0, 0, None)
-        tcp_syn_ack_packet  = TCP_Packet(self._src_port, self._dst_port, self._client_isn, self._server_isn, self._recv_window, None, ack=1, syn=1)
-        tcp_fin_ack_packet  = TCP_Packet(self._src_port, self._dst_port, self._client_isn, self._server_isn, self._recv_window, None, ack=1, fin=1)
+        tcp_data_packet     = None
+        tcp_syn_ack_packet  = TCP_Packet(self._src_port, self._dst_port, self._client_isn, self._server_isn, self._advertised_window(), None, ack=1, syn=1)
+        tcp_fin_ack_packet  = TCP_Packet(self._src_port, self._dst_port, self._client_isn, self._server_isn, self._advertised_window(), None, ack=1, fin=1)
 
         while True:
-            # Received the data and create a Packet object out of the raw received 
-            # data.
+            # Receive the data directly into a packet taken from the receive pool, the
+            # packet is returned to the pool once the data has been processed.
+            if tcp_data_packet is None:
+                tcp_data_packet = self._recv_pool.acquire()
             try:
-                packet, _ = self._recv_sock.recvfrom(10000 + tcp_data_packet.header_len)
+                tcp_data_packet.receive(self._recv_sock, self._integrity)
             except:
                 continue
 
-            tcp_data_packet        = TCP_Packet(0, 0, 0, 0, 0, None)
-            tcp_data_packet.packet = bytearray(packet)
-
             # If the receiver receives a packet containing a set FIN bit, start the closing process.
-            if (tcp_data_packet.is_valid()) and (tcp_data_packet.mgmt_fin == 1):
+            # The flags are checked first so that data packets are only validated once, when
+            # they are processed from the receive buffer.
+            if (tcp_data_packet.mgmt_fin == 1) and (tcp_data_packet.is_valid()):
                 if DEBUG:
                     print(f"TCP: FIN packet received.")
-                tcp_fin_ack_packet.ack_no     = self._base
+                tcp_fin_ack_packet.integrity  = self._integrity
+                tcp_fin_ack_packet.ack_no     = self._base + self._server_isn   # Offset by the ISN as the data ACKs are.
                 tcp_fin_ack_packet.seq_no     = tcp_data_packet.seq_no
-                tcp_fin_ack_packet.rcv_window = self._recv_window
+                tcp_fin_ack_packet.rcv_window = self._advertised_window()
 
                 # Wait for the ACK packet from the client.
                 while True:
@@ -450,17 +806,20 @@ class TCP:
                     else:
                         tcp_data_packet.packet = packet
 
-                    if (tcp_data_packet.is_valid()) and (tcp_data_packet.mgmt_fin == 1) and (tcp_data_packet.mgmt_ack == 1):
+                    if (tcp_data_packet.mgmt_fin == 1) and (tcp_data_packet.mgmt_ack == 1) and (tcp_data_packet.is_valid()):
                         if DEBUG:
                             print("TCP: FIN-ACK packet received from client, closing connection.")
                         break
                     else:
                         continue
 
-                self._receive_complete_f.set()
+                # Set the receive complete flag, waking the _process_recv_buffer thread so that it exits.
+                with self._recv_buffer_c:
+                    self._receive_complete_f.set()
+                    self._recv_buffer_c.notify()
                 return
 
-            if (tcp_data_packet.is_valid()) and (tcp_data_packet.mgmt_syn == 1) and (tcp_data_packet.mgmt_ack == 0):
+            if (tcp_data_packet.mgmt_syn == 1) and (tcp_data_packet.mgmt_ack == 0) and (tcp_data_packet.is_valid()):
                 if DEBUG:
                     print(f"TCP: SYN packet received. (syn_seq_no = {tcp_data_packet.seq_no})")
                 # Extract the client_isn number from the SYN packet sent by the client, and
@@ -470,6 +829,34 @@ class TCP:
                 tcp_syn_ack_packet.seq_no = self._server_isn        # Assign the server isn to the response packet sequence number.
                 tcp_syn_ack_packet.ack_no = self._client_isn + 1    # Increment the ACK number of the response packet.
 
+                # Agree to an alternate checksum requested by the client only if it is the algorithm this host
+                # is configured to use, echoing the request in the SYN-ACK. Otherwise use the Internet checksum.
+                if (self._requested_integrity(tcp_data_packet) is self._integrity_req) and not (self._integrity_req is INTERNET_CHECKSUM):
+                    self._integrity             = self._integrity_req
+                    tcp_syn_ack_packet.options  = self._integrity_option(self._integrity)
+                else:
+                    self._integrity             = INTERNET_CHECKSUM
+                    tcp_syn_ack_packet.options  = bytes(4)
+
+                # Use selective acknowledgements if both hosts offer them.
+                self._sack                          = self._sack_req and tcp_data_packet.sack_permitted
+                tcp_syn_ack_packet.sack_permitted   = self._sack
+
+                # Use timestamps if both hosts offer them, echoing the TSval of the SYN.
+                timestamps                          = tcp_data_packet.timestamps
+                self._timestamps                    = self._timestamps_req and (not timestamps is None)
+                if self._timestamps:
+                    self._ts_recent                 = timestamps[0]
+                    tcp_syn_ack_packet.timestamps   = (timestamp_now(), self._ts_recent)
+                else:
+                    tcp_syn_ack_packet.timestamps   = None
+
+                # Use window scaling if both hosts offer it, sending this host's shift in the SYN-ACK.
+                if self._negotiate_window_scale(tcp_data_packet.window_scale):
+                    tcp_syn_ack_packet.window_scale = self._rcv_wscale
+                else:
+                    tcp_syn_ack_packet.window_scale = None
+
                 # while True:
                 # Send out the packet, with optional debug to simulate ACK packet loss.
                 if DEBUG:
@@ -481,16 +868,14 @@ class TCP:
 
                 # Wait for the client to respond with a SYN-ACK packet.
                 try:
-                    self._recv_sock.settimeout(self._timeout)
-                    packet, _ = self._recv_sock.recvfrom(10000 + tcp_data_packet.header_len)
+                    self._recv_sock.settimeout(self._rtt.rto)
+                    tcp_data_packet.receive(self._recv_sock, self._integrity)
                 except:
                     if DEBUG:
                         print(f"TCP: (recv) Client SYN-ACK response receive timed out, resending server SYN-ACK packet.")
                     continue
-                else:
-                    tcp_data_packet.packet = packet
 
-                if (tcp_data_packet.is_valid()) and (tcp_data_packet.mgmt_syn == 0) and (tcp_data_packet.mgmt_ack == 1):
+                if (tcp_data_packet.mgmt_syn == 0) and (tcp_data_packet.mgmt_ack == 1) and (tcp_data_packet.is_valid()):
                     if DEBUG:
                         print(f"TCP: (recv) SYN-ACK packet received from client. (seq_no = {tcp_data_packet.seq_no}, ack_no = {tcp_data_packet.ack_no})")
                     self._client_isn = tcp_data_packet.seq_no
@@ -501,8 +886,9 @@ class TCP:
                 
             # Add the unprocessed data to the data buffer to queue the received
             # data for processing.
-            self._recv_buffer_l.acquire()
+            self._recv_buffer_c.acquire()
             self._recv_buffer.append(tcp_data_packet)
+            self._recv_buffer_c.notify()
 
             # Decrement the recv_window size based on the size packet.
             self._recv_window_l.acquire()
@@ -510,75 +896,180 @@ class TCP:
             if DEBUG:
                 print(f"TCP: Buffering Packet  (seq no. = {tcp_data_packet.seq_no}, ack no. = {tcp_data_packet.ack_no}, recv window = {self._recv_window})")
             self._recv_window_l.release()
-            self._recv_buffer_l.release()
+            self._recv_buffer_c.release()
+            tcp_data_packet = None
 
     ##
     # @fn       _process_recv_buffer
     # @brief    This method monitors the data buffer for new data, and processes the data based on the contents of the packet.
     #
-    # @param    None.
+    # @param    sink    - Object the in-order data is written to, or None to collect the data in memory.
     #
     # @return   None.
-    def _process_recv_buffer(self):
+    def _process_recv_buffer(self, sink):
         data_buffer         = bytearray()
         tcp_ack_packet      = TCP_Packet(self._src_port, self._dst_port, self._client_isn, self._server_isn, self._mss, None, ack=1)
         tcp_fin_ack_packet  = TCP_Packet(self._src_port, self._dst_port, self._client_isn, self._server_isn, self._mss, None, ack=1, fin=1)
+        ack_pending         = 0     # Number of full segments received in order since the last ACK was sent.
+        ack_timer           = None  # Delayed ACK timer, running while an ACK is being delayed.
 
-        while not self._receive_complete_f.is_set():
-            self._recv_buffer_l.acquire()
-            if len(self._recv_buffer) > 0:
-                # Remove the queued packet from the buffer.
-                tcp_data_packet = self._recv_buffer.pop(0)
+        while True:
+            # Sleep until a packet is buffered by the _recv_data thread, the delayed ACK timer
+            # expires, or the connection is closed.
+            self._recv_buffer_c.acquire()
+            while (len(self._recv_buffer) == 0) and (not self._receive_complete_f.is_set()) and (not self._ack_due):
+                self._recv_buffer_c.wait()
+            if self._receive_complete_f.is_set():
+                self._recv_buffer_c.release()
+                break
 
-                # Increment the receive window size based on the length of the received
-                # packet.
-                self._recv_window_l.acquire()
-                self._recv_window             = min((self._recv_window + len(tcp_data_packet.packet)), 0xFFFF)
-                tcp_ack_packet.rcv_window     = self._recv_window
-                tcp_fin_ack_packet.rcv_window = self._recv_window
-                self._recv_window_l.release()
-            else:
-                self._recv_buffer_l.release()
+            # If the delayed ACK timer expired, send the delayed ACK now, or with the next packet in the buffer.
+            ack_due, self._ack_due = self._ack_due, False
+            if len(self._recv_buffer) == 0:
+                self._recv_buffer_c.release()
+                if ack_pending > 0:
+                    ack_pending, ack_timer = 0, None
+                    self._send_ack(tcp_ack_packet)
                 continue
-            self._recv_buffer_l.release()
+
+            # Remove the queued packet from the buffer.
+            tcp_data_packet = self._recv_buffer.pop(0)
+
+            # Increment the receive window size based on the length of the received
+            # packet.
+            self._recv_window_l.acquire()
+            self._recv_window             = min((self._recv_window + len(tcp_data_packet.packet)), self._recv_buffer_size)
+            tcp_ack_packet.rcv_window     = self._advertised_window()
+            tcp_fin_ack_packet.rcv_window = self._advertised_window()
+            self._recv_window_l.release()
+            self._recv_buffer_c.release()
 
             # If the packet taken from the queue is invalid, discard it,
             # and continue to the next packet in the queue.
             if (not tcp_data_packet.is_valid()) or ((packet_corrupted(self._loss) and self._debug_option == 3)):
                 if DEBUG:
                     print(f"TCP: Packet checksum is invalid.")
+                self._recv_pool.release(tcp_data_packet)
                 continue
             else:
                 if DEBUG:
                     print(f"TCP: Processing packet (seq no. = {tcp_data_packet.seq_no}, ack no. = {tcp_data_packet.ack_no})")
 
-            # If the received packet has a sequence number that matches the 
-            # base value in the receive process, extract the packet data and
-            # add it to the buffer that will be passed to the application layer.
-            if (tcp_data_packet.seq_no - self._client_isn) == self._base:
-                if not tcp_data_packet.data is None:
-                    # Add the packet data to the buffer that will be passed
-                    # to the application layer.
-                    data_buffer += tcp_data_packet.data
-
-                    # Increase the base value based on the number of bytes 
-                    # in the received data.
-                    self._base            += len(tcp_data_packet.data)
-                    tcp_ack_packet.ack_no  = (self._base + self._server_isn)
-                    tcp_ack_packet.seq_no  = tcp_data_packet.seq_no
+            seq_no      = tcp_data_packet.seq_no - self._client_isn
+            data        = tcp_data_packet.data
+            delay_ack   = False     # The ACK for the packet may be delayed.
+
+            # Echo the TSval of a segment starting at or before the data last acknowledged (RFC 7323). The
+            # echoed time then covers a delayed ACK, and the wait for data missing before a segment. A TSval
+            # older than the one held comes from an old duplicate or reordered segment, and is not echoed.
+            if self._timestamps and (seq_no <= self._last_ack_sent):
+                timestamps = tcp_data_packet.timestamps
+                if (not timestamps is None) and (not timestamp_before(timestamps[0], self._ts_recent)):
+                    self._ts_recent = timestamps[0]
+
+            # If the received packet holds the data at the base value in the receive process,
+            # extract the data from the base value onwards and add it to the buffer that will be
+            # passed to the application layer. Data overlapping what was already received is skipped.
+            if (not data is None) and (seq_no <= self._base < (seq_no + len(data))):
+                data = data[(self._base - seq_no):]
+
+                # Add the packet data to the buffer that will be passed
+                # to the application layer, or write it straight to the sink.
+                if sink is None:
+                    data_buffer += data
                 else:
-                    self._base += 1  
-            
-            if DEBUG:
-                print(f"TCP: Sending ACK       (seq no. = {tcp_ack_packet.seq_no}, ack no. = {tcp_ack_packet.ack_no}, recv window = {self._recv_window})")
-            
-            # Send out the packet, with optional debug to simulate ACK packet loss.
-            if (packet_lost(self._loss)) and (self._debug_option == 4):
-                pass
-            else:
-                self._send_sock.sendto(tcp_ack_packet.packet, (self._dst_ip, self._dst_port))
+                    sink.write(data)
+
+                # Increase the base value based on the number of bytes 
+                # in the received data.
+                self._base += len(data)
+
+                # Only the ACK for a full segment received in order may be delayed, so that the sender
+                # learns of the end of a burst of data straight away.
+                delay_ack = (self._ack_delay > 0) and (len(tcp_data_packet.data) == self._mss)
+
+                # Pass on the data received out of order that now follows the base value, which the
+                # reassembly queue holds as a single run, advancing the base value past all of it.
+                # The ACK for a packet filling a gap is never delayed.
+                data = self._ooo_queue.pop(self._base)
+                if not data is None:
+                    if sink is None:
+                        data_buffer += data
+                    else:
+                        sink.write(data)
+                    self._base += len(data)
+                    delay_ack   = False
+
+                tcp_ack_packet.ack_no  = (self._base + self._server_isn)
+                tcp_ack_packet.seq_no  = tcp_data_packet.seq_no
+            elif (data is None) and (seq_no == self._base):
+                self._base += 1
+
+            # Hold on to data received ahead of the base value until the data before it arrives.
+            elif (not data is None) and (seq_no > self._base):
+                self._ooo_queue.insert(self._base, seq_no, data)
+
+            # The timestamps are set before the SACK blocks, which only fill the remaining option space.
+            if self._timestamps:
+                tcp_ack_packet.timestamps = (timestamp_now(), self._ts_recent)
+
+            # Report the data held ahead of the base value to the sender, so that it is not sent again.
+            if self._sack:
+                tcp_ack_packet.sack_blocks = [((left + self._server_isn), (right + self._server_isn)) for left, right in self._ooo_queue.blocks()[:MAX_SACK_BLOCKS]]
+
+            # The packet data has been copied into the data buffer, return the packet
+            # to the receive pool to be reused for a later datagram.
+            self._recv_pool.release(tcp_data_packet)
+
+            # In delayed ACK mode, send an ACK for every second full segment received in order, or once
+            # the delayed ACK timer expires. Out of order, duplicate and short segments are ACKed at once.
+            if delay_ack and (not ack_due) and (ack_pending == 0):
+                ack_pending = 1
+                ack_timer   = TIMER_WHEEL.schedule(self._ack_delay, self._ack_timeout_handle)
+                continue
+            if not ack_timer is None:
+                ack_timer.cancel()
+            ack_pending, ack_timer = 0, None
+            self._send_ack(tcp_ack_packet)
 
-        self._data = data_buffer
+        self._data = data_buffer if (sink is None) else None
+        return
+
+    ##
+    # @fn       _send_ack
+    # @brief    This method sends the ACK packet built by the _process_recv_buffer thread to the sending host.
+    #
+    # @param    tcp_ack_packet  - ACK packet to send.
+    #
+    # @return   None.
+    def _send_ack(self, tcp_ack_packet):
+        if DEBUG:
+            print(f"TCP: Sending ACK       (seq no. = {tcp_ack_packet.seq_no}, ack no. = {tcp_ack_packet.ack_no}, recv window = {self._recv_window})")
+
+        # The ACK packet is created before the handshake, so switch it to the negotiated integrity algorithm.
+        if not tcp_ack_packet.integrity is self._integrity:
+            tcp_ack_packet.integrity = self._integrity
+
+        # Send out the packet, with optional debug to simulate ACK packet loss.
+        self._last_ack_sent = tcp_ack_packet.ack_no - self._server_isn
+        if (packet_lost(self._loss)) and (self._debug_option == 4):
+            pass
+        else:
+            self._send_sock.sendto(tcp_ack_packet.packet, (self._dst_ip, self._dst_port))
+        return
+
+    ##
+    # @fn       _ack_timeout_handle
+    # @brief    This method is called by the timer wheel when the delayed ACK timer expires, and wakes the
+    #           _process_recv_buffer thread to send the delayed ACK.
+    #
+    # @param    None.
+    #
+    # @return   None.
+    def _ack_timeout_handle(self):
+        with self._recv_buffer_c:
+            self._ack_due = True
+            self._recv_buffer_c.notify()
         return
 
     ##
@@ -591,49 +1082,204 @@ class TCP:
     #
     # @return   None.
     def _timeout_handle(self, seq_no):
-        wildcard = WildCard()
+        # Respond once per expiry of the timer of the oldest segment awaiting an ACK (RFC 6298), so the RTO
+        # is backed off once. Expiries of the timers of later segments, and of a timer cancelled by the
+        # response to an expiry in the same tick, are covered by that response.
+        self._ack_pending_l.acquire()
+        segment = self._ack_pending_queue.get(seq_no)
+        if (seq_no != self._base) or (segment is None) or segment.timer.cancelled:
+            self._ack_pending_l.release()
+            return
 
         # Stop all currently running timers to prevent previous timeouts from occuring.
-        self._ack_pending_l.acquire()
-        try:
-            for timer in self._ack_pending_timers[(self._ack_pending_timers.index([wildcard, self._base, wildcard])):]:
-                try:
-                    timer[0].cancel()
-                except:
-                    continue
-        except:
-            pass
+        for segment in self._ack_pending_queue:
+            segment.timer.cancel()
+        self._retransmit_seqs = []
+        self._rtt.backoff()         # Double the timeout until a new RTT sample is taken (RFC 6298).
         self._ack_pending_l.release()
 
-        self._ssthresh = (self._cwnd_factor * self._cwnd) / 2    # Assign the ssthresh value.
+        # All the data in flight is resent, so any pending probe is no longer needed.
+        self._cancel_loss_timers()
+        self._probe_f = False
+        self._tlp_end = None
+
+        # Leave fast recovery, and do not enter it again until the data sent before the timeout has been
+        # acknowledged, as the resent data produces duplicate ACKs that do not indicate a new loss.
+        self._recovery_f = False
+        self._recover    = self._sent_end
 
+        # Save the congestion state on the first timeout before an ACK arrives, so that it can be restored if the
+        # ACK shows that the timeout was spurious. Later timeouts leave the first one as the point to undo to.
         self._cwnd_l.acquire()
-        self._cwnd_factor = 1                                       # Reset the congestion window to 1 MSS.
+        if self._eifel_req and self._timestamps and (self._eifel_ts is None):
+            self._eifel_ts   = timestamp_now()
+            self._undo_state = self._cc.undo_state()
+        self._cc.on_timeout(self._sent_end - self._base)    # Reduce the slow-start threshold and reset the congestion window.
         self._cwnd_l.release()
         
         self._seq_no_l.acquire()
         self._seq_no = self._base                              # Reset the sequence number to be equal to the base value.
         self._seq_no_l.release()
 
-        self._slow_start_f.set()
-        
+        self._send_wake_f.set()
         return
 
     ##
-    # @fn       _fast_retransmit
-    # @brief    This method controls the fast retransmit operation by setting the congestion window
-    #           value and resetting the sequence number to be equal to the base value.
+    # @fn       _eifel_undo
+    # @brief    This method is called for the first ACK of new data after a timeout, and undoes the response to the
+    #           timeout if the timestamp echoed by the ACK shows that it was spurious (RFC 4015). The congestion
+    #           state is restored, and the sender resumes with the data it had not yet sent rather than resending
+    #           the data still in flight, whose retransmission timers are restarted.
     #
-    # @param    None.
+    # @param    ts_echo - TSecr value of the ACK, or None if it carried no timestamps.
     #
     # @return   None.
-    def _fast_retransmit(self):   
+    def _eifel_undo(self, ts_echo):
         self._cwnd_l.acquire()
-        self._cwnd_factor = self._cwnd_factor / 2   # Reduce the size of the transmission window by half.
+        spurious = (not ts_echo is None) and timestamp_before(ts_echo, self._eifel_ts)
+        if spurious:
+            self._cc.on_spurious_timeout(self._undo_state)
+        self._eifel_ts   = None
+        self._undo_state = None
         self._cwnd_l.release()
+        if not spurious:
+            return
+
+        self.spurious_timeouts += 1
+        if DEBUG:
+            print(f"TCP: Spurious timeout detected, restoring the congestion window (rto = {self._rtt.rto}s).")
 
         self._seq_no_l.acquire()
-        self._seq_no = self._base                   # Reset the sequence number to be equal to the base value.
+        self._seq_no = max(self._seq_no, self._sent_end)
+        self._ack_pending_l.acquire()
+        for segment in self._ack_pending_queue:
+            if not segment.sacked:
+                segment.timer.cancel()
+                segment.timer = TIMER_WHEEL.schedule(self._rtt.rto, self._timeout_handle, (segment.seq_no,))
+        self._ack_pending_l.release()
         self._seq_no_l.release()
         return
-    
+
+    ##
+    # @fn       _fast_retransmit
+    # @brief    This method enters the fast recovery phase (RFC 6582) after the third duplicate ACK, or when
+    #           RACK marks segments as lost. The congestion control algorithm reduces the congestion window,
+    #           and the missing segments are resent. If the sender is already in fast recovery, the segments
+    #           are only resent.
+    #
+    # @param    dup_acks    - Number of duplicate ACKs received for the base value.
+    # @param    seqs        - (optional) Sequence numbers of the segments to resend, the segment at the base
+    #                         value by default.
+    #
+    # @return   None.
+    def _fast_retransmit(self, dup_acks, seqs=None):
+        if not self._recovery_f:
+            self._recover = self._sent_end      # Fast recovery ends when all the data sent so far is acknowledged.
+
+            self._cwnd_l.acquire()
+            self._cc.on_loss((self._sent_end - self._base), dup_acks)
+            self._cwnd_l.release()
+
+            self._recovery_f = True
+            self._tlp_end    = None             # Fast recovery also responds to any loss repaired by a probe.
+
+        self._ack_pending_l.acquire()
+        self._retransmit_seqs.extend([self._base] if (seqs is None) else seqs)  # Resend only the missing segments, not the whole window.
+        self._ack_pending_l.release()
+        return
+
+    ##
+    # @fn       _rack_detect_loss
+    # @brief    This method records the segments delivered by an ACK with RACK, and resends the segments RACK
+    #           marks as lost, entering fast recovery if the sender is not already in it. The RACK timer is
+    #           restarted for the segments that may still arrive within the reordering window.
+    #
+    # @param    delivered   - (optional) List of the PendingSegment entries acknowledged or newly SACKed, with
+    #                         the acknowledged entries first.
+    #
+    # @return   None.
+    def _rack_detect_loss(self, delivered=()):
+        self._ack_pending_l.acquire()
+        now = time.time()
+        for segment in delivered:
+            self._rack.update(segment, now)
+        if not self._rack_timer is None:
+            self._rack_timer.cancel()
+            self._rack_timer = None
+        lost, timeout = self._rack.detect_loss(self._ack_pending_queue, now, self._rtt.srtt, self._recovery_f)
+        if timeout > 0:
+            self._rack_timer = TIMER_WHEEL.schedule(timeout, self._rack_timeout_handle)
+        self._ack_pending_l.release()
+
+        # After a timeout all the data sent before it is being resent, so the segments are not resent again.
+        if lost and (self._recovery_f or (self._base >= self._recover)):
+            if DEBUG:
+                print(f"TCP: RACK marked {len(lost)} segments as lost.")
+            self._fast_retransmit(0, [segment.seq_no for segment in lost])
+        return
+
+    ##
+    # @fn       _arm_tlp
+    # @brief    This method restarts the tail loss probe timer while data is in flight, unless the sender is in
+    #           fast recovery or a probe is already outstanding.
+    #
+    # @param    None.
+    #
+    # @return   None.
+    def _arm_tlp(self):
+        self._ack_pending_l.acquire()
+        if not self._tlp_timer is None:
+            self._tlp_timer.cancel()
+            self._tlp_timer = None
+        flight = self._sent_end - self._base
+        if (flight > 0) and (not self._recovery_f) and (self._tlp_end is None):
+            self._tlp_timer = TIMER_WHEEL.schedule(probe_timeout(self._rtt.srtt, self._rtt.rto, flight, self._mss), self._tlp_timeout_handle)
+        self._ack_pending_l.release()
+        return
+
+    ##
+    # @fn       _cancel_loss_timers
+    # @brief    This method stops the RACK and tail loss probe timers.
+    #
+    # @param    None.
+    #
+    # @return   None.
+    def _cancel_loss_timers(self):
+        self._ack_pending_l.acquire()
+        for timer in (self._rack_timer, self._tlp_timer):
+            if not timer is None:
+                timer.cancel()
+        self._rack_timer = None
+        self._tlp_timer  = None
+        self._ack_pending_l.release()
+        return
+
+    ##
+    # @fn       _rack_timeout_handle
+    # @brief    This method is called by the timer wheel when the reordering window of a segment has passed,
+    #           and marks the segments that have still not arrived as lost.
+    #
+    # @param    None.
+    #
+    # @return   None.
+    def _rack_timeout_handle(self):
+        self._rack_detect_loss()
+        self._send_wake_f.set()
+        return
+
+    ##
+    # @fn       _tlp_timeout_handle
+    # @brief    This method is called by the timer wheel when the tail loss probe timer expires, and wakes the
+    #           send thread to send a probe.
+    #
+    # @param    None.
+    #
+    # @return   None.
+    def _tlp_timeout_handle(self):
+        self._ack_pending_l.acquire()
+        self._tlp_timer = None
+        self._ack_pending_l.release()
+        if not self._recovery_f:
+            self._probe_f = True
+            self._send_wake_f.set()
+        return
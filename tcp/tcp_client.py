@@ -6,12 +6,11 @@ from lib.tcp.tcp import TCP
 def main(option, error):
     # Run this version if the operating system is Windows based.
     if os.name == "nt":
-        data = Packets.file2packets("client_data\\test.bmp", 1)
+        source = PacketSource("client_data\\test.bmp", 5000)
     # Run this version in all other cases. Should cover all TA operating systems.
     else:
-        data = Packets.file2packets("client_data/test.bmp", 1)
+        source = PacketSource("client_data/test.bmp", 5000)
     print("Sending data...")
-    data        = bytearray(b''.join(data))
     
     if option == 1:
         tcp_client  = TCP("127.0.0.1", 55000, "127.0.0.1", 54000, 5000, loss=error, debug_option=1)
@@ -24,9 +23,11 @@ def main(option, error):
     elif option == 5:
         tcp_client  = TCP("127.0.0.1", 55000, "127.0.0.1", 54000, 5000, loss=error, debug_option=5)
 
+    # Send the memory-mapped file directly, the TCP process slices its own segments from it.
     tcp_client.connect()
-    tcp_client.send(data)
+    tcp_client.send(source.data)
     tcp_client.close()
+    source.close()
     print("Sending process complete.")
 
 if __name__ == "__main__":
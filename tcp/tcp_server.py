@@ -17,12 +17,14 @@ def main(option, error):
 
     print("Receiving data...")
     start = datetime.now()
-    data = tcp_server.recv()
 
+    # Write the data to the file as it is received, rather than collecting it in memory first.
     if os.name == "nt":
-        Packets.packets2file("server_data\\test.bmp", data)
+        path = "server_data\\test.bmp"
     else:
-        Packets.packets2file("server_data/test.bmp", data)
+        path = "server_data/test.bmp"
+    with PacketSink(path) as sink:
+        tcp_server.recv(sink)
 
     end = datetime.now()
     time_trials = (end - start)
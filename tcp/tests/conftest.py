@@ -0,0 +1,96 @@
+import itertools
+import socket
+import threading
+import time
+
+import pytest
+
+import lib.tcp.tcp as tcp
+from lib.tcp.components.tcp_packet import TCP_Packet
+
+_ports = itertools.count(47000, 2)  # Loopback ports of the connections made by the tests.
+
+##
+# @fn       transfer
+# @brief    Fixture giving a function that transfers data over a loopback connection between two TCP
+#           endpoints, returning the client, the server and the data received by the server.
+@pytest.fixture
+def transfer():
+    tcp.DEBUG = False
+
+    def run(data, client_options=None, server_options=None, mss=1000):
+        port   = next(_ports)
+        server = tcp.TCP("127.0.0.1", port, "127.0.0.1", port + 1, mss, **(server_options or {}))
+        client = tcp.TCP("127.0.0.1", port + 1, "127.0.0.1", port, mss, **(client_options or {}))
+        result = {}
+        thread = threading.Thread(target=lambda: result.update(data=server.recv()), daemon=True)
+        thread.start()
+        client.connect()
+        client.send(bytearray(data))
+        client.close()
+        thread.join(30)
+        return client, server, result.get("data")
+    return run
+
+##
+# @class    AckPeer
+# @brief    Socket standing in for the remote host of a TCP sender, used to feed the sender ACK packets and run
+#           its ACK receive loop until they have been processed.
+class AckPeer:
+    def __init__(self, sender):
+        self.sender = sender
+        self._sock  = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self._addr  = ("127.0.0.1", sender._src_port)
+        return
+
+    ##
+    # @fn       ack
+    # @brief    Builds an ACK packet from the remote host, with the ACK number relative to the server ISN.
+    def ack(self, ack_no, window=65535, timestamps=None):
+        packet = TCP_Packet(self.sender._dst_port, self.sender._src_port, self.sender._server_isn, (ack_no + self.sender._server_isn), window, None, ack=1)
+        if not timestamps is None:
+            packet.timestamps = timestamps
+        return packet
+
+    ##
+    # @fn       deliver
+    # @brief    Sends the packets to the sender and runs its ACK receive loop until until() returns True.
+    def deliver(self, packets, until):
+        thread = threading.Thread(target=self.sender._recv_ack, daemon=True)
+        thread.start()
+        for packet in packets:
+            self._sock.sendto(packet.packet, self._addr)
+        deadline = time.monotonic() + 5
+        while (not until()) and (time.monotonic() < deadline):
+            time.sleep(0.001)
+
+        # Stop the loop, waking it with a packet that is not an ACK.
+        self.sender._send_complete_f.set()
+        self._sock.sendto(TCP_Packet(0, 0, 0, 0, 0, None).packet, self._addr)
+        thread.join(5)
+        self.sender._send_complete_f.clear()
+        return until()
+
+    def close(self):
+        self._sock.close()
+        self.sender._send_sock.close()
+        self.sender._recv_sock.close()
+        return
+
+##
+# @fn       ack_peer
+# @brief    Fixture giving a function that creates a TCP sender, which has not been connected, and an AckPeer
+#           feeding it ACKs. Keyword arguments are passed to the TCP constructor.
+@pytest.fixture
+def ack_peer():
+    tcp.DEBUG = False
+    peers     = []
+
+    def create(mss=100, **options):
+        port   = next(_ports)
+        sender = tcp.TCP("127.0.0.1", port, "127.0.0.1", port + 1, mss, **options)
+        peers.append(AckPeer(sender))
+        return peers[-1]
+    yield create
+    for peer in peers:
+        peer.close()
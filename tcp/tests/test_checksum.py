@@ -0,0 +1,79 @@
+import random
+
+import pytest
+
+from lib.tcp.components.checksum import checksum, ones_complement_sum, update_checksum, verify_checksum
+from lib.tcp.components.tcp_packet import TCP_Packet
+
+def full_checksum(packet):
+    # Checksum of the packet recalculated from scratch, with the checksum field zeroed.
+    raw         = bytearray(packet.packet)
+    raw[16:18]  = bytes(2)
+    return checksum(bytes(raw))
+
+def test_checksum_and_verify():
+    packet = bytes(range(1, 41))
+    assert verify_checksum(packet + checksum(packet))
+    assert not verify_checksum(packet + bytes(2))
+    assert ones_complement_sum(bytes(6)) == 0
+    assert ones_complement_sum(b"\xff\xff\x00\x00") == 0xFFFF
+
+@pytest.mark.parametrize("old, new", [(b"\x00\x01", b"\x12\x34"), (b"\x12\x34", b"\x00\x00"), (b"\x00\x01", b"\xff\xff"), (b"\xff\xff", b"\x00\x01")])
+def test_update_checksum(old, new):
+    rest = b"\x00\x00\x00\x00\x40\x02"
+    assert update_checksum(checksum(old + rest), old, new) == checksum(new + rest)
+
+def test_update_checksum_negative_zero():
+    # A packet whose words sum to 0xFFFF (-0) has a checksum of 0x0000, and one whose only non-zero words
+    # are changed has a checksum of 0xFFFF before the change.
+    assert checksum(b"\xff\xff") == bytes(2)
+    assert update_checksum(checksum(b"\x00\x01"), b"\x00\x01", b"\xff\xff") == bytes(2)
+    assert update_checksum(bytes(2), b"\xff\xff", b"\x00\x01") == checksum(b"\x00\x01")
+    assert update_checksum(b"\xff\xff", b"\x00\x00", b"\x12\x34") == checksum(b"\x12\x34")
+
+FIELDS = [
+    ("src_port",    16),
+    ("dst_port",    16),
+    ("seq_no",      32),
+    ("ack_no",      32),
+    ("rcv_window",  16),
+]
+
+@pytest.mark.parametrize("data", [None, b"abc", bytes(range(200))])
+@pytest.mark.parametrize("field, bits", FIELDS)
+def test_header_field_updates_match_full_checksum(field, bits, data):
+    generator = random.Random(field)
+    packet    = TCP_Packet(1000, 2000, 3000, 4000, 5000, data, ack=1)
+    for value in [0, ((1 << bits) - 1), 1] + [generator.randrange(1 << bits) for _ in range(200)]:
+        setattr(packet, field, value)
+        assert getattr(packet, field) == value
+        assert packet.checksum == full_checksum(packet)
+        assert packet.is_valid()
+
+@pytest.mark.parametrize("flag", ["mgmt_cwr", "mgmt_ece", "mgmt_urg", "mgmt_ack", "mgmt_psh", "mgmt_rst", "mgmt_fin"])
+def test_flag_updates_match_full_checksum(flag):
+    # The flags are in the odd byte of their 16-bit word.
+    packet = TCP_Packet(1000, 2000, 3000, 4000, 5000, b"abc")
+    for value in (1, 0, 1):
+        setattr(packet, flag, value)
+        assert getattr(packet, flag) == value
+        assert packet.checksum == full_checksum(packet)
+
+def test_option_updates_match_full_checksum():
+    generator = random.Random(1)
+    packet    = TCP_Packet(1000, 2000, 3000, 4000, 5000, b"abcde")
+    for _ in range(200):
+        packet.options = bytes(generator.randrange(256) for _ in range(4))
+        assert packet.checksum == full_checksum(packet)
+    packet.sack_blocks = [(100, 200), (300, 400)]
+    packet.timestamps  = (123456, 654321)
+    assert packet.checksum == full_checksum(packet)
+
+def test_every_window_value_including_zero_checksum():
+    packet = TCP_Packet(1000, 2000, 3000, 4000, 0, b"abc", ack=1)
+    seen   = set()
+    for window in range(0x10000):
+        packet.rcv_window = window
+        assert packet.checksum == full_checksum(packet)
+        seen.add(packet.checksum)
+    assert bytes(2) in seen
@@ -0,0 +1,185 @@
+import pytest
+
+import lib.tcp.components.congestion_control as congestion_control
+from lib.tcp.components.congestion_control import CongestionControl, Reno, CUBIC, get_congestion_control
+
+MSS = 100
+
+class Clock:
+    # Stands in for time.monotonic, advanced by the tests.
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(congestion_control.time, "monotonic", clock)
+    return clock
+
+def test_lookup_and_abstract_base():
+    assert isinstance(get_congestion_control("reno", MSS), Reno)
+    assert isinstance(get_congestion_control("cubic", MSS), CUBIC)
+    with pytest.raises(ValueError):
+        get_congestion_control("vegas", MSS)
+    with pytest.raises(TypeError):
+        CongestionControl(MSS)
+
+def test_reno_slow_start_grows_by_data_acknowledged_up_to_ssthresh():
+    reno = Reno(MSS, hystart=False)
+    assert (reno.cwnd == MSS) and reno.slow_start
+    reno.on_ack(MSS, 0)
+    assert reno.cwnd == 2 * MSS
+    reno.on_ack(2 * MSS, 0)
+    assert reno.cwnd == 4 * MSS
+
+    reno.ssthresh = 450
+    reno.on_ack(4 * MSS, 0)
+    assert reno.cwnd == 450
+    assert not reno.slow_start
+
+def test_reno_congestion_avoidance_grows_by_one_segment_per_window():
+    reno          = Reno(MSS, hystart=False)
+    reno.cwnd     = 10 * MSS
+    reno.ssthresh = 5 * MSS
+    reno.on_ack(MSS, 0)
+    assert reno.cwnd == pytest.approx((10 * MSS) + (MSS / 10))
+    for _ in range(9):
+        reno.on_ack(MSS, 0)
+    assert reno.cwnd == pytest.approx(11 * MSS, rel=0.01)
+
+def test_reno_loss_and_timeout():
+    reno      = Reno(MSS, hystart=False)
+    reno.cwnd = 20 * MSS
+    reno.on_loss(20 * MSS, 3)
+    assert reno.ssthresh == 10 * MSS
+    assert reno.cwnd     == 13 * MSS
+
+    reno.on_timeout(20 * MSS)
+    assert (reno.ssthresh == 10 * MSS) and (reno.cwnd == MSS)
+
+    # The threshold is at least two segments.
+    reno.on_timeout(MSS)
+    assert reno.ssthresh == 2 * MSS
+
+def test_newreno_fast_recovery_window():
+    reno      = Reno(MSS, hystart=False)
+    reno.cwnd = 20 * MSS
+    reno.on_loss(20 * MSS, 3)
+
+    # Each duplicate ACK inflates the window by a segment.
+    reno.on_dupack(2)
+    assert reno.cwnd == 15 * MSS
+
+    # A partial ACK deflates the window by the data acknowledged, adding back a segment if a full one was acknowledged.
+    reno.on_partial_ack(3 * MSS)
+    assert reno.cwnd == 13 * MSS
+    reno.on_partial_ack(MSS // 2)
+    assert reno.cwnd == (13 * MSS) - (MSS // 2)
+    reno.on_partial_ack(100 * MSS)
+    assert reno.cwnd == MSS
+
+    # The full ACK deflates the window to ssthresh, or one segment more than the data in flight if that is less.
+    reno.on_recovery_exit(20 * MSS)
+    assert reno.cwnd == 10 * MSS
+    reno.on_recovery_exit(2 * MSS)
+    assert reno.cwnd == 3 * MSS
+    reno.on_recovery_exit(0)
+    assert reno.cwnd == 2 * MSS
+
+def test_sender_partial_ack_resends_and_full_ack_exits_recovery(ack_peer):
+    peer   = ack_peer(mss=MSS, rack=False)
+    sender = peer.sender
+    sender._seq_no = sender._sent_end = 10 * MSS
+    sender._cc.cwnd = 20 * MSS
+    sender._cc.on_loss(10 * MSS, 3)
+    sender._recovery_f = True
+    sender._recover    = 10 * MSS
+
+    assert peer.deliver([peer.ack(2 * MSS)], lambda: sender._base == 2 * MSS)
+    assert sender._recovery_f
+    assert sender._retransmit_seqs == [2 * MSS]
+    assert sender._cc.cwnd == (8 * MSS) - (2 * MSS) + MSS
+
+    assert peer.deliver([peer.ack(10 * MSS)], lambda: sender._base == 10 * MSS)
+    assert not sender._recovery_f
+    assert sender._cc.cwnd == MSS + MSS    # Nothing is left in flight.
+
+def test_cubic_reduction_and_k(clock):
+    cubic      = CUBIC(MSS, hystart=False)
+    cubic.cwnd = 100 * MSS
+    cubic.on_loss(100 * MSS, 0)
+    assert cubic._w_max   == 100
+    assert cubic.ssthresh == pytest.approx(70 * MSS)
+    assert cubic.cwnd     == pytest.approx(70 * MSS)
+
+    # The first ACK of the epoch sets K, the time to grow back to W_max.
+    cubic.on_ack(MSS, 0)
+    k = ((100 - 70) / CUBIC.C) ** (1 / 3)
+    assert cubic._k == pytest.approx(k)
+
+    # At K, the cubic function reaches W_max, and the window grows towards it.
+    clock.now = k
+    cwnd      = cubic.cwnd / MSS
+    cubic.on_ack(MSS, 0)
+    assert cubic.cwnd / MSS == pytest.approx(cwnd + ((100 - cwnd) / cwnd))
+
+    # Far beyond K, the growth is limited to 1.5 times the window per RTT.
+    clock.now = 100
+    cwnd      = cubic.cwnd / MSS
+    cubic.on_ack(MSS, 0)
+    assert cubic.cwnd / MSS == pytest.approx(cwnd + ((0.5 * cwnd) / cwnd))
+
+def test_cubic_fast_convergence(clock):
+    cubic      = CUBIC(MSS, hystart=False)
+    cubic.cwnd = 100 * MSS
+    cubic.on_loss(100 * MSS, 0)
+    cubic.on_loss(70 * MSS, 0)
+    assert cubic._w_last_max == pytest.approx(70)
+    assert cubic._w_max      == pytest.approx(70 * ((1 + CUBIC.BETA) / 2))
+
+def test_cubic_reno_friendly_region(clock):
+    # With no time passed, the cubic function gives the current window, and the estimated Reno window takes over.
+    cubic      = CUBIC(MSS, hystart=False)
+    cubic.cwnd = 100 * MSS
+    cubic.on_loss(100 * MSS, 0)
+    cubic.on_ack(70 * MSS, 0)
+    growth = (3 * (1 - CUBIC.BETA)) / (1 + CUBIC.BETA)
+    assert cubic.cwnd / MSS == pytest.approx(70 + growth)
+
+def test_cubic_timeout():
+    cubic      = CUBIC(MSS, hystart=False)
+    cubic.cwnd = 100 * MSS
+    cubic.on_timeout(100 * MSS)
+    assert cubic.cwnd == MSS
+    assert cubic.ssthresh == pytest.approx(70 * MSS)
+    assert cubic._w_max == 100
+
+@pytest.mark.parametrize("name", ["reno", "cubic"])
+def test_spurious_timeout_restores_saved_state(name, clock):
+    algorithm      = get_congestion_control(name, MSS, hystart=False)
+    algorithm.cwnd = 40 * MSS
+    algorithm.on_loss(40 * MSS, 0)
+    algorithm.on_recovery_exit(40 * MSS)
+    algorithm.on_ack(MSS, 0)
+    cwnd, ssthresh = algorithm.cwnd, algorithm.ssthresh
+    saved          = dict(vars(algorithm))
+
+    state = algorithm.undo_state()
+    algorithm.on_timeout(40 * MSS)
+    assert algorithm.cwnd == MSS
+    algorithm.on_spurious_timeout(state)
+    assert (algorithm.cwnd == cwnd) and (algorithm.ssthresh == ssthresh)
+    assert vars(algorithm) == saved
+
+def test_spurious_timeout_keeps_larger_window():
+    reno           = Reno(MSS, hystart=False)
+    reno.cwnd      = 10 * MSS
+    reno.ssthresh  = 8 * MSS
+    state          = reno.undo_state()
+    reno.on_timeout(10 * MSS)
+    reno.cwnd      = 12 * MSS
+    reno.on_spurious_timeout(state)
+    assert (reno.cwnd == 12 * MSS) and (reno.ssthresh == 8 * MSS)
@@ -0,0 +1,88 @@
+import time
+
+import pytest
+
+from lib.tcp.components.rtt_estimator import timestamp_now
+from lib.tcp.components.timer_wheel import WheelTimer
+
+MSS = 100
+
+class Timer:
+    def __init__(self):
+        self.cancelled = False
+
+    def cancel(self):
+        self.cancelled = True
+
+def timed_out_sender(ack_peer, **options):
+    # Sender with five segments in flight in congestion avoidance, whose retransmission timer has expired.
+    peer   = ack_peer(mss=MSS, **options)
+    sender = peer.sender
+    sender._timestamps = True
+    for index in range(5):
+        sender._ack_pending_queue.push((index * MSS), ((index + 1) * MSS), Timer(), time.time())
+    sender._seq_no = sender._sent_end = 5 * MSS
+    sender._cc.cwnd     = 10 * MSS
+    sender._cc.ssthresh = 8 * MSS
+    sent_ts = timestamp_now()   # TSval of the original transmissions.
+
+    time.sleep(0.002)
+    sender._timeout_handle(0)
+    assert sender._cc.cwnd == MSS
+    assert sender._seq_no == 0
+    assert sender._rtt.rto == 2
+    return peer, sender, sent_ts
+
+def test_spurious_timeout_is_undone(ack_peer):
+    peer, sender, sent_ts = timed_out_sender(ack_peer)
+    assert not sender._eifel_ts is None
+
+    # The ACK echoes the TSval of the original transmission, so the original segment was delayed rather than lost.
+    assert peer.deliver([peer.ack(MSS, timestamps=(1, sent_ts))], lambda: sender._base == MSS)
+    assert sender.spurious_timeouts == 1
+    assert sender._cc.cwnd     >= 10 * MSS
+    assert sender._cc.ssthresh == 8 * MSS
+    assert sender._eifel_ts is None
+
+    # The sender resumes after the data it had sent, and the timers of the data still in flight are restarted.
+    assert sender._seq_no == 5 * MSS
+    segments = list(sender._ack_pending_queue)
+    assert [segment.seq_no for segment in segments] == [MSS, 2 * MSS, 3 * MSS, 4 * MSS]
+    for segment in segments:
+        assert isinstance(segment.timer, WheelTimer) and (not segment.timer.cancelled)
+        segment.timer.cancel()
+
+@pytest.mark.parametrize("echo_after_timeout", [True, False])
+def test_genuine_timeout_is_left_alone(ack_peer, echo_after_timeout):
+    peer, sender, sent_ts = timed_out_sender(ack_peer)
+
+    # The ACK echoes the TSval of the retransmission, or carries no timestamps and so cannot show the timeout was spurious.
+    time.sleep(0.002)
+    ack = peer.ack(MSS, timestamps=(1, timestamp_now())) if echo_after_timeout else peer.ack(MSS)
+    assert peer.deliver([ack], lambda: sender._base == MSS)
+    assert sender.spurious_timeouts == 0
+    assert sender._cc.cwnd     == 2 * MSS
+    assert sender._cc.ssthresh == (5 * MSS) / 2
+    assert sender._eifel_ts is None
+    assert sender._seq_no == 0
+    assert all(segment.timer.cancelled for segment in sender._ack_pending_queue)
+
+def test_first_timeout_is_kept_as_undo_point(ack_peer):
+    peer, sender, sent_ts = timed_out_sender(ack_peer)
+    eifel_ts = sender._eifel_ts
+    sender._ack_pending_queue.push(0, MSS, Timer(), time.time())
+    sender._timeout_handle(0)
+    assert sender._eifel_ts == eifel_ts
+
+    assert peer.deliver([peer.ack(MSS, timestamps=(1, sent_ts))], lambda: sender._base == MSS)
+    assert sender.spurious_timeouts == 1
+    assert sender._cc.ssthresh == 8 * MSS
+    for segment in sender._ack_pending_queue:
+        segment.timer.cancel()
+
+def test_disabled(ack_peer):
+    peer, sender, sent_ts = timed_out_sender(ack_peer, eifel=False)
+    assert sender._eifel_ts is None
+    assert peer.deliver([peer.ack(MSS, timestamps=(1, sent_ts))], lambda: sender._base == MSS)
+    assert sender.spurious_timeouts == 0
+    assert sender._cc.cwnd == 2 * MSS
@@ -0,0 +1,112 @@
+import pytest
+
+from lib.tcp.components.congestion_control import HyStart, Reno
+
+FLIGHT = 800    # Bytes in flight at the start of each round, acknowledged by N_RTT_SAMPLE ACKs of 100 bytes.
+
+def run_round(hystart, rtt, samples=HyStart.N_RTT_SAMPLE):
+    # Acknowledges one round of data, taking an RTT sample for the first samples ACKs. Returns True if any
+    # ACK ends slow start.
+    acks = FLIGHT // 100
+    exit = False
+    for index in range(acks):
+        if index < samples:
+            hystart.on_rtt_sample(rtt)
+        exit = hystart.on_ack(100, FLIGHT) or exit
+    return exit
+
+def test_constant_rtt_stays_in_slow_start():
+    hystart = HyStart()
+    for _ in range(20):
+        assert not run_round(hystart, 0.1)
+    assert not hystart.css
+
+@pytest.mark.parametrize("last_min_rtt, threshold", [
+    (0.1,   0.1 / HyStart.MIN_RTT_DIVISOR),     # Within the bounds.
+    (0.01,  HyStart.MIN_RTT_THRESH),            # Clamped to the lower bound.
+    (0.5,   HyStart.MAX_RTT_THRESH),            # Clamped to the upper bound.
+])
+def test_rtt_threshold(last_min_rtt, threshold):
+    below = HyStart()
+    run_round(below, last_min_rtt)
+    run_round(below, last_min_rtt + (threshold * 0.95))
+    assert not below.css
+
+    above = HyStart()
+    run_round(above, last_min_rtt)
+    run_round(above, last_min_rtt + (threshold * 1.05))
+    assert above.css
+
+def test_round_minimum_rtt_compared():
+    # A single high sample does not raise the minimum RTT of the round.
+    hystart = HyStart()
+    run_round(hystart, 0.1)
+    for index in range(FLIGHT // 100):
+        hystart.on_rtt_sample(0.2 if index == 0 else 0.1)
+        hystart.on_ack(100, FLIGHT)
+    assert not hystart.css
+
+def test_too_few_samples_in_round():
+    hystart = HyStart()
+    run_round(hystart, 0.1)
+    run_round(hystart, 0.2, samples=HyStart.N_RTT_SAMPLE - 1)
+    assert not hystart.css
+
+def test_css_ends_slow_start_after_css_rounds():
+    hystart = HyStart()
+    run_round(hystart, 0.1)
+    run_round(hystart, 0.2)
+    assert hystart.css
+
+    for _ in range(HyStart.CSS_ROUNDS - 1):
+        assert not run_round(hystart, 0.2)
+
+    # The first ACK of the next round completes the last CSS round.
+    hystart.on_rtt_sample(0.2)
+    assert hystart.on_ack(100, FLIGHT)
+
+def test_rtt_falling_returns_to_slow_start():
+    hystart = HyStart()
+    run_round(hystart, 0.1)
+    run_round(hystart, 0.2)
+    assert hystart.css
+
+    run_round(hystart, 0.15)
+    assert not hystart.css
+
+    # The count of CSS rounds restarts if CSS is entered again.
+    run_round(hystart, 0.3)
+    assert hystart.css
+    for _ in range(HyStart.CSS_ROUNDS - 1):
+        assert not run_round(hystart, 0.3)
+
+def test_window_growth_in_css_and_exit():
+    reno      = Reno(100, hystart=True)
+    reno.cwnd = 10 * 100
+
+    def ack_round(rtt):
+        for _ in range(FLIGHT // 100):
+            reno.on_rtt_sample(rtt)
+            cwnd = reno.cwnd
+            reno.on_ack(100, FLIGHT)
+        return reno.cwnd - cwnd
+
+    # Slow start grows by the data acknowledged, CSS by a quarter of it.
+    assert ack_round(0.1) == 100
+    assert ack_round(0.2) == 100 / HyStart.CSS_GROWTH_DIVISOR
+
+    # Leaving slow start sets ssthresh to the window.
+    for _ in range(HyStart.CSS_ROUNDS * (FLIGHT // 100)):
+        reno.on_rtt_sample(0.2)
+        reno.on_ack(100, FLIGHT)
+        if not reno.slow_start:
+            break
+    assert reno.ssthresh == reno.cwnd
+
+def test_hystart_only_applies_to_initial_slow_start():
+    reno = Reno(100, hystart=True)
+    reno.on_timeout(10 * 100)
+    reno.on_rtt_sample(0.1)
+    reno.on_ack(100, FLIGHT)
+    assert reno.cwnd == 200
+    assert reno._hystart._samples == 0
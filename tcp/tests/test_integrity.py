@@ -0,0 +1,82 @@
+import pytest
+
+from lib.tcp.components.integrity import crc32c, get_integrity, find_integrity, INTERNET_CHECKSUM, CRC32C_CHECKSUM, NO_INTEGRITY
+from lib.tcp.components.tcp_packet import TCP_Packet, ALT_CHECKSUM_REQUEST, ALT_CHECKSUM_DATA
+from lib.tcp.tcp import TCP
+
+MESSAGE = bytes(range(37))
+
+def crc32c_bitwise(data):
+    # Reference CRC32C calculated one bit at a time.
+    crc = 0xFFFFFFFF
+    for byte in data:
+        crc ^= byte
+        for _ in range(8):
+            crc = (crc >> 1) ^ (0x82F63B78 if (crc & 1) else 0)
+    return crc ^ 0xFFFFFFFF
+
+def test_crc32c_check_value():
+    assert crc32c(b"123456789") == 0xE3069283
+    assert crc32c(b"") == 0
+
+def test_crc32c_matches_bitwise_calculation():
+    # Lengths either side of the 8-byte steps of the table-driven calculation.
+    for length in range(len(MESSAGE) + 1):
+        assert crc32c(MESSAGE[:length]) == crc32c_bitwise(MESSAGE[:length])
+
+def test_crc32c_continues_over_regions():
+    for split in range(len(MESSAGE) + 1):
+        assert crc32c(MESSAGE[split:], crc32c(MESSAGE[:split])) == crc32c(MESSAGE)
+    assert CRC32C_CHECKSUM.value(MESSAGE[:10], MESSAGE[10:]) == crc32c(MESSAGE)
+
+@pytest.mark.parametrize("integrity", [INTERNET_CHECKSUM, CRC32C_CHECKSUM, NO_INTEGRITY])
+def test_calculate_and_verify(integrity):
+    packet = MESSAGE + integrity.calculate(MESSAGE)
+    assert len(packet) == len(MESSAGE) + integrity.size
+    assert integrity.verify(packet)
+
+    corrupted = bytearray(packet)
+    corrupted[3] ^= 0x10
+    assert integrity.verify(bytes(corrupted)) == (integrity is NO_INTEGRITY)
+
+def test_lookup():
+    assert get_integrity("crc32c") is CRC32C_CHECKSUM
+    with pytest.raises(ValueError):
+        get_integrity("md5")
+    assert find_integrity(INTERNET_CHECKSUM.number) is INTERNET_CHECKSUM
+    assert find_integrity(CRC32C_CHECKSUM.number) is CRC32C_CHECKSUM
+    assert find_integrity(9) is None
+
+def test_crc32c_packet_carries_high_bits_in_option():
+    packet = TCP_Packet(1, 2, 3, 4, 1000, MESSAGE, ack=1, integrity=CRC32C_CHECKSUM)
+    kind, length, high = packet.options[0], packet.options[1], int.from_bytes(packet.options[2:4], "big")
+    assert (kind, length) == (ALT_CHECKSUM_DATA, 4)
+    assert ((high << 16) | int.from_bytes(packet.checksum, "big")) != 0
+
+    received            = TCP_Packet(0, 0, 0, 0, 0, None, integrity=CRC32C_CHECKSUM)
+    received.packet     = bytes(packet.packet)
+    assert received.is_valid()
+
+    corrupted           = bytearray(packet.packet)
+    corrupted[-1]      ^= 0x01
+    received.packet     = bytes(corrupted)
+    assert not received.is_valid()
+
+def test_syn_requests_alternate_checksum(transfer):
+    client, server, data = transfer(MESSAGE, {"integrity": "crc32c"}, {"integrity": "crc32c"})
+    assert data == MESSAGE
+    assert client._integrity_option(CRC32C_CHECKSUM) == bytes([ALT_CHECKSUM_REQUEST, 3, CRC32C_CHECKSUM.number, 0])
+    assert (client._integrity is CRC32C_CHECKSUM) and (server._integrity is CRC32C_CHECKSUM)
+
+@pytest.mark.parametrize("client_integrity, server_integrity", [("crc32c", "internet"), ("internet", "crc32c"), ("crc32c", "none")])
+def test_disagreeing_hosts_fall_back_to_internet_checksum(transfer, client_integrity, server_integrity):
+    client, server, data = transfer(MESSAGE, {"integrity": client_integrity}, {"integrity": server_integrity})
+    assert data == MESSAGE
+    assert (client._integrity is INTERNET_CHECKSUM) and (server._integrity is INTERNET_CHECKSUM)
+
+def test_unsupported_request_is_not_agreed():
+    syn         = TCP_Packet(1, 2, 0, 0, 1000, None, syn=1)
+    syn.options = bytes([ALT_CHECKSUM_REQUEST, 3, 9, 0])
+    assert TCP._requested_integrity(None, syn) is None
+    syn.options = bytes(4)
+    assert TCP._requested_integrity(None, syn) is INTERNET_CHECKSUM
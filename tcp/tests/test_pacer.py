@@ -0,0 +1,73 @@
+import pytest
+
+import lib.tcp.components.pacer as pacer
+from lib.tcp.components.pacer import Pacer, PACING_GAIN, PACING_GAIN_SLOW_START
+
+class Clock:
+    # Stands in for time.monotonic, advanced by the tests.
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(pacer.time, "monotonic", clock)
+    return clock
+
+def test_set_rate():
+    pacer = Pacer(400)
+    pacer.set_rate(10000, 0.1, True)
+    assert pacer.rate == pytest.approx((PACING_GAIN_SLOW_START * 10000) / 0.1)
+    pacer.set_rate(10000, 0.1, False)
+    assert pacer.rate == pytest.approx((PACING_GAIN * 10000) / 0.1)
+
+@pytest.mark.parametrize("cwnd, srtt", [(10000, None), (10000, 0), (0, 0.1)])
+def test_unset_or_zero_rate_does_not_pace(clock, cwnd, srtt):
+    pacer = Pacer(200)
+    pacer.set_rate(cwnd, srtt, False)
+    assert pacer.rate is None
+    for _ in range(10):
+        assert pacer.delay(100) == 0
+
+    # A rate of zero set directly is treated as unset.
+    pacer.rate = 0
+    assert pacer.delay(100) == 0
+
+def test_burst_allowance_then_paced(clock):
+    pacer      = Pacer(300)
+    pacer.rate = 1000    # 100 bytes every 0.1 s.
+
+    # The bucket starts full, allowing a burst of three segments.
+    assert [pacer.delay(100) for _ in range(3)] == [0, 0, 0]
+    assert pacer.delay(100) == pytest.approx(0.1)
+
+    # Tokens are not taken while the segment is held back.
+    clock.now = 0.05
+    assert pacer.delay(100) == pytest.approx(0.05)
+    clock.now = 0.1
+    assert pacer.delay(100) == 0
+    assert pacer.delay(100) == pytest.approx(0.1)
+
+def test_tokens_refill_up_to_burst(clock):
+    pacer      = Pacer(300)
+    pacer.rate = 1000
+    for _ in range(3):
+        pacer.delay(100)
+
+    # After a long idle period, only the burst allowance may be sent back to back.
+    clock.now = 10
+    assert [pacer.delay(100) for _ in range(3)] == [0, 0, 0]
+    assert pacer.delay(100) > 0
+
+def test_bucket_refilled_while_unpaced(clock):
+    pacer      = Pacer(300)
+    pacer.rate = 1000
+    for _ in range(3):
+        pacer.delay(100)
+    pacer.rate = None
+    pacer.delay(100)
+    pacer.rate = 1000
+    assert [pacer.delay(100) for _ in range(3)] == [0, 0, 0]
@@ -0,0 +1,74 @@
+import pytest
+
+from lib.tcp.components.rack import RACK, DUP_THRESH, INITIAL_PTO, WC_DEL_ACK_T, probe_timeout
+from lib.tcp.components.retransmission_queue import PendingSegment
+
+def segments(count, interval=0.01):
+    # Segments of 100 bytes, sent interval seconds apart from time 0.
+    return [PendingSegment(None, (index * 100), ((index + 1) * 100), (index * interval)) for index in range(count)]
+
+def test_segments_sent_before_delivered_segment_are_lost_after_rtt():
+    rack    = RACK(0.001)
+    pending = segments(4)
+
+    # The last segment is delivered 0.1 s after it was sent, SACKed ahead of the others.
+    pending[3].sacked = True
+    rack.update(pending[3], 0.13)
+    assert rack.rtt == pytest.approx(0.1)
+
+    # In recovery there is no reordering window, so a segment is lost once the RTT has passed since it was sent.
+    lost, timeout = rack.detect_loss(pending, 0.115, 0.1, True)
+    assert lost == [pending[0], pending[1]]
+    assert all(segment.lost for segment in lost)
+    assert timeout == pytest.approx(0.005)
+
+    # Segments already marked are not returned again.
+    lost, timeout = rack.detect_loss(pending, 0.125, 0.1, True)
+    assert (lost == [pending[2]]) and (timeout == 0)
+
+def test_reordering_window():
+    rack    = RACK(0.001)
+    pending = segments(DUP_THRESH + 2)
+    for segment in pending[2:]:
+        segment.sacked = True
+    rack.update(pending[-1], 0.14)
+
+    # A quarter of the minimum RTT is allowed until enough segments are SACKed to assume a loss.
+    assert rack.reo_wnd(0.1, False, (DUP_THRESH - 1)) == pytest.approx(0.025)
+    assert rack.reo_wnd(0.1, False, DUP_THRESH) == 0
+    lost, timeout = rack.detect_loss(pending, 0.105, 0.1, False)
+    assert lost == [pending[0]]
+    assert timeout == pytest.approx(0.005)
+
+def test_reordering_keeps_window():
+    rack    = RACK(0.001)
+    pending = segments(2)
+    rack.update(pending[1], 0.11)
+    rack.update(pending[0], 0.12)
+    assert rack.reordering_seen
+    assert rack.reo_wnd(0.1, True, DUP_THRESH) == pytest.approx(0.025)
+
+def test_early_ack_of_retransmitted_segment_is_ignored():
+    rack    = RACK(0.001)
+    pending = segments(3)
+    rack.update(pending[0], 0.1)
+
+    # An ACK arriving well within the minimum RTT of a resend is for the original transmission.
+    pending[2].retransmitted = True
+    pending[2].sent_time     = 0.2
+    rack.update(pending[2], 0.25)
+    assert (rack.end_seq == 100) and (rack.min_rtt == pytest.approx(0.1))
+
+    # An ACK within the timer resolution of the minimum RTT is taken as the ACK of the resend.
+    rack.update(pending[2], 0.2995)
+    assert rack.end_seq == 300
+
+def test_no_loss_before_first_delivery():
+    rack = RACK(0.001)
+    assert rack.detect_loss(segments(3), 10, None, False) == ([], 0)
+
+def test_probe_timeout():
+    assert probe_timeout(None, 1, 1000, 100) == INITIAL_PTO
+    assert probe_timeout(0.1, 1, 1000, 100) == pytest.approx(0.2)
+    assert probe_timeout(0.1, 1, 100, 100) == pytest.approx(0.2 + WC_DEL_ACK_T)
+    assert probe_timeout(0.1, 0.15, 1000, 100) == pytest.approx(0.15)
@@ -0,0 +1,60 @@
+from lib.tcp.components.reassembly_queue import ReassemblyQueue
+
+DATA = bytes(range(256)) * 4    # Stream being reassembled, byte i at sequence number i.
+
+def segment(start, end):
+    return DATA[start:end]
+
+def test_overlapping_segments_are_merged():
+    queue = ReassemblyQueue(1000)
+    assert queue.insert(0, 100, segment(100, 200))
+    assert queue.insert(0, 300, segment(300, 400))
+    assert queue.insert(0, 150, segment(150, 350))
+    assert len(queue) == 1
+    assert queue.blocks() == [(100, 400)]
+    assert bytes(queue.pop(100)) == segment(100, 400)
+
+def test_segment_extending_run_at_both_ends():
+    queue = ReassemblyQueue(1000)
+    queue.insert(0, 200, segment(200, 300))
+    assert queue.insert(0, 100, segment(100, 400))
+    assert bytes(queue.pop(100)) == segment(100, 400)
+
+def test_duplicate_data_is_held_once():
+    queue = ReassemblyQueue(1000)
+    assert queue.insert(0, 100, segment(100, 200))
+    assert not queue.insert(0, 100, segment(100, 200))
+    assert not queue.insert(0, 120, segment(120, 180))
+    assert queue.blocks() == [(100, 200)]
+
+def test_data_below_base_and_beyond_capacity_is_discarded():
+    queue = ReassemblyQueue(300)
+    assert not queue.insert(100, 0, segment(0, 100))
+    assert queue.insert(100, 50, segment(50, 150))
+    assert queue.blocks() == [(100, 150)]
+
+    # Only the data within capacity bytes of the base is held.
+    assert queue.insert(100, 350, segment(350, 500))
+    assert queue.blocks() == [(350, 400), (100, 150)]
+    assert not queue.insert(100, 400, segment(400, 500))
+
+def test_pop():
+    queue = ReassemblyQueue(1000)
+    queue.insert(0, 100, segment(100, 200))
+    queue.insert(0, 300, segment(300, 400))
+
+    # Nothing is returned until the base reaches a run, and a base within a run returns the rest of it.
+    assert queue.pop(50) is None
+    assert bytes(queue.pop(150)) == segment(150, 200)
+    assert queue.blocks() == [(300, 400)]
+
+    # Runs the base has passed are discarded.
+    assert queue.pop(500) is None
+    assert len(queue) == 0
+
+def test_blocks_report_latest_segment_first():
+    queue = ReassemblyQueue(1000)
+    queue.insert(0, 100, segment(100, 200))
+    queue.insert(0, 500, segment(500, 600))
+    queue.insert(0, 300, segment(300, 400))
+    assert queue.blocks() == [(300, 400), (100, 200), (500, 600)]
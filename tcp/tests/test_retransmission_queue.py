@@ -0,0 +1,47 @@
+from lib.tcp.components.retransmission_queue import RetransmissionQueue
+
+class Timer:
+    def __init__(self):
+        self.cancelled = False
+
+    def cancel(self):
+        self.cancelled = True
+
+def test_segments_are_kept_in_send_order():
+    queue = RetransmissionQueue()
+    for seq_no in (0, 100, 200):
+        queue.push(seq_no, seq_no + 100, Timer(), seq_no)
+    assert len(queue) == 3
+    assert [segment.seq_no for segment in queue] == [0, 100, 200]
+    assert [segment.seq_no for segment in reversed(queue)] == [200, 100, 0]
+    assert (100 in queue) and (not 300 in queue)
+    assert queue.get(100).end == 200
+    assert queue.get(300) is None
+
+def test_resend_updates_entry_in_place():
+    queue   = RetransmissionQueue()
+    timer   = Timer()
+    segment = queue.push(0, 100, timer, 1.0)
+    segment.lost = True
+
+    resent = queue.push(0, 100, Timer(), 2.0)
+    assert resent is segment
+    assert timer.cancelled
+    assert (not resent.timer.cancelled) and (resent.sent_time == 2.0)
+    assert resent.retransmitted and (not resent.lost)
+    assert len(queue) == 1
+
+def test_acknowledge_removes_segments_below_ack():
+    queue = RetransmissionQueue()
+    for seq_no in (0, 100, 200, 300):
+        queue.push(seq_no, seq_no + 100, Timer(), seq_no)
+
+    assert [segment.seq_no for segment in queue.acknowledge(200)] == [0, 100]
+    assert [segment.seq_no for segment in queue] == [200, 300]
+    assert (not 100 in queue) and (200 in queue)
+
+    # A duplicate ACK removes nothing, and an ACK within a segment removes the segment.
+    assert queue.acknowledge(200) == []
+    assert [segment.seq_no for segment in queue.acknowledge(250)] == [200]
+    assert [segment.seq_no for segment in queue.acknowledge(1000)] == [300]
+    assert len(queue) == 0
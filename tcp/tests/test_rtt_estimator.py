@@ -0,0 +1,117 @@
+import time
+
+import pytest
+
+from lib.tcp.components.rtt_estimator import RTTEstimator, INITIAL_RTO, MAX_RTO, timestamp_now, timestamp_elapsed, timestamp_before
+
+class Timer:
+    def __init__(self):
+        self.cancelled = False
+
+    def cancel(self):
+        self.cancelled = True
+
+def test_initial_rto_before_first_sample():
+    estimator = RTTEstimator(0, 0.001)
+    assert (estimator.srtt is None) and (estimator.rttvar is None)
+    assert estimator.rto == INITIAL_RTO
+
+def test_first_and_later_samples():
+    estimator = RTTEstimator(0, 0.001)
+
+    # The first sample sets SRTT = R and RTTVAR = R / 2.
+    estimator.sample(0.1)
+    assert estimator.srtt   == pytest.approx(0.1)
+    assert estimator.rttvar == pytest.approx(0.05)
+    assert estimator.rto    == pytest.approx(0.1 + (4 * 0.05))
+
+    # Later samples are smoothed, RTTVAR being updated with the SRTT from before the sample.
+    estimator.sample(0.2)
+    assert estimator.rttvar == pytest.approx((0.75 * 0.05) + (0.25 * 0.1))
+    assert estimator.srtt   == pytest.approx((0.875 * 0.1) + (0.125 * 0.2))
+    assert estimator.rto    == pytest.approx(estimator.srtt + (4 * estimator.rttvar))
+
+def test_gains_divided_by_expected_samples():
+    estimator = RTTEstimator(0, 0.001)
+    estimator.sample(0.1)
+    estimator.sample(0.2, 4)
+    assert estimator.rttvar == pytest.approx(((1 - (1 / 16)) * 0.05) + ((1 / 16) * 0.1))
+    assert estimator.srtt   == pytest.approx(((1 - (1 / 32)) * 0.1) + ((1 / 32) * 0.2))
+
+@pytest.mark.parametrize("flight, expected", [(0, 1), (200, 1), (201, 2), (1000, 5)])
+def test_expected_samples(flight, expected):
+    assert RTTEstimator.expected_samples(flight, 100) == expected
+
+def test_rto_clamped_to_min_rto():
+    estimator = RTTEstimator(1, 0.001)
+    estimator.sample(0.01)
+    assert estimator.rto == 1
+
+def test_rto_variance_term_clamped_to_granularity():
+    estimator = RTTEstimator(0, 0.5)
+    estimator.sample(0.1)
+    assert estimator.rto == pytest.approx(0.1 + 0.5)
+    for _ in range(50):
+        estimator.sample(0.1)
+    assert estimator.rto == pytest.approx(0.1 + 0.5)
+
+def test_rto_clamped_to_max_rto():
+    estimator = RTTEstimator(0, 0.001)
+    estimator.sample(100)
+    assert estimator.rto == MAX_RTO
+
+def test_backoff_doubles_up_to_max_rto_and_is_cleared_by_sample():
+    estimator = RTTEstimator(0, 0.001)
+    estimator.sample(0.1)
+    rto = estimator.rto
+    estimator.backoff()
+    assert estimator.rto == pytest.approx(2 * rto)
+    estimator.backoff()
+    assert estimator.rto == pytest.approx(4 * rto)
+    for _ in range(20):
+        estimator.backoff()
+    assert estimator.rto == MAX_RTO
+
+    # A new sample recomputes the RTO from the estimate, clearing the backoff.
+    estimator.sample(0.1)
+    assert estimator.rto < (2 * rto)
+
+def test_timestamp_helpers_allow_for_wrapping():
+    assert timestamp_before(0xFFFFFFF0, 0x10)
+    assert not timestamp_before(0x10, 0xFFFFFFF0)
+    assert not timestamp_before(5, 5)
+    assert 0 <= timestamp_elapsed(timestamp_now()) < 1
+
+def sent_segments(sender, count, age):
+    # Segments of one MSS sent age seconds ago, awaiting an ACK.
+    for index in range(count):
+        sender._ack_pending_queue.push((index * sender._mss), ((index + 1) * sender._mss), Timer(), (time.time() - age))
+    sender._seq_no = sender._sent_end = count * sender._mss
+
+def test_ack_of_retransmitted_segment_gives_no_sample(ack_peer):
+    peer   = ack_peer()
+    sender = peer.sender
+    sent_segments(sender, 1, 0.05)
+    sender._ack_pending_queue.push(0, 100, Timer(), time.time())    # Resent.
+    assert peer.deliver([peer.ack(100)], lambda: sender._base == 100)
+    assert sender._rtt.srtt is None
+    assert sender._rtt.rto == INITIAL_RTO
+
+def test_ack_of_segment_sent_once_gives_sample(ack_peer):
+    peer   = ack_peer()
+    sender = peer.sender
+    sent_segments(sender, 2, 0.05)
+    sender._ack_pending_queue.push(0, 100, Timer(), time.time())    # Resent, covered by the same ACK.
+    assert peer.deliver([peer.ack(200)], lambda: sender._base == 200)
+    assert sender._rtt.srtt == pytest.approx(0.05, abs=0.04)
+
+def test_timestamp_sample_taken_from_retransmitted_segment(ack_peer):
+    # The echoed timestamp identifies the transmission acknowledged, so Karn's algorithm does not apply.
+    peer   = ack_peer()
+    sender = peer.sender
+    sender._timestamps = True
+    sent_segments(sender, 1, 0)
+    sender._ack_pending_queue.push(0, 100, Timer(), time.time())
+    ts_echo = (timestamp_now() - 50_000) & 0xFFFFFFFF   # 50 ms ago.
+    assert peer.deliver([peer.ack(100, timestamps=(1, ts_echo))], lambda: sender._base == 100)
+    assert sender._rtt.srtt == pytest.approx(0.05, abs=0.04)
@@ -0,0 +1,53 @@
+from lib.tcp.components.sack_scoreboard import SACKScoreboard
+
+def test_blocks_are_merged():
+    scoreboard = SACKScoreboard()
+    assert scoreboard.update([(300, 400), (100, 200)])
+    assert list(scoreboard) == [(100, 200), (300, 400)]
+
+    # Overlapping and touching blocks extend a range, and a block spanning a gap joins the ranges.
+    assert scoreboard.update([(150, 250)])
+    assert scoreboard.update([(400, 500)])
+    assert list(scoreboard) == [(100, 250), (300, 500)]
+    assert scoreboard.update([(200, 350)])
+    assert list(scoreboard) == [(100, 500)]
+
+    # Blocks already recorded, and empty blocks, change nothing.
+    assert not scoreboard.update([(100, 500), (200, 300), (600, 600)])
+    assert list(scoreboard) == [(100, 500)]
+
+def test_block_covering_several_ranges():
+    scoreboard = SACKScoreboard()
+    scoreboard.update([(100, 200), (300, 400), (500, 600), (800, 900)])
+    assert scoreboard.update([(50, 650)])
+    assert list(scoreboard) == [(50, 650), (800, 900)]
+
+def test_is_sacked():
+    scoreboard = SACKScoreboard()
+    scoreboard.update([(100, 200), (300, 400)])
+    assert scoreboard.is_sacked(100, 200)
+    assert scoreboard.is_sacked(150, 180)
+    assert not scoreboard.is_sacked(0, 100)
+    assert not scoreboard.is_sacked(150, 250)
+    assert not scoreboard.is_sacked(200, 300)
+
+def test_advance_trims_below_ack():
+    scoreboard = SACKScoreboard()
+    scoreboard.update([(100, 200), (300, 400), (500, 600)])
+
+    # Ranges wholly below the ACK are dropped, and a range the ACK falls within is trimmed.
+    scoreboard.advance(350)
+    assert list(scoreboard) == [(350, 400), (500, 600)]
+    scoreboard.advance(400)
+    assert list(scoreboard) == [(500, 600)]
+    scoreboard.advance(100)
+    assert list(scoreboard) == [(500, 600)]
+    scoreboard.advance(1000)
+    assert len(scoreboard) == 0
+
+def test_clear():
+    scoreboard = SACKScoreboard()
+    scoreboard.update([(100, 200)])
+    scoreboard.clear()
+    assert len(scoreboard) == 0
+    assert not scoreboard.is_sacked(100, 200)
@@ -0,0 +1,78 @@
+from lib.tcp.components.tcp_packet import TCP_Packet, HEADER_LEN, MAX_HEADER_LEN
+
+def test_checksum_setter_writes_given_value():
+    packet = TCP_Packet(1, 2, 3, 4, 1000, b"hello")
+    good   = packet.checksum
+    assert packet.is_valid()
+
+    packet.checksum = bytes([(good[0] ^ 0xFF), good[1]])
+    assert packet.checksum != good
+    assert not packet.is_valid()
+
+    # The corrupted checksum is carried by the packet sent, and detected by the receiver.
+    received        = TCP_Packet(0, 0, 0, 0, 0, None)
+    received.packet = bytes(packet.packet)
+    assert not received.is_valid()
+
+    packet.checksum = good
+    assert packet.is_valid()
+
+def test_header_layout():
+    packet = TCP_Packet(0x1234, 0x5678, 0x9ABCDEF0, 0x11223344, 0xFEDC, b"xyz", ack=1, syn=1)
+    raw    = bytes(packet.packet)
+    assert raw[0:16] == bytes.fromhex("1234 5678 9abcdef0 11223344 60 12 fedc".replace(" ", ""))
+    assert raw[18:24] == bytes(6)
+    assert raw[24:] == b"xyz"
+    assert (packet.header_len == HEADER_LEN == 24) and (bytes(packet.data) == b"xyz")
+    assert (packet.mgmt_ack == 1) and (packet.mgmt_syn == 1) and (packet.mgmt_fin == 0)
+
+def test_header_length_in_bytes_follows_options():
+    packet = TCP_Packet(1, 2, 3, 4, 1000, b"data")
+    packet.sack_permitted = True
+    packet.window_scale   = 7
+    assert packet.header_len == 32
+    assert (packet.packet[12] >> 4) * 4 == packet.header_len
+    assert bytes(packet.packet[packet.header_len:]) == b"data"
+
+    packet.sack_permitted = False
+    packet.window_scale   = None
+    assert packet.header_len == HEADER_LEN
+    assert bytes(packet.data) == b"data"
+
+def test_options_round_trip():
+    packet = TCP_Packet(1, 2, 3, 4, 1000, b"payload", ack=1)
+    packet.timestamps  = (123456789, 987654321)
+    packet.sack_blocks = [(100, 200), (300, 400), (500, 600), (700, 800)]
+    packet.options     = b"\x0e\x03\x01\x00"
+
+    received        = TCP_Packet(0, 0, 0, 0, 0, None)
+    received.packet = bytes(packet.packet)
+    assert received.is_valid()
+    assert received.timestamps  == (123456789, 987654321)
+    assert received.sack_blocks == [(100, 200), (300, 400), (500, 600)]     # Only three blocks fit alongside the timestamps.
+    assert received.options     == b"\x0e\x03\x01\x00"
+    assert received.window_scale is None and (not received.sack_permitted)
+    assert bytes(received.data) == b"payload"
+    assert received.header_len <= MAX_HEADER_LEN
+
+    # Updating the timestamps in place keeps the other options and the data.
+    received.timestamps = (1, 2)
+    assert received.is_valid()
+    assert received.timestamps  == (1, 2)
+    assert received.sack_blocks == [(100, 200), (300, 400), (500, 600)]
+    assert bytes(received.data) == b"payload"
+
+def test_is_valid_does_not_change_packet():
+    sent = TCP_Packet(1, 2, 3, 4, 1000, b"payload", ack=1)
+    raw  = bytes(sent.packet)
+    for corrupt in (False, True):
+        buffer = bytearray(raw)
+        if corrupt:
+            buffer[-1] ^= 0xFF
+        received        = TCP_Packet(0, 0, 0, 0, 0, None)
+        received.packet = bytes(buffer)
+        view            = received.packet
+        assert received.is_valid() == (not corrupt)
+        assert received.is_valid() == (not corrupt)
+        assert bytes(received.packet) == bytes(buffer)
+        assert received.packet.obj is view.obj      # The received buffer is still referenced, not copied.
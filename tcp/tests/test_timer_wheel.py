@@ -0,0 +1,84 @@
+import threading
+import time
+
+from lib.tcp.components.timer_wheel import TimerWheel
+
+RESOLUTION = 0.05   # Coarse ticks, so that timers armed together share a tick.
+
+def schedule_same_tick(wheel, delays, function):
+    # Arm a timer per delay, retrying until the timers with the same delay share a tick.
+    while True:
+        timers = [wheel.schedule(delay, function, (index,)) for index, delay in enumerate(delays)]
+        ticks  = {}
+        for timer, delay in zip(timers, delays):
+            ticks.setdefault(delay, set()).add(timer.tick)
+        if all(len(tick) == 1 for tick in ticks.values()):
+            return timers
+        for timer in timers:
+            timer.cancel()
+
+def wait_for(wheel, timers):
+    # Wait for the ticks of the timers to have been processed by the wheel thread.
+    done = threading.Event()
+    wheel.schedule(((max(timer.tick for timer in timers) - wheel._now()) + 2) * RESOLUTION, done.set)
+    assert done.wait(5)
+
+def test_timers_fire_in_expiry_order():
+    wheel = TimerWheel(RESOLUTION)
+    fired = []
+    timers = schedule_same_tick(wheel, [0.15, 0.05, 0.1], fired.append)
+    wait_for(wheel, timers)
+    assert fired == [1, 2, 0]
+    assert wheel._pending == 0
+
+def test_cancelled_timer_does_not_fire():
+    wheel = TimerWheel(RESOLUTION)
+    fired = []
+    timers = schedule_same_tick(wheel, [0.05, 0.05], fired.append)
+    timers[1].cancel()
+    timers[1].cancel()
+    wait_for(wheel, timers)
+    assert fired == [0]
+    assert wheel._pending == 0
+
+def test_cancel_from_earlier_callback_in_same_tick():
+    wheel  = TimerWheel(RESOLUTION)
+    fired  = []
+    timers = []
+
+    def expire(index):
+        fired.append(index)
+        for timer in timers:
+            timer.cancel()
+
+    timers.extend(schedule_same_tick(wheel, [0.05] * 10, expire))
+    wait_for(wheel, timers)
+    assert fired == [0]
+    assert wheel._pending == 0
+
+def test_cancel_after_expiry_has_no_effect():
+    wheel  = TimerWheel(RESOLUTION)
+    fired  = []
+    timers = schedule_same_tick(wheel, [0.05], fired.append)
+    wait_for(wheel, timers)
+    timers[0].cancel()
+    assert fired == [0]
+    assert wheel._pending == 0
+
+def test_timer_on_idle_wheel_fires_when_wheel_wakes_late():
+    wheel = TimerWheel(0.001)
+    woken = threading.Event()
+    wheel.schedule(0, woken.set)
+    assert woken.wait(5)
+    time.sleep(0.01)    # Let the wheel thread go idle.
+
+    # Keep the wheel thread from waking until the deadline of the timer has passed, as a thread holding
+    # the GIL would.
+    fired = threading.Event()
+    start = time.monotonic()
+    with wheel._cond:
+        wheel.schedule(0.002, fired.set)
+        while (time.monotonic() - start) < 0.02:
+            pass
+    assert fired.wait(5)
+    assert (time.monotonic() - start) < 0.25
@@ -0,0 +1,76 @@
+import pytest
+
+import lib.tcp.tcp as tcp
+from lib.tcp.components.tcp_packet import MAX_WINDOW_SCALE
+
+@pytest.fixture
+def endpoint():
+    tcp.DEBUG = False
+    created   = []
+
+    def create(**options):
+        created.append(tcp.TCP("127.0.0.1", 0, "127.0.0.1", 1, 1000, **options))
+        return created[-1]
+    yield create
+    for host in created:
+        host._send_sock.close()
+        host._recv_sock.close()
+
+@pytest.mark.parametrize("recv_window, shift", [(1000, 0), (0xFFFF, 0), (0x10000, 1), (1 << 20, 5), (1 << 30, MAX_WINDOW_SCALE)])
+def test_window_shift_fits_largest_window(endpoint, recv_window, shift):
+    assert endpoint(recv_window=recv_window)._window_shift() == shift
+
+def test_negotiation(endpoint):
+    host = endpoint(recv_window=1 << 20)
+    assert host._negotiate_window_scale(3)
+    assert (host._snd_wscale == 3) and (host._rcv_wscale == 5)
+
+    # Shift counts above the maximum are treated as the maximum.
+    assert host._negotiate_window_scale(20)
+    assert host._snd_wscale == MAX_WINDOW_SCALE
+
+    # Scaling is not used in either direction unless both hosts offer it.
+    assert not host._negotiate_window_scale(None)
+    assert (host._snd_wscale == 0) and (host._rcv_wscale == 0)
+    declined = endpoint(recv_window=1 << 20, window_scale=False)
+    assert not declined._negotiate_window_scale(3)
+    assert (declined._snd_wscale == 0) and (declined._rcv_wscale == 0)
+
+def test_advertised_window(endpoint):
+    host = endpoint(recv_window=1 << 20)
+
+    # Before scaling is agreed, the window is limited to the largest unscaled value.
+    assert host._advertised_window() == 0xFFFF
+
+    host._negotiate_window_scale(0)
+    assert host._advertised_window() == (1 << 20) >> 5
+    host._recv_window = 1000
+    assert host._advertised_window() == 1000 >> 5
+
+    # An open window below one unit of the scale is not advertised as closed.
+    host._recv_window = 1
+    assert host._advertised_window() == 1
+    host._recv_window = 0
+    assert host._advertised_window() == 0
+
+def test_sender_scales_advertised_window(ack_peer):
+    peer   = ack_peer()
+    sender = peer.sender
+    sender._negotiate_window_scale(5)
+    sender._seq_no = sender._sent_end = 100
+    assert peer.deliver([peer.ack(100, window=1)], lambda: sender._base == 100)
+    assert sender._recv_window == 1 << 5
+
+def test_transfer_with_scaled_windows(transfer):
+    data = bytes(range(256)) * 2000
+    options = {"recv_window": 1 << 20, "send_window": 1 << 20}
+    client, server, received = transfer(data, options, options)
+    assert received == data
+    assert (client._snd_wscale == server._rcv_wscale == 5)
+    assert (server._snd_wscale == client._rcv_wscale == 5)
+
+def test_transfer_with_scaling_declined(transfer):
+    data = bytes(range(256)) * 200
+    client, server, received = transfer(data, {"recv_window": 1 << 20}, {"recv_window": 1 << 20, "window_scale": False})
+    assert received == data
+    assert client._snd_wscale == client._rcv_wscale == server._snd_wscale == server._rcv_wscale == 0